@@ -1,171 +1,55 @@
 import streamlit as st 
 import pandas as pd
-import re
+import uuid
 import plotly.express as px
-from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional, Type, Union
-
-from components.loss import LossAnalyzer, EOLAnalyzer, CoreAnalyzer
+from typing import Type
+
+from components.boards import BOARD_SPECS, BoardDataError, build_board
+from components.filters import cascading_filter
+from components.flapping import FM_PLAN, OSC_PLAN, get_flapping_store
+from components.history import get_history_store, value_cols
+from components.loss import ATTENUATION_PLAN, LossAnalyzer, EOLAnalyzer, CoreAnalyzer
+from components.perf_panel import perf_enabled, render_performance_panel
+from components.rules import COL_IN, COL_MAX_IN, COL_MAX_OUT, COL_MIN_IN, COL_MIN_OUT, COL_OUT, evaluate_board
+from components.table import CellStyle, paginate, render_table, preset_route_mask
 from components.uploader import ExcelUploader
+from components.wason import LOCATION_COLS, read_call_text, scan_wason_log, scan_wason_logs
 from services.database import Database
+from services.ingest import UPLOAD_TYPES
+from services.profiling import get_profile_log
+from services.reference import get_reference_registry
 from services.session import SessionStateEnum, SessionStateManager
 
+st.set_page_config(layout="wide")
+
 database = Database()
 session = SessionStateManager(st.session_state)
 uploader = ExcelUploader(session)
+references = get_reference_registry()
+history = get_history_store()
 
-session[SessionStateEnum.REFERENCE_SHEET] = database.get_reference_sheet()
 
-st.set_page_config(layout="wide")
+def record_history(board: str, uploaded_file, df_export: pd.DataFrame) -> str:
+    # เก็บทุกไฟล์ที่อัปโหลดลง history ครั้งเดียวต่อไฟล์ ใช้ key เดียวกับ upload cache (hash ครั้งเดียวต่อไฟล์)
+    key = ExcelUploader.cache_key(uploaded_file, BOARD_SPECS[board].export_plan)
+    history.append(board, df_export, key)
+    return key
 
-pd.set_option("styler.render.max_elements", 1_200_000)
-
-#filter
-def cascading_filter(
-    df: pd.DataFrame,
-    cols: list[str],
-    *,
-    ns: str = "flt",
-    labels: dict[str, str] | None = None,
-    clear_text: str = "Clear Filters",
-):
-   
-    if labels is None:
-        labels = {}
-
-    # เตรียม state
-    for c in cols:
-        st.session_state.setdefault(f"{ns}_f_{c}", [])
-
-    # คอลัมน์ที่มีอยู่จริงเท่านั้น
-    active_cols = [c for c in cols if c in df.columns]
-    if not active_cols:
-        return df.reset_index(drop=True), {}
-
-    # สร้าง options ทีละชั้นด้วย mask สะสม
-    masks = [pd.Series(True, index=df.index)]
-    options_per_col = []
-    for i, c in enumerate(active_cols):
-        m = masks[-1]
-        opts = sorted(df.loc[m, c].dropna().astype(str).unique())
-        options_per_col.append(opts)
-
-        # prune ค่าเลือกที่ไม่อยู่ใน opts (กัน selection ค้าง)
-        valid_sel = [x for x in st.session_state[f"{ns}_f_{c}"] if x in opts]
-        st.session_state[f"{ns}_f_{c}"] = valid_sel
-
-        # อัปเดต mask สำหรับคอลัมน์ถัดไป
-        if valid_sel:
-            masks.append(m & df[c].astype(str).isin(valid_sel))
-        else:
-            masks.append(m)
-
-    # วาด widgets เป็นแถวเดียว + ปุ่ม Clear
-    cols_widgets = st.columns([1] * len(active_cols) + [0.8])
-    for i, c in enumerate(active_cols):
-        with cols_widgets[i]:
-            st.multiselect(
-                labels.get(c, c),
-                options_per_col[i],
-                key=f"{ns}_f_{c}",
-            )
 
-    def _clear():
-        for c in active_cols:
-            st.session_state.pop(f"{ns}_f_{c}", None)
-
-    with cols_widgets[-1]:
-        st.button(clear_text, on_click=_clear)
-
-    # สร้าง final mask จาก selections ทั้งหมด
-    final_mask = pd.Series(True, index=df.index)
-    selections = {}
-    for c in active_cols:
-        sel = st.session_state.get(f"{ns}_f_{c}", [])
-        selections[c] = sel
-        if sel:
-            final_mask &= df[c].astype(str).isin(sel)
-
-    return df[final_mask].reset_index(drop=True), selections
-
-#Preset status
-# Match: [WASON][CALL 8] [30.10.90.6 30.10.10.6 85] COPPER
-CALL_HEADER_RE = re.compile(r"\[WASON\]\[CALL\s+(\d+)\]\s+\[([^\]]+)\]")
-# Any Conn line that contains WR
-CONN_HAS_WR_RE = re.compile(r"\[WASON\]\s*\[Conn\s+\d+\].*\bWR\b", re.IGNORECASE)
-# Specifically "WR NO_ALARM"
-CONN_WR_NOALARM_RE = re.compile(r"\[WASON\]\s*\[Conn\s+\d+\][^\n]*\bWR\s+NO_ALARM\b", re.IGNORECASE)
-# A preroute line like: --2--WORK--(USED)--(SUCCESS)-- (be robust to trailing text)
-PREROUT_USED_RE = re.compile(
-    r"\[WASON\]--\s*(\d+)\s*--\s*WORK\s*--\s*\(USED\)\s*--\s*\((\w+)\).*",
-    re.IGNORECASE,
-)
-
-@dataclass
-class CallBlock:
-    call_id: int
-    triple: str
-    lines: List[str] = field(default_factory=list)
-
-def parse_calls(text: str) -> List[CallBlock]:
-    calls: List[CallBlock] = []
-    cur: Optional[CallBlock] = None
-    for raw in text.splitlines():
-        line = raw.rstrip("\n")
-        m = CALL_HEADER_RE.search(line)
-        if m:
-            if cur is not None:
-                calls.append(cur)
-            cur = CallBlock(call_id=int(m.group(1)), triple=m.group(2), lines=[])
-        if cur is not None:
-            cur.lines.append(line)
-    if cur is not None:
-        calls.append(cur)
-    return calls
-
-def evaluate_preset_status(cb: CallBlock) -> Dict[str, Any]:
-    """
-    Focused rules:
-    - Consider only CALLs that have WR (any Conn line includes 'WR').
-    - Require at least one 'WR NO_ALARM' Conn line.
-    - In [PreRout], there must be exactly one 'WORK (USED) (SUCCESS)' line.
-    """
-    has_wr = any(CONN_HAS_WR_RE.search(ln) for ln in cb.lines)
-    if not has_wr:
-        return {"has_wr": False}
-
-    wr_no_alarm = any(CONN_WR_NOALARM_RE.search(ln) for ln in cb.lines)
-
-    used_rows = []
-    for ln in cb.lines:
-        m = PREROUT_USED_RE.search(ln)
-        if m:
-            used_rows.append({"index": int(m.group(1)), "result": m.group(2).upper(), "raw": ln})
-
-    verdict = "FAIL"
-    Restore = ""
-    pr_index: Optional[int] = None
-
-    if not wr_no_alarm:
-        Restore = "WR found but not WR NO_ALARM"
-    elif len(used_rows) != 1:
-       Restore = f"Found {len(used_rows)} USED rows (expected 1)"
-    elif used_rows[0]["result"] != "SUCCESS":
-        Restore = "USED row is not SUCCESS"
-    else:
-        verdict = "PASS"
-        pr_index = used_rows[0]["index"]
-        Restore = "Normal"
-
-    return {
-        "has_wr": True,
-        "wr_no_alarm": wr_no_alarm,
-        "verdict": verdict,
-        "Restore": Restore,
-        "pr_index": pr_index,
-        "used_rows": used_rows,
-        "raw": "\n".join(cb.lines),
-    }
+def current_workspace() -> str:
+    # ข้อมูลที่สะสมข้ามไฟล์แยกตามผู้ใช้ที่ login ไว้ หรือตาม ?workspace= ใน URL (สร้างใหม่ให้ทุก session)
+    if st.user.get("is_logged_in") and st.user.get("email"):
+        return st.user["email"]
+    if not st.query_params.get("workspace"):
+        st.query_params["workspace"] = uuid.uuid4().hex[:12]
+
+    return st.query_params["workspace"]
+
+
+def board_data_key(board: str, state_prefix: str, *extra) -> str:
+    # ตัวตนของข้อมูล board แบบไม่ต้อง hash ข้อมูล: key ของไฟล์ที่อัปโหลด + เวอร์ชัน reference
+    return ":".join(str(part) for part in (st.session_state.get(f"{state_prefix}_key"), references.version(board), *extra))
+
 
 # Sidebar
 menu = st.sidebar.radio("เลือกกิจกรรม", [
@@ -178,9 +62,16 @@ menu = st.sidebar.radio("เลือกกิจกรรม", [
     "Fiber Flapping",
     "Loss between Core & EOL",
     "Preset status",
+    "History",
     "Reference Sheet",
 ])
 
+# จับเวลาแต่ละ stage ของรอบนี้; ?perf=1 เปิดแผง Performance และวัด memory ด้วย
+profile_log = get_profile_log()
+profile_run = profile_log.begin_run(menu, trace_memory=perf_enabled())
+if perf_enabled():
+    render_performance_panel(profile_log, menu)
+
 if menu == "หน้าแรก":
     st.subheader("DWDM Monitoring Dashboard")
 
@@ -189,149 +80,69 @@ if menu == "CPU":
     st.markdown("### Upload CPU File")
 
     # Upload & cache
-    uploaded_cpu = st.file_uploader("Upload CPU File", type=["xlsx"], key="cpu")
+    uploaded_cpu = st.file_uploader("Upload CPU File", type=UPLOAD_TYPES, key="cpu")
     if uploaded_cpu:
-        st.session_state.cpu_data = pd.read_excel(uploaded_cpu)
+        df_upload = ExcelUploader.read_in_background(uploaded_cpu, BOARD_SPECS["CPU"].export_plan)
+        if df_upload is None:
+            st.stop()  # ยังอ่านไฟล์อยู่ หน้าจะ rerun เองเมื่ออ่านเสร็จ
+        st.session_state.cpu_key = record_history("CPU", uploaded_cpu, df_upload)
+        st.session_state.cpu_data = df_upload
         st.success("CPU file uploaded and stored")
 
     # Process
     if st.session_state.get("cpu_data") is not None:
         try:
-            df_cpu = st.session_state.cpu_data.copy()
-            # ทำความสะอาดชื่อคอลัมน์ (ให้แนวทางเดียวกับ line)
-            df_cpu.columns = (
-                df_cpu.columns.astype(str)
-                .str.strip().str.replace(r"\s+", " ", regex=True)
-                .str.replace("\u00a0", " ")
-            )
+            # รวมกับ reference + เรียงตาม order (components/boards.py)
+            df_result = build_board("CPU", st.session_state.cpu_data, references.get("CPU"))
 
-            # ตรวจคอลัมน์ที่จำเป็น
-            required_cols = {"ME", "Measure Object", "CPU utilization ratio"}
-            if not required_cols.issubset(df_cpu.columns):
-                st.error(f"CPU file must contain columns: {', '.join(sorted(required_cols))}")
-                st.stop()
-
-            # สร้าง Mapping Format
-            df_cpu["Mapping Format"] = (
-                df_cpu["ME"].astype(str).str.strip()
-                + df_cpu["Measure Object"].astype(str).str.strip()
-            )
-
-            # โหลด reference
-            df_ref = pd.read_excel("data/CPU.xlsx")
-            df_ref.columns = (
-                df_ref.columns.astype(str)
-                .str.encode("ascii", "ignore").str.decode("utf-8")
-                .str.replace(r"\s+", " ", regex=True)
-                .str.strip()
-            )
-
-            required_ref_cols = {"Mapping", "Maximum threshold", "Minimum threshold"}
-            if not required_ref_cols.issubset(df_ref.columns):
-                st.error(f"Reference file must contain columns: {', '.join(sorted(required_ref_cols))}")
-                st.stop()
-
-            df_ref["Mapping"] = df_ref["Mapping"].astype(str).str.strip()
-            # ✅ สร้าง order ตามลำดับในไฟล์ ref (เหมือน line)
-            df_ref["order"] = range(len(df_ref))
-
-            # เลือกคอลัมน์จาก ref ที่จะ merge (เผื่อมี Site/CallID/Route)
-            ref_cols = ["Mapping", "Maximum threshold", "Minimum threshold", "order"]
-            for extra in ["Site Name", "Call ID", "Route"]:
-                if extra in df_ref.columns:
-                    ref_cols.append(extra)
-
-            # Merge
-            df_merged = pd.merge(
-                df_cpu,
-                df_ref[ref_cols],
-                left_on="Mapping Format",
-                right_on="Mapping",
-                how="inner"
-            )
-
-            if df_merged.empty:
+            if df_result.empty:
                 st.warning("No matching mapping found between CPU file and reference")
             else:
-                base_cols = [
-                    "ME", "Measure Object",
-                    "Maximum threshold", "Minimum threshold",
-                    "CPU utilization ratio", "order"
-                ]
-                opt_cols = [c for c in ["Site Name", "Call ID", "Route"] if c in df_merged.columns]
-                show_cols = opt_cols + base_cols
-
-                df_result = df_merged[show_cols].copy()
-                # ✅ เรียงตาม order จาก ref แล้วลบทิ้ง
-                df_result = df_result.sort_values("order").drop(columns=["order"]).reset_index(drop=True)
-
                 # ✅ ใช้ฟิลเตอร์แบบไล่ชั้น (ไม่เหมือน line board)
                 df_filtered, _sel = cascading_filter(
                     df_result,
                     cols=["Site Name", "ME", "Measure Object"],
                     ns="cpu",
+                    data_key=board_data_key("CPU", "cpu"),
                     clear_text="Clear CPU Filters"
                 )
                 st.caption(f"CPU (showing {len(df_filtered)}/{len(df_result)} rows)")
 
-                # ตัวเลขสำหรับเปรียบเทียบ/format
-                for c in ["CPU utilization ratio", "Maximum threshold", "Minimum threshold"]:
-                    if c in df_filtered.columns:
-                        df_filtered[c] = pd.to_numeric(df_filtered[c], errors="coerce")
-
-                df_view = df_filtered.copy()
-
-                # เงื่อนไข “ทั้งแถวเป็นเทา”
-                def row_has_issue(r):
-                    v  = r.get("CPU utilization ratio")
-                    lo = r.get("Minimum threshold")
-                    hi = r.get("Maximum threshold")
-                    try:
-                        return (pd.notna(v) and pd.notna(lo) and pd.notna(hi) and (v < lo or v > hi))
-                    except:
-                        return False
-
-                styled = (
-                    df_view.style
-                    # เทาทั้งแถวถ้ามีปัญหา
-                    .apply(lambda r: ['background-color:#e6e6e6;color:black' if row_has_issue(r) else '' for _ in r], axis=1)
-                    # แดงเฉพาะช่อง CPU utilization ratio ที่นอก threshold
-                    .apply(lambda _:
-                        ['background-color:#ff4d4d;color:white'
-                         if (pd.notna(v) and pd.notna(hi) and pd.notna(lo) and (v > hi or v < lo))
-                         else ''
-                         for v, hi, lo in zip(
-                             df_view.get("CPU utilization ratio", pd.Series(index=df_view.index)),
-                             df_view.get("Maximum threshold", pd.Series(index=df_view.index)),
-                             df_view.get("Minimum threshold", pd.Series(index=df_view.index)),
-                         )
-                    ], subset=["CPU utilization ratio"] if "CPU utilization ratio" in df_view.columns else [])
-                    # ฟ้าให้ Route ที่เป็น Preset (ถ้ามี)
-                    .apply(lambda _:
-                        ['background-color:lightblue;color:black' if str(x).startswith("Preset") else ''
-                         for x in df_view["Route"]] if "Route" in df_view.columns else [],
-                        subset=["Route"] if "Route" in df_view.columns else []
-                    )
-                    .format({
+                df_view = df_filtered
+
+                # ตรวจเงื่อนไขครั้งเดียว ใช้ทั้งไฮไลท์และแบนเนอร์
+                issues = evaluate_board("CPU", df_view)
+
+                st.markdown("### CPU Performance")
+                render_table(
+                    df_view,
+                    ns="cpu_table",
+                    styles=[
+                        # เทาทั้งแถวถ้ามีปัญหา
+                        CellStyle(issues.rows, 'background-color:#e6e6e6;color:black'),
+                        # แดงเฉพาะช่อง CPU utilization ratio ที่นอก threshold
+                        CellStyle(issues.cell("CPU utilization ratio"), 'background-color:#ff4d4d;color:white', "CPU utilization ratio"),
+                        # ฟ้าให้ Route ที่เป็น Preset (ถ้ามี)
+                        CellStyle(preset_route_mask(df_view), 'background-color:lightblue;color:black', "Route"),
+                    ],
+                    formats={
                         "CPU utilization ratio": "{:.2f}",
                         "Maximum threshold": "{:.2f}",
                         "Minimum threshold": "{:.2f}",
-                    })
+                    },
                 )
 
-                st.markdown("### CPU Performance")
-                st.write(styled)
-
                 # สรุปสถานะ (อิงข้อมูลหลังฟิลเตอร์)
-                failed_rows = df_view.apply(row_has_issue, axis=1)
                 st.markdown(
                     "<div style='text-align:center; font-size:32px; font-weight:bold; color:{};'>CPU Performance {}</div>".format(
-                        "red" if failed_rows.any() else "green",
-                        "Warning" if failed_rows.any() else "Normal"
+                        "red" if issues.has_issue else "green",
+                        "Warning" if issues.has_issue else "Normal"
                     ),
                     unsafe_allow_html=True
                 )
 
+        except BoardDataError as e:
+            st.error(str(e))
         except Exception as e:
             st.error(f"An error occurred during processing: {e}")
     else:
@@ -340,122 +151,51 @@ if menu == "CPU":
 
 elif menu == "FAN":
     st.markdown("### Upload FAN File")
-    uploaded_fan = st.file_uploader("Upload FAN File", type=["xlsx"], key="fan")
+    uploaded_fan = st.file_uploader("Upload FAN File", type=UPLOAD_TYPES, key="fan")
 
     # cache to session
     if uploaded_fan:
-        st.session_state.fan_data = pd.read_excel(uploaded_fan)
+        df_upload = ExcelUploader.read_in_background(uploaded_fan, BOARD_SPECS["FAN"].export_plan)
+        if df_upload is None:
+            st.stop()  # ยังอ่านไฟล์อยู่ หน้าจะ rerun เองเมื่ออ่านเสร็จ
+        st.session_state.fan_key = record_history("FAN", uploaded_fan, df_upload)
+        st.session_state.fan_data = df_upload
         st.success("FAN file uploaded and stored")
 
     # use from session
     if st.session_state.get("fan_data") is not None:
         try:
-            # ---------- Prepare data ----------
-            df_fan = st.session_state.fan_data.copy()
-            df_fan.columns = (
-                df_fan.columns.astype(str)
-                .str.strip().str.replace(r"\s+", " ", regex=True)
-                .str.replace("\u00a0", " ")
-            )
-
-            required_cols = {"ME", "Measure Object", "Begin Time", "End Time", "Value of Fan Rotate Speed(Rps)"}
-            if not required_cols.issubset(df_fan.columns):
-                st.error(f"Uploaded file must contain columns: {', '.join(sorted(required_cols))}")
-                st.write("Detected columns:", df_fan.columns.tolist())
-                st.stop()
-
-            # Mapping key (unchanged)
-            df_fan["Mapping Format"] = (
-                df_fan["ME"].astype(str).str.strip()
-                + df_fan["Measure Object"].astype(str).str.strip()
-            )
-
-            # ---------- Reference ----------
-            df_ref = pd.read_excel("data/FAN.xlsx")
-            df_ref.columns = (
-                df_ref.columns.astype(str)
-                .str.strip().str.replace(r"\s+", " ", regex=True)
-                .str.replace("\u00a0", " ")
-            )
-
-            # keep important columns; note: spelling 'Minimun threshold' preserved per your file
-            df_ref_subset = df_ref[["Mapping", "Site Name", "Maximum threshold", "Minimun threshold"]].copy()
-            df_ref_subset["Mapping"] = df_ref_subset["Mapping"].astype(str).str.strip()
-
-            # ✅ add reference order (like Line/CPU) for display sorting
-            df_ref_subset["order"] = range(len(df_ref_subset))
-
-            # ---------- Merge ----------
-            df_merged = pd.merge(
-                df_fan,
-                df_ref_subset,
-                left_on="Mapping Format",
-                right_on="Mapping",
-                how="inner"
-            )
-
-            if not df_merged.empty:
-                df_result = df_merged[[
-                    "Begin Time", "End Time", "Site Name", "ME", "Measure Object",
-                    "Maximum threshold", "Minimun threshold", "Value of Fan Rotate Speed(Rps)", "order"
-                ]].copy()
-
-                # ✅ sort by reference order for consistent display
-                df_result = df_result.sort_values("order").drop(columns=["order"]).reset_index(drop=True)
+            # ---------- Merge with reference (components/boards.py) ----------
+            df_result = build_board("FAN", st.session_state.fan_data, references.get("FAN"))
 
+            if not df_result.empty:
                 # ---------- Cascading filters (like CPU) ----------
                 df_filtered, _sel = cascading_filter(
                     df_result,
                     cols=["Site Name", "ME", "Measure Object"],
                     ns="fan",
+                    data_key=board_data_key("FAN", "fan"),
                     clear_text="Clear FAN Filters"
                 )
                 st.caption(f"FAN (showing {len(df_filtered)}/{len(df_result)} rows)")
 
                 # ---------- Styling ----------
-                # numeric cast for display
-                if "Value of Fan Rotate Speed(Rps)" in df_filtered.columns:
-                    df_filtered["Value of Fan Rotate Speed(Rps)"] = pd.to_numeric(
-                        df_filtered["Value of Fan Rotate Speed(Rps)"], errors="coerce"
-                    )
-
-                def is_not_ok(row):
-                    """KEEP ORIGINAL LOGIC: FCC/FCPP/FCPL/FCPS thresholds"""
-                    mo = str(row["Measure Object"])
-                    val = row["Value of Fan Rotate Speed(Rps)"]
-                    if pd.isna(val):
-                        return False
-                    if "FCC" in mo and val > 120:
-                        return True
-                    elif "FCPP" in mo and val > 250:
-                        return True
-                    elif "FCPL" in mo and val > 120:
-                        return True
-                    elif "FCPS" in mo and val > 230:
-                        return True
-                    else:
-                        return False
-
-                df_view = df_filtered.copy()
-                highlight_mask = df_view.apply(is_not_ok, axis=1)
-
-                # gray whole row when issue
-                def gray_row(r):
-                    return ['background-color:#e6e6e6;color:black' if highlight_mask.iloc[r.name] else '' for _ in r]
-
-                # red only the value column when issue
-                def red_value(_):
-                    return ['background-color:#ff4d4d;color:white' if m else '' for m in highlight_mask]
-
-                styled_df = (
-                    df_view.style
-                    .apply(gray_row, axis=1)
-                    .apply(red_value, subset=["Value of Fan Rotate Speed(Rps)"])
-                    .format({"Value of Fan Rotate Speed(Rps)": "{:.2f}"})
-                )
+                df_view = df_filtered
+                # FCC/FCPP/FCPL/FCPS limits live in components/rules.py
+                highlight_mask = evaluate_board("FAN", df_view).rows
 
                 st.markdown("### FAN Performance")
-                st.write(styled_df, use_container_width=True)
+                render_table(
+                    df_view,
+                    ns="fan_table",
+                    styles=[
+                        # gray whole row when issue
+                        CellStyle(highlight_mask, 'background-color:#e6e6e6;color:black'),
+                        # red only the value column when issue
+                        CellStyle(highlight_mask, 'background-color:#ff4d4d;color:white', "Value of Fan Rotate Speed(Rps)"),
+                    ],
+                    formats={"Value of Fan Rotate Speed(Rps)": "{:.2f}"},
+                )
 
                 # ---------- Status banner (consistent wording) ----------
                 st.markdown(
@@ -469,6 +209,8 @@ elif menu == "FAN":
             else:
                 st.info("No matching mapping found between FAN file and reference")
 
+        except BoardDataError as e:
+            st.error(str(e))
         except Exception as e:
             st.error(f"An error occurred during processing: {e}")
     else:
@@ -478,110 +220,53 @@ elif menu == "FAN":
 elif menu == "MSU":
     st.markdown("### Upload MSU File")
 
-    uploaded_msu = st.file_uploader("Upload MSU File", type=["xlsx"], key="msu")
+    uploaded_msu = st.file_uploader("Upload MSU File", type=UPLOAD_TYPES, key="msu")
     if uploaded_msu:
-        df_msu = pd.read_excel(uploaded_msu)
+        df_msu = ExcelUploader.read_in_background(uploaded_msu, BOARD_SPECS["MSU"].export_plan)
+        if df_msu is None:
+            st.stop()  # ยังอ่านไฟล์อยู่ หน้าจะ rerun เองเมื่ออ่านเสร็จ
+        st.session_state.msu_key = record_history("MSU", uploaded_msu, df_msu)
         st.session_state.msu_data = df_msu
         st.success("MSU file uploaded and stored")
 
     if st.session_state.get("msu_data") is not None:
         try:
-            df_msu = st.session_state.msu_data.copy()
-            df_msu.columns = (
-                df_msu.columns.astype(str)
-                .str.strip().str.replace(r'\s+', ' ', regex=True)
-                .str.replace('\u00a0', ' ')
-            )
-
-            # ตรวจสอบคอลัมน์ที่ต้องมี
-            required_cols = {"ME", "Measure Object", "Laser Bias Current(mA)"}
-            if not required_cols.issubset(df_msu.columns):
-                st.error(f"MSU file must contain columns: {', '.join(sorted(required_cols))}")
-                st.stop()
-
-            # สร้าง Mapping key
-            df_msu["Mapping Format"] = (
-                df_msu["ME"].astype(str).str.strip() +
-                df_msu["Measure Object"].astype(str).str.strip()
-            )
-
-            # โหลด Reference
-            df_ref = pd.read_excel("data/MSU.xlsx")
-            df_ref.columns = (
-                df_ref.columns.astype(str)
-                .str.strip().str.replace(r'\s+', ' ', regex=True)
-                .str.replace('\u00a0', ' ')
-            )
-
-            # ตรวจสอบคอลัมน์ใน reference
-            required_ref_cols = {"Site Name", "Mapping", "Maximum threshold"}
-            if not required_ref_cols.issubset(df_ref.columns):
-                st.error(f"Reference file must contain columns: {', '.join(sorted(required_ref_cols))}")
-                st.stop()
-
-            df_ref["Mapping"] = df_ref["Mapping"].astype(str).str.strip()
-            df_ref["order"] = range(len(df_ref))
-
-            # Merge
-            df_merged = pd.merge(
-                df_msu,
-                df_ref[["Site Name", "Mapping", "Maximum threshold", "order"]],
-                left_on="Mapping Format",
-                right_on="Mapping",
-                how="inner"
-            )
-
-            if not df_merged.empty:
-                # เลือกคอลัมน์ที่ต้องใช้ + เรียงตาม order
-                df_result = (
-                    df_merged[["Site Name", "ME", "Measure Object", "Maximum threshold", "Laser Bias Current(mA)", "order"]]
-                    .sort_values("order")
-                    .drop(columns=["order"])
-                    .reset_index(drop=True)
-                )
+            # รวมกับ reference + เรียงตาม order
+            df_result = build_board("MSU", st.session_state.msu_data, references.get("MSU"))
 
+            if not df_result.empty:
                 # Filter
                 df_filtered, _sel = cascading_filter(
                     df_result,
                     cols=["Site Name", "ME", "Measure Object"],
                     ns="msu",
+                    data_key=board_data_key("MSU", "msu"),
                     clear_text="Clear MSU Filters"
                 )
                 st.caption(f"MSU (showing {len(df_filtered)}/{len(df_result)} rows)")
 
-                # แปลงเป็นตัวเลข
-                for c in ["Laser Bias Current(mA)", "Maximum threshold"]:
-                    df_filtered[c] = pd.to_numeric(df_filtered[c], errors="coerce")
-
-                # ฟังก์ชันตรวจเงื่อนไข
-                def is_not_ok(row):
-                    return row["Laser Bias Current(mA)"] > row["Maximum threshold"]
-
-                # ไฮไลท์: แดงเฉพาะคอลัมน์ Laser Bias ที่ผิด
-                def red_value(_):
-                    return [
-                        'background-color:#ff4d4d;color:white' if is_not_ok(row) else ''
-                        for _, row in df_filtered.iterrows()
-                    ]
-
-                styled_df = (
-                    df_filtered.style
-                    .apply(red_value, subset=["Laser Bias Current(mA)"])
-                    .format({
+                # ตรวจเงื่อนไขครั้งเดียว
+                issues = evaluate_board("MSU", df_filtered)
+
+                st.markdown("### MSU Performance")
+                render_table(
+                    df_filtered,
+                    ns="msu_table",
+                    styles=[
+                        # ไฮไลท์: แดงเฉพาะคอลัมน์ Laser Bias ที่ผิด
+                        CellStyle(issues.cell("Laser Bias Current(mA)"), 'background-color:#ff4d4d;color:white', "Laser Bias Current(mA)"),
+                    ],
+                    formats={
                         "Laser Bias Current(mA)": "{:.2f}",
                         "Maximum threshold": "{:.2f}",
-                    })
+                    },
                 )
 
-                st.markdown("### MSU Performance")
-                st.write(styled_df, use_container_width=True)
-
                 # Status
-                failed_rows = df_filtered.apply(is_not_ok, axis=1)
                 st.markdown(
                     "<div style='text-align:center; font-size:32px; font-weight:bold; color:{};'>MSU Performance {}</div>".format(
-                        "red" if failed_rows.any() else "green",
-                        "Warning" if failed_rows.any() else "Normal"
+                        "red" if issues.has_issue else "green",
+                        "Warning" if issues.has_issue else "Normal"
                     ),
                     unsafe_allow_html=True
                 )
@@ -589,6 +274,8 @@ elif menu == "MSU":
             else:
                 st.warning("No matching mapping found between MSU file and reference")
 
+        except BoardDataError as e:
+            st.error(str(e))
         except Exception as e:
             st.error(f"An error occurred during processing: {e}")
     else:
@@ -599,146 +286,70 @@ elif menu == "Client board":
     st.markdown("### Upload Client File")
 
     # Upload Client File
-    uploaded_client = st.file_uploader("Upload Client File", type=["xlsx"], key="client")
+    uploaded_client = st.file_uploader("Upload Client File", type=UPLOAD_TYPES, key="client")
     if uploaded_client:
-        df_client = pd.read_excel(uploaded_client)
+        df_client = ExcelUploader.read_in_background(uploaded_client, BOARD_SPECS["Client"].export_plan)
+        if df_client is None:
+            st.stop()  # ยังอ่านไฟล์อยู่ หน้าจะ rerun เองเมื่ออ่านเสร็จ
+        st.session_state.client_key = record_history("Client", uploaded_client, df_client)
         st.session_state.client_data = df_client
         st.success("Client file uploaded and stored")
 
     # ใช้จาก session ถ้ามีข้อมูล
     if st.session_state.get("client_data") is not None:
         try:
-            # เตรียม DataFrame
-            df_client = st.session_state.client_data.copy()
-            df_client.columns = (
-                df_client.columns.astype(str)
-                .str.strip().str.replace(r'\s+', ' ', regex=True)
-                .str.replace('\u00a0', ' ')
-            )
-
-            # ตรวจสอบคอลัมน์ที่จำเป็น
-            required_cols = {"ME", "Measure Object", "Input Optical Power(dBm)", "Output Optical Power (dBm)"}
-            if not required_cols.issubset(df_client.columns):
-                st.error(f"Client file must contain columns: {', '.join(required_cols)}")
-                st.stop()
-
-            # สร้าง Mapping Format (คงตรรกะเดิม)
-            df_client["Mapping Format"] = (
-                df_client["ME"].astype(str).str.strip()
-                + df_client["Measure Object"].astype(str).str.strip()
-            )
-
-            # โหลด Reference File
-            df_ref = pd.read_excel("data/Client.xlsx")
-            df_ref.columns = (
-                df_ref.columns.astype(str)
-                .str.encode('ascii', 'ignore').str.decode('utf-8')
-                .str.replace(r'\s+', ' ', regex=True)
-                .str.strip()
-            )
+            col_out = COL_OUT
+            col_in = COL_IN
+            col_max_out = COL_MAX_OUT
+            col_min_out = COL_MIN_OUT
+            col_max_in = COL_MAX_IN
+            col_min_in = COL_MIN_IN
 
-            # ตรวจสอบคอลัมน์ใน reference
-            required_ref_cols = {
-                "Mapping", "Maximum threshold(out)", "Minimum threshold(out)",
-                "Maximum threshold(in)", "Minimum threshold(in)"
-            }
-            if not required_ref_cols.issubset(df_ref.columns):
-                st.error(f"Reference file must contain columns: {', '.join(required_ref_cols)}")
-                st.stop()
-
-            df_ref["Mapping"] = df_ref["Mapping"].astype(str).str.strip()
-
-            col_out = "Output Optical Power (dBm)"
-            col_in = "Input Optical Power(dBm)"
-            col_max_out = "Maximum threshold(out)"
-            col_min_out = "Minimum threshold(out)"
-            col_max_in = "Maximum threshold(in)"
-            col_min_in = "Minimum threshold(in)"
-
-            # ✅ เพิ่ม order ใน reference เพื่อคุมลำดับแสดงผลตามไฟล์ ref
-            df_ref["order"] = range(len(df_ref))
-
-            # Merge ข้อมูล (พก order มาด้วย)
-            df_merged = pd.merge(
-                df_client,
-                df_ref[["Site Name", "Mapping", col_max_out, col_min_out, col_max_in, col_min_in, "order"]],
-                left_on="Mapping Format",
-                right_on="Mapping",
-                how="inner"
-            )
+            # รวมกับ reference + เรียงตาม order + แปลงตัวเลข
+            df_result = build_board("Client", st.session_state.client_data, references.get("Client"))
 
             # ตรวจสอบผลลัพธ์
-            if not df_merged.empty:
-                # ✅ เรียงตาม order จาก ref แล้วจัดคอลัมน์ที่จะแสดง
-                df_merged = df_merged.sort_values("order").reset_index(drop=True)
-
-                df_result = df_merged[[
-                    "Site Name", "ME", "Measure Object",
-                    col_max_out, col_min_out, col_out,
-                    col_max_in,  col_min_in, col_in
-                ]].copy()
-
-                # ✅ แปลงตัวเลขให้ชัวร์ก่อนใช้เทียบ
-                for c in [col_out, col_in, col_max_out, col_min_out, col_max_in, col_min_in]:
-                    if c in df_result.columns:
-                        df_result.loc[:, c] = pd.to_numeric(df_result[c], errors="coerce")
-
+            if not df_result.empty:
                 # --------- เพิ่ม Filter แบบไล่ชั้น (ให้เหมือนเมนูอื่น) ---------
                 df_filtered, _sel = cascading_filter(
                     df_result,
                     cols=["Site Name", "ME", "Measure Object"],
                     ns="client",
+                    data_key=board_data_key("Client", "client"),
                     clear_text="Clear Client Filters"
                 )
                 st.caption(f"Client (showing {len(df_filtered)}/{len(df_result)} rows)")
 
                 # --------- ไฮไลท์เหมือนเมนูอื่น: เทาทั้งแถว + แดงเฉพาะค่าที่ผิด ---------
-                def row_has_issue(r):
-                    try:
-                        return (
-                            (r[col_out] > r[col_max_out]) or (r[col_out] < r[col_min_out]) or
-                            (r[col_in]  > r[col_max_in])  or (r[col_in]  < r[col_min_in])
-                        )
-                    except Exception:
-                        return False
-
-                def highlight_critical_cells(val, colname, row):
-                    try:
-                        if colname == col_out:
-                            return 'background-color:#ff4d4d; color:white' if (val > row[col_max_out] or val < row[col_min_out]) else ''
-                        elif colname == col_in:
-                            return 'background-color:#ff4d4d; color:white' if (val > row[col_max_in] or val < row[col_min_in]) else ''
-                        return ''
-                    except Exception:
-                        return ''
-
-                df_view = df_filtered.copy()
-
-                styled_df = (
-                    df_view.style
-                    # เทาทั้งแถวเมื่อมีปัญหา
-                    .apply(lambda r: ['background-color:#e6e6e6; color:black' if row_has_issue(r) else '' for _ in r], axis=1)
-                    # แดงเฉพาะค่าที่ผิด (ทั้ง out/in)
-                    .apply(lambda row: [highlight_critical_cells(row[colname], colname, row) for colname in df_view.columns], axis=1)
-                    .format({
+                df_view = df_filtered
+                issues = evaluate_board("Client", df_view)
+
+                st.markdown("### Client Performance")
+                render_table(
+                    df_view,
+                    ns="client_table",
+                    styles=[
+                        # เทาทั้งแถวเมื่อมีปัญหา
+                        CellStyle(issues.rows, 'background-color:#e6e6e6; color:black'),
+                        # แดงเฉพาะค่าที่ผิด (ทั้ง out/in)
+                        CellStyle(issues.cell(col_out), 'background-color:#ff4d4d; color:white', col_out),
+                        CellStyle(issues.cell(col_in), 'background-color:#ff4d4d; color:white', col_in),
+                    ],
+                    formats={
                         col_max_out: "{:.2f}",
                         col_min_out: "{:.2f}",
                         col_max_in:  "{:.2f}",
                         col_min_in:  "{:.2f}",
                         col_out:     "{:.2f}",
                         col_in:      "{:.2f}",
-                    })
+                    },
                 )
 
-                st.markdown("### Client Performance")
-                st.write(styled_df, use_container_width=True)
-
                 # --------- แบนเนอร์สถานะ (สอดคล้องกับเมนูอื่น) ---------
-                failed_rows = df_view.apply(row_has_issue, axis=1)
                 st.markdown(
                     "<div style='text-align:center; font-size:32px; font-weight:bold; color:{};'>Client Performance {}</div>".format(
-                        "red" if failed_rows.any() else "green",
-                        "Warning" if failed_rows.any() else "Normal"
+                        "red" if issues.has_issue else "green",
+                        "Warning" if issues.has_issue else "Normal"
                     ),
                     unsafe_allow_html=True
                 )
@@ -746,6 +357,8 @@ elif menu == "Client board":
             else:
                 st.warning("No matching mapping found between Client file and reference")
 
+        except BoardDataError as e:
+            st.error(str(e))
         except Exception as e:
             st.error(f"An error occurred during processing: {e}")
     else:
@@ -756,60 +369,22 @@ elif menu == "Line board":
     st.markdown("### Upload Line cards performance File")
 
     # ใช้ key แบบสั้นเฉพาะเมนูนี้
-    uploaded_line = st.file_uploader("Upload Line cards File", type=["xlsx"], key="lb_line")
+    uploaded_line = st.file_uploader("Upload Line cards File", type=UPLOAD_TYPES, key="lb_line")
     uploaded_log  = st.file_uploader("Upload WASON Log", type=["txt"], key="lb_log")
 
-    def get_preset_map(log_text):
-        import re
-        lines = log_text.splitlines()
-        ipmap = {
-            "30.10.90.6": "HYI-4",
-            "30.10.10.6": "Jasmine",
-            "30.10.30.6": "Phu Nga",
-            "30.10.50.6": "SNI-POI",
-            "30.10.70.6": "NKS",
-            "30.10.110.6": "PKT"
-        }
-        pmap = {}
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            m = re.search(r"\[CALL\s+\d+\]\s+\[([\d.]+)\s+[\d.]+\s+(\d+)\]", line)
-            if m:
-                ip = m.group(1).strip()
-                cid = m.group(2).strip().lstrip("0")
-                site = ipmap.get(ip, "Unknown")
-                key = f"{cid} ({site})"
-                j = i + 1
-                while j < len(lines):
-                    if "[CALL" in lines[j]:
-                        break
-                    if "[PreRout]:" in lines[j]:
-                        k = j + 1
-                        while k < len(lines):
-                            if "[CALL" in lines[k]:
-                                break
-                            m2 = re.search(r"--(\d+)--WORK--\(USED\)--\(SUCCESS\)", lines[k])
-                            if m2:
-                                preset = m2.group(1).strip()
-                                pmap[key] = preset
-                                break
-                            k += 1
-                        break
-                    j += 1
-            i += 1
-        return pmap
-
-    # แคช pmap จาก log (ถ้ามี)
+    # แคช pmap จาก log (ถ้ามี) — สแกนครั้งเดียวต่อไฟล์ ผลถูกแคชตาม hash ของ log
     if uploaded_log:
-        log_text = uploaded_log.read().decode("utf-8", errors="ignore")
-        st.session_state.lb_pmap = get_preset_map(log_text)
+        st.session_state.lb_pmap = scan_wason_log(uploaded_log).preset_map
 
     pmap = st.session_state.get("lb_pmap", {})  # ใช้ที่แคชไว้ถ้าไม่มี log รอบนี้
 
     # แคชไฟล์ line (เก็บทั้ง DataFrame และชื่อไฟล์)
     if uploaded_line:
-        st.session_state.lb_data = pd.read_excel(uploaded_line)
+        df_upload = ExcelUploader.read_in_background(uploaded_line, BOARD_SPECS["Line"].export_plan)
+        if df_upload is None:
+            st.stop()  # ยังอ่านไฟล์อยู่ หน้าจะ rerun เองเมื่ออ่านเสร็จ
+        st.session_state.lb_key = record_history("Line", uploaded_line, df_upload)
+        st.session_state.lb_data = df_upload
         st.session_state.lb_file = uploaded_line.name
         st.success(f"Line cards file loaded: {st.session_state.lb_file}")
     elif st.session_state.get("lb_file"):
@@ -819,136 +394,67 @@ elif menu == "Line board":
     if st.session_state.get("lb_data") is not None:
 
         try:
-            df_line = st.session_state.lb_data.copy()
-            df_line.columns = (
-                df_line.columns.str.strip()
-                .str.replace(r'\s+', ' ', regex=True)
-                .str.replace('\u00a0', ' ')
-            )
-
-            df_ref = pd.read_excel("data/Line.xlsx")
-            df_ref.columns = (
-                df_ref.columns.astype(str)
-                .str.replace(r'\s+', ' ', regex=True)
-                .str.replace('\u00a0', ' ')
-                .str.strip()
-            )
-
-            # เพิ่มลำดับไว้ใช้เรียงภายหลัง
-            df_ref["order"] = range(len(df_ref))
-
-            required_cols = {"ME", "Measure Object", "Instant BER After FEC", "Input Optical Power(dBm)", "Output Optical Power (dBm)"}
-            if not required_cols.issubset(df_line.columns):
-                st.error(f"Line cards file must contain columns: {', '.join(required_cols)}")
-                st.stop()
-
-            df_line["Mapping Format"] = df_line["ME"].astype(str).str.strip() + df_line["Measure Object"].astype(str).str.strip()
-            df_ref["Mapping"] = df_ref["Mapping"].astype(str).str.strip()
-
-            col_out = "Output Optical Power (dBm)"
-            col_in = "Input Optical Power(dBm)"
-            col_max_out = "Maximum threshold(out)"
-            col_min_out = "Minimum threshold(out)"
-            col_max_in = "Maximum threshold(in)"
-            col_min_in = "Minimum threshold(in)"
-
-            df_merged = pd.merge(
-                df_line,
-                df_ref[["Site Name", "Mapping", "Call ID", "Threshold", col_max_out, col_min_out, col_max_in, col_min_in, "Route", "order"]],
-                left_on="Mapping Format",
-                right_on="Mapping",
-                how="inner"
-            )
+            col_out = COL_OUT
+            col_in = COL_IN
+            col_max_out = COL_MAX_OUT
+            col_min_out = COL_MIN_OUT
+            col_max_in = COL_MAX_IN
+            col_min_in = COL_MIN_IN
 
-            if not df_merged.empty:
-                df_result = df_merged[[ 
-                    "Site Name", "ME", "Mapping", "Call ID", "Measure Object", "Threshold", "Instant BER After FEC",
-                    col_max_out, col_min_out, col_out,
-                    col_max_in, col_min_in, col_in, "Route", "order"
-                ]]
-
-                df_result["Call ID"] = df_result["Call ID"].astype(str).str.strip().str.lstrip("0")
-
-                df_result["Route"] = df_result.apply(
-                    lambda r: f"Preset {pmap[r['Call ID']]}" if r['Call ID'] in pmap else r["Route"],
-                    axis=1
-                )
-
-                # เรียงตามลำดับจาก ref แล้วลบคอลัมน์ order ทิ้ง
-                df_result = df_result.sort_values("order").drop(columns=["order"]).reset_index(drop=True)
+            # รวมกับ reference, ใส่ Preset จาก log, เรียงตาม order
+            df_result = build_board("Line", st.session_state.lb_data, references.get("Line"), preset_map=pmap)
 
+            if not df_result.empty:
                 # ---------- (1) FILTER: ใช้ cascading_filter ----------
                 df_filtered, _sel = cascading_filter(
                     df_result,
                     cols=["Site Name", "ME", "Measure Object","Call ID","Route"],
                     ns="line",
+                    data_key=board_data_key("Line", "lb", hash(frozenset(pmap.items()))),
                     clear_text="Clear Line Filters"
                 )
                 st.caption(f"Line Performance (showing {len(df_filtered)}/{len(df_result)} rows)")
 
-                # ---------- เตรียมตัวเลข ----------
-                num_cols = ["Instant BER After FEC", col_out, col_in, col_max_out, col_min_out, col_max_in, col_min_in]
-                num_cols = [c for c in num_cols if c in df_filtered.columns]
+                df_view = df_filtered
 
-                df_view = df_filtered.copy()
-                df_view.loc[:, num_cols] = df_view[num_cols].apply(pd.to_numeric, errors="coerce")
-
-                # ---------- ตรรกะตรวจปัญหา ----------
-                def row_has_issue(r):
-                    return (
-                        (pd.notna(r.get("Instant BER After FEC")) and float(r["Instant BER After FEC"]) > 0) or
-                        (pd.notna(r.get(col_out)) and pd.notna(r.get(col_max_out)) and r[col_out] > r[col_max_out]) or
-                        (pd.notna(r.get(col_out)) and pd.notna(r.get(col_min_out)) and r[col_out] < r[col_min_out]) or
-                        (pd.notna(r.get(col_in)) and pd.notna(r.get(col_max_in)) and r[col_in] > r[col_max_in]) or
-                        (pd.notna(r.get(col_in)) and pd.notna(r.get(col_min_in)) and r[col_in] < r[col_min_in])
-                    )
+                # ---------- ตรรกะตรวจปัญหา (คำนวณครั้งเดียว) ----------
+                issues = evaluate_board("Line", df_view)
 
                 # ---------- (3) HIGHLIGHT: เทาทั้งแถว + แดงเฉพาะช่อง + ฟ้า Route ----------
-                styled = (
-                    df_view.style
-                    # เทาทั้งแถวถ้ามีปัญหา
-                    .apply(lambda r: ['background-color:#e6e6e6; color:black' if row_has_issue(r) else '' for _ in r], axis=1)
-                    # แดง BER
-                    .apply(lambda _: [
-                        'background-color:#ff4d4d; color:white' if (pd.notna(v) and float(v) > 0) else ''
-                        for v in df_view["Instant BER After FEC"]
-                    ], subset=["Instant BER After FEC"])
-                    # แดง Output Power
-                    .apply(lambda _: [
-                        'background-color:#ff4d4d; color:white' if (pd.notna(v) and pd.notna(hi) and pd.notna(lo) and (v > hi or v < lo)) else ''
-                        for v, hi, lo in zip(df_view[col_out], df_view[col_max_out], df_view[col_min_out])
-                    ], subset=[col_out])
-                    # แดง Input Power
-                    .apply(lambda _: [
-                        'background-color:#ff4d4d; color:white' if (pd.notna(v) and pd.notna(hi) and pd.notna(lo) and (v > hi or v < lo)) else ''
-                        for v, hi, lo in zip(df_view[col_in], df_view[col_max_in], df_view[col_min_in])
-                    ], subset=[col_in])
-                    # ฟ้า Route ที่เป็น Preset
-                    .apply(lambda _: [
-                        'background-color:lightblue; color:black' if str(x).startswith("Preset") else ''
-                        for x in df_view["Route"]
-                    ], subset=["Route"])
-                    .format({
+                st.markdown("### Line Performance")
+                render_table(
+                    df_view,
+                    ns="line_table",
+                    styles=[
+                        # เทาทั้งแถวถ้ามีปัญหา
+                        CellStyle(issues.rows, 'background-color:#e6e6e6; color:black'),
+                        # แดง BER / Output Power / Input Power
+                        CellStyle(issues.cell("Instant BER After FEC"), 'background-color:#ff4d4d; color:white', "Instant BER After FEC"),
+                        CellStyle(issues.cell(col_out), 'background-color:#ff4d4d; color:white', col_out),
+                        CellStyle(issues.cell(col_in), 'background-color:#ff4d4d; color:white', col_in),
+                        # ฟ้า Route ที่เป็น Preset
+                        CellStyle(preset_route_mask(df_view), 'background-color:lightblue; color:black', "Route"),
+                    ],
+                    formats={
                         col_out: "{:.2f}", col_in: "{:.2f}",
                         col_max_out: "{:.0f}", col_min_out: "{:.0f}",
                         col_max_in: "{:.0f}", col_min_in: "{:.0f}",
                         "Instant BER After FEC": "{:.1e}"
-                    })
+                    },
                 )
-                st.markdown("### Line Performance")
-                st.write(styled)
 
                 # สรุปสถานะอิงข้อมูลที่ถูกฟิลเตอร์แล้ว (คงเดิม)
-                failed_rows = df_view.apply(row_has_issue, axis=1)
                 st.markdown(
                     "<div style='text-align:center; font-size:32px; font-weight:bold; color:{};'>Line Performance {}</div>".format(
-                        "red" if failed_rows.any() else "green",
-                        "Warning" if failed_rows.any() else "Normal"
+                        "red" if issues.has_issue else "green",
+                        "Warning" if issues.has_issue else "Normal"
                     ),
                     unsafe_allow_html=True
                 )
             else:
                 st.warning("No matching mapping found between Line file and reference")
+        except BoardDataError as e:
+            st.error(str(e))
         except Exception as e: 
             st.error(f"An error occurred during processing: {e}")
     else:
@@ -958,65 +464,52 @@ elif menu == "Line board":
 elif menu == "Fiber Flapping":
     st.markdown("### Upload OSC & FM Files")
 
-    # Upload OSC
-    uploaded_optical = st.file_uploader("Upload OSC Optical File", type=["xlsx"], key="osc")
-    if uploaded_optical:
-        df_optical = pd.read_excel(uploaded_optical)
-        st.session_state.osc_optical_data = df_optical
-        st.success("OSC Optical File Uploaded")
-
-    # Upload FM
-    uploaded_fm = st.file_uploader("Upload FM Alarm File", type=["xlsx"], key="fm")
-    if uploaded_fm:
-        df_fm = pd.read_excel(uploaded_fm)
-        st.session_state.osc_fm_data = df_fm
-        st.success("FM Alarm File Uploaded")
-
-    # Process when both files are uploaded
-    if "osc_optical_data" in st.session_state and "osc_fm_data" in st.session_state:
-        try:
-            df_optical = st.session_state.osc_optical_data.copy()
-            df_fm = st.session_state.osc_fm_data.copy()
-
-            df_optical.columns = df_optical.columns.str.strip()
-            df_optical["Max - Min (dB)"] = (
-                df_optical["Max Value of Input Optical Power(dBm)"]
-                - df_optical["Min Value of Input Optical Power(dBm)"]
-            )
+    flapping_store = get_flapping_store(current_workspace())
+
+    # Upload FM first so new OSC rows are matched against every alarm
+    uploaded_fms = st.file_uploader("Upload FM Alarm Files", type=UPLOAD_TYPES, key="fm", accept_multiple_files=True)
+    for uploaded_fm in uploaded_fms or []:
+        file_key = ExcelUploader.cache_key(uploaded_fm, FM_PLAN)
+        if not flapping_store.has_ingested(file_key):
+            try:
+                df_upload = ExcelUploader.read_in_background(uploaded_fm, FM_PLAN)
+                if df_upload is None:
+                    continue  # ยังอ่านอยู่ ไฟล์อื่นทำต่อได้
+                added = flapping_store.add_fm(df_upload, file_key)
+                st.success(f"FM Alarm File Uploaded: {uploaded_fm.name} ({added} new alarms)")
+            except Exception as e:
+                st.error(f"Could not read {uploaded_fm.name}: {e}")
 
-            # Extract Target ME (kept for logic; will not display)
-            def extract_target(measure_obj):
-                match = re.search(r'\(([^)]+)\)', str(measure_obj))
-                return match.group(1) if match else None
-
-            df_optical["Target ME"] = df_optical["Measure Object"].apply(extract_target)
-            df_optical["Begin Time"] = pd.to_datetime(df_optical["Begin Time"], errors="coerce")
-            df_optical["End Time"] = pd.to_datetime(df_optical["End Time"], errors="coerce")
-
-            # Filter > 2dB
-            df_filtered = df_optical[df_optical["Max - Min (dB)"] > 2].copy()
-
-            df_fm.columns = df_fm.columns.str.strip()
-            df_fm["Occurrence Time"] = pd.to_datetime(df_fm["Occurrence Time"], errors="coerce")
-            df_fm["Clear Time"] = pd.to_datetime(df_fm["Clear Time"], errors="coerce")
-
-            link_col = [col for col in df_fm.columns if col.startswith("Link")][0]
-
-            # Find no-match
-            result = []
-            for _, row in df_filtered.iterrows():
-                me = re.escape(str(row["ME"]))
-                target_me = re.escape(str(row["Target ME"]))
-                matched = df_fm[
-                    df_fm[link_col].astype(str).str.contains(me, na=False) &
-                    df_fm[link_col].astype(str).str.contains(target_me, na=False) &
-                    (df_fm["Occurrence Time"] <= row["End Time"]) &
-                    (df_fm["Clear Time"] >= row["Begin Time"])
-                ]
-                if matched.empty:
-                    result.append(row)
+    # Upload OSC
+    uploaded_opticals = st.file_uploader("Upload OSC Optical Files", type=UPLOAD_TYPES, key="osc", accept_multiple_files=True)
+    for uploaded_optical in uploaded_opticals or []:
+        file_key = ExcelUploader.cache_key(uploaded_optical, OSC_PLAN)
+        if not flapping_store.has_ingested(file_key):
+            try:
+                df_upload = ExcelUploader.read_in_background(uploaded_optical, OSC_PLAN)
+                if df_upload is None:
+                    continue  # ยังอ่านอยู่ ไฟล์อื่นทำต่อได้
+                added = flapping_store.add_osc(df_upload, file_key)
+                st.success(f"OSC Optical File Uploaded: {uploaded_optical.name} ({added} new flapping intervals)")
+            except Exception as e:
+                st.error(f"Could not read {uploaded_optical.name}: {e}")
+
+    df_stored_osc = flapping_store.osc
+    df_stored_fm = flapping_store.fm
+
+    left, right = st.columns([3, 1])
+    with left:
+        st.caption(f"Stored: {len(df_stored_osc)} OSC flapping intervals, {len(df_stored_fm)} FM alarms")
+    with right:
+        with st.popover("Clear stored OSC & FM"):
+            st.caption("Removes every OSC interval and FM alarm stored in this workspace.")
+            st.button("Clear", on_click=flapping_store.clear, type="primary", key="fiber_clear")
 
-            df_nomatch = pd.DataFrame(result)
+    # Process when both kinds of files are stored
+    if len(df_stored_osc) and len(df_stored_fm):
+        try:
+            # matching happened at ingestion; only unmatched intervals are shown
+            df_nomatch = df_stored_osc[~df_stored_osc["Alarm Matched"].to_numpy(dtype=bool)]
 
             # Show result
             st.markdown("### OSC Power Flapping (No Alarm Match)")
@@ -1026,6 +519,7 @@ elif menu == "Fiber Flapping":
                     df_nomatch,
                     cols=["ME", "Measure Object"],
                     ns="fiber",
+                    data_key=f"{current_workspace()}:{flapping_store.revision}",
                     labels={"ME": "Managed Element"},
                     clear_text="Clear Fiber Filters"
                 )
@@ -1051,21 +545,20 @@ elif menu == "Fiber Flapping":
                 if num_cols:
                     df_view.loc[:, num_cols] = df_view[num_cols].apply(pd.to_numeric, errors="coerce")
 
-                # Highlight ONLY red on "Max - Min (dB)" > 2 (no gray rows)
-                styled_df = (
-                    df_view.style
-                    .apply(
-                        lambda _:
-                            ['background-color:#ff4d4d; color:white' if (v > 2) else '' 
-                             for v in df_view["Max - Min (dB)"]],
-                        subset=["Max - Min (dB)"]
-                    )
-                    .format({c: "{:.2f}" for c in num_cols})
+                # Highlight ONLY red on "Max - Min (dB)" > 2 (no gray rows), show only the highlighted table
+                render_table(
+                    df_view,
+                    ns="fiber_table",
+                    styles=[
+                        CellStyle(
+                            (pd.to_numeric(df_view["Max - Min (dB)"], errors="coerce") > 2).to_numpy(),
+                            'background-color:#ff4d4d; color:white',
+                            "Max - Min (dB)",
+                        ),
+                    ],
+                    formats={c: "{:.2f}" for c in num_cols},
                 )
 
-                # Show only the highlighted table
-                st.write(styled_df, use_container_width=True)
-
                 # Daily graph (based on filtered view)
                 df_view["Date"] = pd.to_datetime(df_view["Begin Time"]).dt.date
                 site_count = df_view.groupby("Date")["ME"].nunique().reset_index()
@@ -1106,33 +599,29 @@ elif menu == "Preset status":
     </style>
     """, unsafe_allow_html=True)
 
-    up = st.file_uploader("Upload MobaXterm log (.txt)", type=["txt"], key="preset_file")
-    if not up:
-        st.info("Drop a log file to analyze.")
+    uploads = st.file_uploader(
+        "Upload MobaXterm logs (.txt, one per node)", type=["txt"], key="preset_file", accept_multiple_files=True
+    )
+    if not uploads:
+        st.info("Drop one or more log files to analyze.")
         st.stop()
 
-    text = up.read().decode("utf-8", errors="ignore")
-    calls = parse_calls(text)  # <- helper defined above
-
-    # keep only calls with WR
-    rows = []
-    for cb in calls:
-        res = evaluate_preset_status(cb)  # <- helper defined above
-        if res.get("has_wr"):
-            rows.append({
-                "Call": cb.call_id,
-                "Triple": cb.triple,
-                "Preroute": res.get("pr_index"),
-                "Verdict": res.get("verdict"),
-                "Restore": res.get("Restore"),
-                "Raw": res.get("raw"),
-            })
-
-    if not rows:
-        st.warning("No CALLs with WR were found in this file.")
+    # keep only calls with WR; logs are scanned in parallel (one worker per log) and cached,
+    # raw text is read back by offset. The same uploads keep their scan in the session,
+    # so widget reruns skip even the hashing
+    logs = list(uploads)
+    scan_key = tuple((up.file_id, up.size) for up in uploads)
+    if st.session_state.get("preset_scan_key") != scan_key:
+        with st.spinner(f"Analyzing {len(uploads)} log(s)..."):
+            st.session_state.preset_scan = scan_wason_logs([(up.name, up) for up in uploads])
+        st.session_state.preset_scan_key = scan_key
+    scan = st.session_state.preset_scan
+
+    if not scan.calls:
+        st.warning("No CALLs with WR were found in these files.")
         st.stop()
 
-    df = pd.DataFrame(rows).sort_values("Call").reset_index(drop=True)
+    df = scan.summary
     total = len(df); passes = int((df["Verdict"] == "PASS").sum()); fails = int((df["Verdict"] == "FAIL").sum())
 
     # KPIs
@@ -1148,19 +637,26 @@ elif menu == "Preset status":
     with right:
         st.download_button(
             "Download summary (CSV)",
-            df.drop(columns=["Raw"]).to_csv(index=False).encode("utf-8"),
+            scan.summary_csv,
             file_name="preset_summary.csv",
             mime="text/csv",
             use_container_width=True
         )
 
     view = df if not only_abnormal else df[df["Verdict"] == "FAIL"]
-    st.dataframe(view.drop(columns=["Raw"]), use_container_width=True, hide_index=True)
+    st.dataframe(view.drop(columns=LOCATION_COLS), use_container_width=True, hide_index=True)
 
-    # per-call cards
-    for _, r in view.iterrows():
+    # per-call cards: searchable and paged, raw log is only read for cards that are opened
+    query = st.text_input("Search calls (node, Call ID, triple or reason)", key="preset_search").strip().lower()
+    if query:
+        view = view[scan.search_text.loc[view.index].str.contains(query, regex=False).to_numpy()]
+        if view.empty:
+            st.info("No calls match this search.")
+
+    window = paginate(len(view), ns="preset_cards", page_size=10, options=[10, 25, 50])
+    for r in view.iloc[window].itertuples(index=False):
         with st.container(border=True):
-            st.markdown(f"**Call {int(r.Call)}** · `{r.Triple}`")
+            st.markdown(f"**{r.Node} · Call {int(r.Call)}** · `{r.Triple}`")
             if r.Verdict == "PASS":
                 st.success("normal")
                 st.write(f"Call {int(r.Call)} [{r.Triple}] uses preroute #{int(r.Preroute)}")
@@ -1176,8 +672,8 @@ elif menu == "Preset status":
                 if pd.notna(r.Preroute):
                     st.markdown(f'<span class="pill pill-blue">Preroute #{int(r.Preroute)}</span>', unsafe_allow_html=True)
 
-            with st.expander("Show raw log"):
-                st.code(str(r.Raw), language="text")
+            if st.toggle("Show raw log", key=f"preset_raw_{int(r.Log)}_{int(r.Start)}"):
+                st.code(read_call_text(logs[int(r.Log)], int(r.Start), int(r.End)), language="text")
 
                 
 
@@ -1185,7 +681,11 @@ elif menu == "Preset status":
 elif menu == "Loss between Core & EOL":
     st.markdown("### Please upload files")
 
-    uploader.upload("Raw Optical Attenuation", SessionStateEnum.EOL_DATA)
+    uploader.upload("Raw Optical Attenuation", SessionStateEnum.EOL_DATA, ATTENUATION_PLAN)
+
+    if not database.ping():
+        st.error("Cannot reach the reference database, please try again later")
+        st.stop()
 
     analysis_type = st.radio(
         "Choose analysis type:",
@@ -1200,12 +700,67 @@ elif menu == "Loss between Core & EOL":
     analyzer = analyzer_class[analysis_type](
         session[SessionStateEnum.REFERENCE_SHEET],
         session[SessionStateEnum.EOL_DATA],
+        database,
     )
 
     analyzer.process()
 
+# region History
+elif menu == "History":
+    st.markdown("### History")
+
+    board = st.selectbox("Board", list(BOARD_SPECS), format_func=lambda b: BOARD_SPECS[b].label, key="hist_board")
+    days = history.days(board)
+
+    if not days:
+        st.info(f"No {BOARD_SPECS[board].label} uploads stored yet. Every uploaded file is kept here.")
+    else:
+        with st.expander(f"Stored snapshots ({BOARD_SPECS[board].label})"):
+            st.dataframe(history.snapshots(board), hide_index=True, use_container_width=True)
+        with st.popover("Clear history"):
+            st.caption(f"Removes every stored {BOARD_SPECS[board].label} snapshot, for all users of the dashboard.")
+            st.button("Clear", on_click=history.clear, args=(board,), type="primary", key="hist_clear")
+
+        # ช่วงวันที่อิง Begin Time ของแต่ละแถว อ่านเฉพาะ partition ของวันที่เลือก
+        picked = st.date_input("Begin Time range", (days[0], days[-1]), min_value=days[0], max_value=days[-1], key="hist_range")
+        start, end = (picked[0], picked[-1]) if isinstance(picked, tuple) and picked else (days[0], days[-1])
+
+        me_options = sorted(history.query(board, start, end, columns=["ME"])["ME"].unique())
+        selected_mes = st.multiselect("ME", me_options, key="hist_me")
+
+        if not selected_mes:
+            st.info("Select at least one ME to show its history")
+        else:
+            df_hist = history.query(board, start, end, mes=selected_mes)
+            mo_options = sorted(df_hist["Measure Object"].unique())
+            selected_mos = st.multiselect("Measure Object", mo_options, key="hist_mo")
+            if selected_mos:
+                df_hist = df_hist[df_hist["Measure Object"].isin(selected_mos)]
+
+            value = st.selectbox("Value", value_cols(board), key="hist_value")
+            df_hist = df_hist.sort_values(["Mapping", "Begin Time"], ignore_index=True)
+
+            # กราฟเส้นละ Mapping; เยอะเกินไปจะอ่านไม่ออก
+            n_series = df_hist["Mapping"].nunique()
+            if n_series > 50:
+                st.caption(f"{n_series} Measure Objects selected, pick fewer to draw the chart")
+            elif len(df_hist):
+                fig = px.line(df_hist, x="Begin Time", y=value, color="Mapping", markers=True)
+                st.plotly_chart(fig, use_container_width=True)
+
+            render_table(
+                df_hist.drop(columns=["Snapshot"]),
+                ns="hist",
+                hide_index=True,
+            )
+
 # region Reference Sheet
 elif menu == "Reference Sheet":
     st.markdown("### Reference Sheet")
 
-    st.dataframe(session[SessionStateEnum.REFERENCE_SHEET], height=700, hide_index=True)
\ No newline at end of file
+    session[SessionStateEnum.REFERENCE_SHEET] = database.get_reference_sheet()
+
+    st.dataframe(session[SessionStateEnum.REFERENCE_SHEET], height=700, hide_index=True)
+
+# reruns cut short by st.stop() keep their stages but no total
+profile_run.finish()
\ No newline at end of file
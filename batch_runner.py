@@ -0,0 +1,309 @@
+"""
+Headless health check: run every dashboard analysis over a directory of exports.
+
+    python batch_runner.py EXPORT_DIR [-o OUT_DIR] [--format parquet xlsx json]
+                           [--workers N] [--reference-dir DIR] [--loss-reference FILE]
+                           [--history]
+
+Exports (.xlsx, .csv, .csv.gz or .parquet) are recognised by their columns
+(CPU, FAN, MSU, Client, Line, OSC, FM and attenuation exports) and *.txt
+files are read as WASON logs. Board references are the workbooks in the
+dashboard's data/ directory unless --reference-dir points elsewhere.
+Files are read, and analyses run, in worker processes. Each analysis writes
+its status table to OUT_DIR, and summary.json lists every result.
+With --history, board exports are also added to the dashboard's history
+store (once per file, like dashboard uploads).
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import pandas as pd
+
+from components.boards import BOARD_SPECS, board_status, build_board, normalize_export_headers
+from components.flapping import FM_PLAN, OSC_PLAN, unmatched_flapping
+from components.history import get_history_store
+from components.loss import ATTENUATION_PLAN, CoreAnalyzer, EOLAnalyzer
+from components.rules import COL_IN, COL_OUT
+from components.wason import scan_wason_logs
+from services.columnar import write_parquet_atomic
+from services.database import Database
+from services.ingest import ColumnPlan, read_columns, read_header
+from services.reference import SIDECAR_DIR, ReferenceRegistry, get_reference_registry
+from services.upload_cache import UploadCache
+
+OUTPUT_FORMATS = ["parquet", "xlsx", "json"]
+EXPORT_SUFFIXES = (".xlsx", ".csv", ".csv.gz", ".parquet")
+
+# first match wins: Line exports also carry the Client power columns
+EXPORT_SIGNATURES: list[tuple[str, set[str]]] = [
+    ("CPU", {"CPU utilization ratio"}),
+    ("FAN", {"Value of Fan Rotate Speed(Rps)"}),
+    ("MSU", {"Laser Bias Current(mA)"}),
+    ("Line", {"Instant BER After FEC"}),
+    ("OSC", {"Max Value of Input Optical Power(dBm)", "Min Value of Input Optical Power(dBm)"}),
+    ("FM", {"Occurrence Time", "Clear Time"}),
+    ("Attenuation", {"Source Port", "Sink Port", "Optical Attenuation (dB)"}),
+    ("Client", {COL_IN, COL_OUT}),
+]
+
+# columns each kind of export is read with, once its header has been classified
+EXPORT_PLANS: dict[str, ColumnPlan] = {
+    **{board: spec.export_plan for board, spec in BOARD_SPECS.items()},
+    "OSC": OSC_PLAN,
+    "FM": FM_PLAN,
+    "Attenuation": ATTENUATION_PLAN,
+}
+
+
+def classify_export(columns) -> str | None:
+    columns = set(columns)
+    for kind, signature in EXPORT_SIGNATURES:
+        if signature <= columns:
+            return kind
+
+    return None
+
+
+# region Workers
+def read_export(path: str) -> tuple[str, str | None, pd.DataFrame | str]:
+    """(path, kind, frame); kind is None and the frame is the reason when the file can't be used."""
+    try:
+        # header first: unknown files are skipped without parsing their rows
+        kind = classify_export(read_header(path))
+        if kind is None:
+            return path, None, "unrecognised columns"
+
+        df = normalize_export_headers(read_columns(path, EXPORT_PLANS[kind]))
+    except Exception as e:
+        return path, None, f"unreadable: {e}"
+
+    return path, kind, df
+
+
+def guarded(analysis: str, fn, *args) -> dict | list[dict]:
+    # one broken export or missing reference must not stop the other analyses
+    try:
+        return fn(*args)
+    except Exception as e:
+        return {"analysis": analysis, "error": f"{type(e).__name__}: {e}"}
+
+
+def write_outputs(name: str, df: pd.DataFrame, out_dir: Path, formats: list[str]) -> list[str]:
+    written = []
+    for fmt in formats:
+        path = out_dir / f"{name}.{fmt}"
+        if fmt == "parquet":
+            write_parquet_atomic(df, path)
+        elif fmt == "xlsx":
+            df.to_excel(path, index=False)
+        elif fmt == "json":
+            df.to_json(path, orient="records", date_format="iso", indent=1)
+        written.append(path.name)
+
+    return written
+
+
+def run_board(
+    board: str,
+    frames: list[pd.DataFrame],
+    preset_map: dict[str, str],
+    references: ReferenceRegistry,
+    out_dir: Path,
+    formats: list[str],
+) -> dict:
+    df_export = pd.concat(frames, ignore_index=True)
+    df_result = build_board(board, df_export, references.get(board), preset_map=preset_map)
+    df_status, rule_result = board_status(board, df_result)
+    issues = rule_result.issue_count
+
+    return {
+        "analysis": board,
+        "rows": len(df_status),
+        "issues": issues,
+        "status": "Warning" if issues else "Normal",
+        "files": write_outputs(board.lower(), df_status, out_dir, formats),
+    }
+
+
+def run_fiber(osc_frames: list[pd.DataFrame], fm_frames: list[pd.DataFrame], out_dir: Path, formats: list[str]) -> dict:
+    df_nomatch = unmatched_flapping(pd.concat(osc_frames, ignore_index=True), pd.concat(fm_frames, ignore_index=True))
+
+    return {
+        "analysis": "Fiber Flapping",
+        "rows": len(df_nomatch),
+        "issues": len(df_nomatch),
+        "status": "Warning" if len(df_nomatch) else "Normal",
+        "files": write_outputs("fiber_flapping", df_nomatch.drop(columns=["Target ME"]), out_dir, formats),
+    }
+
+
+def run_loss(df_ref: pd.DataFrame, raw_frames: list[pd.DataFrame], out_dir: Path, formats: list[str]) -> list[dict]:
+    df_raw = pd.concat(raw_frames, ignore_index=True)
+    results = []
+    for name, analyzer_class in (("loss_eol", EOLAnalyzer), ("loss_core", CoreAnalyzer)):
+        df_status = analyzer_class(df_ref, df_raw).status_table()
+        issues = int((df_status["Status"] != "ok").sum())
+        results.append({
+            "analysis": name,
+            "rows": len(df_status),
+            "issues": issues,
+            "status": "Warning" if issues else "Normal",
+            "files": write_outputs(name, df_status, out_dir, formats),
+        })
+
+    return results
+
+
+# region Runner
+def run_parallel(calls: list[tuple], workers: int) -> list:
+    """Run (fn, *args) calls, in a spawn process pool when more than one worker is allowed."""
+    if workers <= 1 or len(calls) <= 1:
+        return [fn(*args) for fn, *args in calls]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(calls)), mp_context=get_context("spawn")) as pool:
+        futures = [pool.submit(fn, *args) for fn, *args in calls]
+        return [future.result() for future in futures]
+
+
+def reference_registry(reference_dir: Path | None) -> ReferenceRegistry:
+    if reference_dir is None:
+        return get_reference_registry()
+
+    # sidecars of another directory are kept apart from the dashboard's own
+    digest = hashlib.sha256(str(Path(reference_dir).resolve()).encode()).hexdigest()[:12]
+    return ReferenceRegistry(reference_dir, SIDECAR_DIR / digest)
+
+
+def load_loss_reference(path: str | None) -> pd.DataFrame | None:
+    if path:
+        return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_excel(path)
+
+    database = Database()
+    if not database.ping():
+        return None
+
+    return database.get_reference_sheet()
+
+
+def run(
+    export_dir: Path,
+    out_dir: Path,
+    formats: list[str],
+    workers: int,
+    loss_reference: str | None = None,
+    history: bool = False,
+    reference_dir: Path | None = None,
+) -> dict:
+    started = time.perf_counter()
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    export_paths = sorted(
+        str(p) for p in export_dir.iterdir()
+        if p.name.lower().endswith(EXPORT_SUFFIXES) and not p.name.startswith("~$")
+    )
+    log_paths = sorted(export_dir.glob("*.txt"))
+
+    frames: dict[str, list[pd.DataFrame]] = {}
+    skipped = []
+    history_rows = 0
+    for path, kind, df in run_parallel([(read_export, p) for p in export_paths], workers):
+        if kind is None:
+            skipped.append({"file": Path(path).name, "reason": df})
+        else:
+            frames.setdefault(kind, []).append(df)
+            if history and kind in BOARD_SPECS:
+                # same snapshot key as a dashboard upload of this file
+                history_rows += get_history_store().append(
+                    kind, df, UploadCache.hash_bytes(Path(path).read_bytes(), EXPORT_PLANS[kind].key)
+                )
+
+    results = []
+    preset_map: dict[str, str] = {}
+    if log_paths:
+        handles = [open(p, "rb") for p in log_paths]
+        try:
+            scan = scan_wason_logs([(p.name, f) for p, f in zip(log_paths, handles)], max_workers=workers)
+        finally:
+            for f in handles:
+                f.close()
+
+        preset_map = scan.preset_map
+        fails = int((scan.summary["Verdict"] == "FAIL").sum())
+        results.append({
+            "analysis": "Preset status",
+            "rows": len(scan.summary),
+            "issues": fails,
+            "status": "Warning" if fails else "Normal",
+            "files": write_outputs("preset_status", scan.report, out_dir, formats),
+        })
+
+    references = reference_registry(reference_dir)
+    calls = [
+        (guarded, board, run_board, board, frames[board], preset_map, references, out_dir, formats)
+        for board in BOARD_SPECS if board in frames
+    ]
+    if "OSC" in frames and "FM" in frames:
+        calls.append((guarded, "Fiber Flapping", run_fiber, frames["OSC"], frames["FM"], out_dir, formats))
+    if "Attenuation" in frames:
+        df_loss_ref = load_loss_reference(loss_reference)
+        if df_loss_ref is not None:
+            calls.append((guarded, "Loss", run_loss, df_loss_ref, frames["Attenuation"], out_dir, formats))
+        else:
+            results.append({"analysis": "Loss", "error": "no reference sheet (database unreachable and no --loss-reference)"})
+
+    for result in run_parallel(calls, workers):
+        results.extend(result if isinstance(result, list) else [result])
+
+    summary = {
+        "export_dir": str(export_dir),
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        "skipped_files": skipped,
+        "history_rows": history_rows,
+        "results": results,
+    }
+    (out_dir / "summary.json").write_text(json.dumps(summary, indent=2))
+
+    return summary
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run every DWDM dashboard analysis over a directory of exports.")
+    parser.add_argument("export_dir", type=Path)
+    parser.add_argument("-o", "--out-dir", type=Path, default=Path("health_check"))
+    parser.add_argument("--format", nargs="+", choices=OUTPUT_FORMATS, default=["parquet"], dest="formats")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--reference-dir", type=Path, help="directory of board reference workbooks (CPU.xlsx, ...) instead of data/")
+    parser.add_argument("--loss-reference", help="reference sheet (.xlsx/.parquet) instead of the database")
+    parser.add_argument("--history", action="store_true", help="also store board exports in the history store")
+    args = parser.parse_args(argv)
+
+    if not args.export_dir.is_dir():
+        parser.error(f"{args.export_dir} is not a directory")
+    if args.reference_dir is not None and not args.reference_dir.is_dir():
+        parser.error(f"{args.reference_dir} is not a directory")
+
+    summary = run(
+        args.export_dir, args.out_dir, args.formats, args.workers, args.loss_reference, args.history, args.reference_dir,
+    )
+
+    for result in summary["results"]:
+        if "error" in result:
+            print(f"{result['analysis']}: ERROR {result['error']}")
+        else:
+            print(f"{result['analysis']}: {result['status']} ({result['issues']}/{result['rows']})")
+    print(f"done in {summary['elapsed_s']}s -> {args.out_dir}")
+
+    # non-zero when something needs a look, so cron/CI can alert on it
+    failed = any("error" in r or r.get("issues") for r in summary["results"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
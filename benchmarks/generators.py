@@ -0,0 +1,242 @@
+"""
+Synthetic NMS exports, reference workbooks and WASON logs shaped like the real ones.
+
+Every generator is deterministic for a given (n, seed). Board exports and
+their references share Mapping keys (ME + Measure Object), so merges match
+the way production files do.
+"""
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from components.rules import COL_IN, COL_MAX_IN, COL_MAX_OUT, COL_MIN_IN, COL_MIN_OUT, COL_OUT
+from components.wason import NODE_IP_MAP
+from services.reference import REFERENCE_SPECS, compile_reference, index_by_mapping
+
+SITES = ["HYI-4", "Jasmine", "Phu Nga", "SNI-POI", "NKS", "PKT"]
+FAN_TYPES = ["FCC", "FCPP", "FCPL", "FCPS"]
+BEGIN_TIME = pd.Timestamp("2025-01-01 00:00:00")
+
+
+def _rng(seed: int) -> np.random.Generator:
+    return np.random.default_rng(seed)
+
+
+def _me_names(n: int, rng: np.random.Generator) -> np.ndarray:
+    # ~50 ports per ME, like a shelf export
+    n_me = max(1, n // 50)
+    sites = np.array(SITES)[np.arange(n_me) % len(SITES)]
+    me = np.char.add(np.char.add(sites.astype(str), "-NE"), np.arange(n_me).astype(str))
+    return me[rng.integers(0, n_me, n)]
+
+
+def _measure_objects(board: str, n: int) -> np.ndarray:
+    slots = np.arange(n).astype(str)
+    if board == "FAN":
+        kinds = np.array(FAN_TYPES)[np.arange(n) % len(FAN_TYPES)]
+        return np.char.add(np.char.add(kinds, "-Shelf0-Slot"), slots)
+    if board == "Line":
+        return np.char.add(np.char.add("Shelf0-Slot", slots), "-OCH:1")
+
+    return np.char.add(f"Shelf0-{board}-Slot", slots)
+
+
+# region Board exports
+def make_board_export(board: str, n: int, seed: int = 0) -> pd.DataFrame:
+    """PM export for one of CPU / FAN / MSU / Client / Line with `n` rows."""
+    rng = _rng(seed)
+    df = pd.DataFrame({
+        "ME": _me_names(n, rng),
+        "Measure Object": _measure_objects(board, n),
+        "Begin Time": BEGIN_TIME,
+        "End Time": BEGIN_TIME + pd.Timedelta(minutes=15),
+    })
+
+    if board == "CPU":
+        df["CPU utilization ratio"] = rng.uniform(0, 100, n).round(2)
+    elif board == "FAN":
+        df["Value of Fan Rotate Speed(Rps)"] = rng.normal(110, 40, n).round(1)
+    elif board == "MSU":
+        df["Laser Bias Current(mA)"] = rng.normal(40, 8, n).round(2)
+    elif board in ("Client", "Line"):
+        df[COL_OUT] = rng.normal(0, 2, n).round(2)
+        df[COL_IN] = rng.normal(-8, 4, n).round(2)
+        if board == "Line":
+            ber = np.where(rng.random(n) < 0.02, rng.uniform(1e-9, 1e-5, n), 0.0)
+            df["Instant BER After FEC"] = ber
+    else:
+        raise KeyError(board)
+
+    return df
+
+
+def make_reference_workbook(board: str, df_export: pd.DataFrame, seed: int = 0) -> pd.DataFrame:
+    """Raw reference workbook (as in data/<board>.xlsx) covering every export row."""
+    rng = _rng(seed + 1)
+    n = len(df_export)
+    df_ref = pd.DataFrame({
+        "Site Name": df_export["ME"].str.split("-NE").str[0].to_numpy(),
+        "Mapping": (df_export["ME"] + df_export["Measure Object"]).to_numpy(),
+    })
+
+    if board == "CPU":
+        df_ref["Maximum threshold"] = 80
+        df_ref["Minimum threshold"] = 0
+    elif board == "FAN":
+        df_ref["Maximum threshold"] = 250
+        df_ref["Minimun threshold"] = 0
+    elif board == "MSU":
+        df_ref["Maximum threshold"] = 55
+    else:
+        df_ref[COL_MAX_OUT] = 4
+        df_ref[COL_MIN_OUT] = -4
+        df_ref[COL_MAX_IN] = 0
+        df_ref[COL_MIN_IN] = -18
+        if board == "Line":
+            # same "<call> (<node>)" form as the WASON preset map keys
+            df_ref["Call ID"] = rng.integers(1, 9999, n).astype(str) + " (" + df_ref["Site Name"] + ")"
+            df_ref["Threshold"] = "-"
+            df_ref["Route"] = "Work"
+
+    # reference row order differs from the export, as in production
+    return df_ref.iloc[rng.permutation(n)].reset_index(drop=True)
+
+
+def make_reference(board: str, df_export: pd.DataFrame, seed: int = 0) -> pd.DataFrame:
+    """Reference as served by ReferenceRegistry.get (normalized, ordered, indexed by Mapping)."""
+    workbook = make_reference_workbook(board, df_export, seed)
+    return index_by_mapping(compile_reference(workbook, REFERENCE_SPECS[board]))
+
+
+# region Fiber Flapping
+def make_osc_export(n: int, seed: int = 0, flapping_ratio: float = 0.3, days: int = 7) -> pd.DataFrame:
+    """
+    One row per OSC port per 15-minute interval over `days`, like a weekly
+    export: large files mean more intervals, not thousands of extra MEs.
+    """
+    rng = _rng(seed)
+    intervals = days * 96
+    n_ports = -(-n // intervals)
+    port = np.arange(n) % n_ports
+    # about two OSC ports per ME
+    port_me = _me_names(max(2, n_ports) * 25, rng)[:n_ports]
+    port_target = np.array(SITES)[rng.integers(0, len(SITES), n_ports)]
+
+    me = port_me[port]
+    target = port_target[port]
+    swing = np.where(rng.random(n) < flapping_ratio, rng.uniform(2.5, 10, n), rng.uniform(0, 1.5, n))
+    low = rng.normal(-20, 3, n)
+    begin = BEGIN_TIME + pd.to_timedelta((np.arange(n) // n_ports) * 15, unit="min")
+
+    return pd.DataFrame({
+        "Begin Time": begin,
+        "End Time": begin + pd.Timedelta(minutes=15),
+        "Granularity": "15-Minute",
+        "ME": me,
+        "ME IP": "10.0.0.1",
+        "Measure Object": np.char.add(np.char.add(np.char.add("OSC-", port.astype(str)), np.char.add("(", target.astype(str))), ")"),
+        "Max Value of Input Optical Power(dBm)": (low + swing).round(2),
+        "Min Value of Input Optical Power(dBm)": low.round(2),
+        "Input Optical Power(dBm)": (low + swing / 2).round(2),
+    })
+
+
+def make_fm_export(df_osc: pd.DataFrame, n: int, seed: int = 0) -> pd.DataFrame:
+    """Alarms on links of `df_osc`, about half overlapping an OSC interval."""
+    rng = _rng(seed + 2)
+    rows = rng.integers(0, len(df_osc), n)
+    source = df_osc.iloc[rows]
+    target = source["Measure Object"].str.extract(r"\(([^)]+)\)")[0].to_numpy()
+
+    shift = np.where(rng.random(n) < 0.5, 0, rng.integers(1, 200, n)) * pd.Timedelta(hours=1)
+    occurrence = source["Begin Time"].to_numpy() + shift
+
+    return pd.DataFrame({
+        "Alarm Name": "R_LOS",
+        "Alarm Code": 1001,
+        "Link Name": (source["ME"].to_numpy() + "-to-" + target),
+        "Occurrence Time": occurrence,
+        "Clear Time": occurrence + pd.Timedelta(minutes=30),
+    })
+
+
+# region Loss
+def make_attenuation(n_pairs: int, seed: int = 0) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(raw attenuation export, reference sheet) with forward/reverse fibers on adjacent rows."""
+    rng = _rng(seed)
+    me_a = _me_names(n_pairs, rng)
+    me_b = _me_names(n_pairs, _rng(seed + 3))
+    port_a = np.char.add(me_a.astype(str), np.char.add("-1-", np.arange(n_pairs).astype(str)))
+    port_b = np.char.add(me_b.astype(str), np.char.add("-2-", np.arange(n_pairs).astype(str)))
+
+    source = np.column_stack([port_a, port_b]).ravel()
+    sink = np.column_stack([port_b, port_a]).ravel()
+
+    # both directions of a fiber read about the same loss
+    span_loss = rng.normal(12, 3, n_pairs)
+    attenuation = np.column_stack([span_loss, span_loss + rng.normal(0, 0.8, n_pairs)]).ravel().round(2).astype(object)
+    attenuation[rng.random(2 * n_pairs) < 0.02] = "--"
+
+    df_raw = pd.DataFrame({"Source Port": source, "Sink Port": sink, "Optical Attenuation (dB)": attenuation})
+    df_ref = pd.DataFrame({
+        "Link Name": df_raw["Source Port"] + "_" + df_raw["Sink Port"],
+        "EOL(dB)": rng.normal(10, 2, 2 * n_pairs).round(2),
+    })
+
+    return df_raw, df_ref
+
+
+# region WASON
+def make_wason_log(n_calls: int, seed: int = 0) -> bytes:
+    """MobaXterm capture with `n_calls` [WASON][CALL] blocks, CRLF line endings."""
+    rng = _rng(seed)
+    ips = list(NODE_IP_MAP)
+    lines = ["MobaXterm log", "[CALL] session start"]
+
+    for i in range(n_calls):
+        ip = ips[rng.integers(0, len(ips))]
+        lines.append(f"[WASON][CALL {i}] [{ip} {ips[0]} {int(rng.integers(1, 9999)):04d}] COPPER")
+        for k in range(int(rng.integers(1, 4))):
+            state = ["WR NO_ALARM", "WR SF", "IDLE"][int(rng.integers(0, 3))]
+            lines.append(f"[WASON] [Conn {k}] 10.0.{k}.1 state {state}")
+        lines.append("[WASON][PreRout]:")
+        for j in range(int(rng.integers(1, 4))):
+            used = "USED" if rng.random() < 0.5 else "FREE"
+            result = "SUCCESS" if rng.random() < 0.9 else "FAIL"
+            lines.append(f"[WASON]--{j}--WORK--({used})--({result})--")
+        lines.extend(f"[WASON] trace {t}" for t in range(int(rng.integers(2, 8))))
+
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+# region Files
+def write_dataset(out_dir: Path, n: int, seed: int = 0) -> Path:
+    """
+    Write a full input set: exports/ (every board, OSC/FM, attenuation, one
+    log per node) and data/ (board reference workbooks and the loss reference
+    sheet). Handy for trying the dashboard or batch_runner.py against
+    realistic volumes:
+
+        python batch_runner.py OUT/exports --reference-dir OUT/data --loss-reference OUT/data/Loss_reference.xlsx
+    """
+    out_dir = Path(out_dir)
+    exports, data = out_dir / "exports", out_dir / "data"
+    exports.mkdir(parents=True, exist_ok=True)
+    data.mkdir(parents=True, exist_ok=True)
+
+    for board in REFERENCE_SPECS:
+        df_export = make_board_export(board, n, seed)
+        df_export.to_excel(exports / f"{board}_PM.xlsx", index=False)
+        make_reference_workbook(board, df_export, seed).to_excel(data / REFERENCE_SPECS[board].filename, index=False)
+
+    df_osc = make_osc_export(n, seed)
+    df_osc.to_excel(exports / "OSC_optical.xlsx", index=False)
+    make_fm_export(df_osc, max(1, n // 4), seed).to_excel(exports / "FM_alarms.xlsx", index=False)
+
+    df_raw, df_ref = make_attenuation(max(1, n // 2), seed)
+    df_raw.to_excel(exports / "Optical_attenuation.xlsx", index=False)
+    df_ref.to_excel(data / "Loss_reference.xlsx", index=False)
+
+    for node_seed, node in enumerate(NODE_IP_MAP.values()):
+        (exports / f"{node}.txt").write_bytes(make_wason_log(max(1, n // 10), seed + node_seed))
+
+    return out_dir
@@ -0,0 +1,240 @@
+"""
+Time each dashboard stage on synthetic data and compare against a stored baseline.
+
+    python -m benchmarks.run_benchmarks [--sizes 1000 100000 1000000] [--stages ...]
+                                        [--repeat N] [--save-baseline NAME]
+                                        [--compare NAME] [--tolerance 1.25]
+    python -m benchmarks.run_benchmarks --write-dataset DIR --sizes 10000
+
+Inputs are generated once per size and are not part of the timing. Each
+stage reports the best wall time of `--repeat` runs and the peak Python
+allocation (tracemalloc) of one extra run. Baselines live in
+benchmarks/baselines/<NAME>.json; `--compare` exits 1 when a stage is
+slower or heavier than baseline × tolerance.
+"""
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+from unittest import mock
+
+import pandas as pd
+
+from benchmarks.generators import (
+    make_attenuation,
+    make_board_export,
+    make_fm_export,
+    make_osc_export,
+    make_reference,
+    make_wason_log,
+    write_dataset,
+)
+from components.boards import BOARD_SPECS, build_board
+from components import filters
+from components.filters import FilterIndex, get_filter_index
+from components.flapping import unmatched_flapping
+from components.loss import CoreAnalyzer, EOLAnalyzer
+from components.wason import parse_calls, scan_log
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+FILTER_COLS = ["Site Name", "ME", "Measure Object", "Call ID", "Route"]
+
+# timings under this are mostly noise, never flag them
+MIN_COMPARE_SECONDS = 0.005
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    # setup(n) builds the inputs (untimed), run(inputs) is what gets measured
+    setup: Callable[[int], Any]
+    run: Callable[[Any], Any]
+
+
+# region Stages
+def _board_inputs(board: str, n: int):
+    df_export = make_board_export(board, n)
+    return board, df_export, make_reference(board, df_export)
+
+
+def _run_board(inputs):
+    board, df_export, df_ref = inputs
+    return build_board(board, df_export, df_ref, preset_map={"17": "2"} if board == "Line" else None)
+
+
+def _filter_inputs(n: int):
+    df = _run_board(_board_inputs("Line", n))
+    # the page's session: the index was built on an earlier rerun of the same upload
+    session_state: dict = {}
+    with mock.patch.object(filters.st, "session_state", session_state):
+        get_filter_index(df, FILTER_COLS, "bench", "upload-key:reference-version")
+
+    return df, session_state
+
+
+def _cascade(index: FilterIndex):
+    # cascade a selection down the columns, as cascading_filter does before drawing
+    mask = None
+    for c in FILTER_COLS:
+        opts = index.options(c, mask)
+        if opts:
+            col_mask = index.mask(c, opts[: max(1, len(opts) // 3)])
+            mask = col_mask if mask is None else mask & col_mask
+
+    return mask
+
+
+def _run_filter(inputs):
+    # a widget rerun: look the cached index up, then cascade
+    df, session_state = inputs
+    with mock.patch.object(filters.st, "session_state", session_state):
+        index = get_filter_index(df, FILTER_COLS, "bench", "upload-key:reference-version")
+
+    return _cascade(index)
+
+
+def _flapping_inputs(n: int):
+    df_osc = make_osc_export(n)
+    return df_osc, make_fm_export(df_osc, max(1, n // 4))
+
+
+def _run_parse_calls(data: bytes):
+    # splitting the log into [CALL n] blocks alone, without judging them; the Line
+    # board's preset map comes out of the full scan (wason_scan)
+    blocks = parse_calls(io.BytesIO(data))
+    return sum(1 for _ in blocks)
+
+
+def _loss_inputs(n: int):
+    df_raw, df_ref = make_attenuation(max(1, n // 2))
+    return df_ref, df_raw
+
+
+STAGES: list[Stage] = [
+    *(Stage(f"board_{board.lower()}", lambda n, b=board: _board_inputs(b, n), _run_board) for board in BOARD_SPECS),
+    Stage("cascading_filter", _filter_inputs, _run_filter),
+    # a new upload: the index is built from scratch
+    Stage("filter_index_build", _filter_inputs, lambda inputs: _cascade(FilterIndex(inputs[0], FILTER_COLS))),
+    Stage("fiber_flapping", _flapping_inputs, lambda inputs: unmatched_flapping(*inputs)),
+    # ~10 lines per call, so n // 10 calls is about n log lines
+    Stage("wason_parse_calls", lambda n: make_wason_log(max(1, n // 10)), _run_parse_calls),
+    Stage("wason_scan", lambda n: make_wason_log(max(1, n // 10)), lambda data: scan_log(io.BytesIO(data))),
+    Stage("loss_eol", _loss_inputs, lambda inputs: EOLAnalyzer(*inputs).status_table()),
+    Stage("loss_core", _loss_inputs, lambda inputs: CoreAnalyzer(*inputs).status_table()),
+]
+
+
+# region Measure
+def measure(stage: Stage, n: int, repeat: int) -> dict:
+    inputs = stage.setup(n)
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        stage.run(inputs)
+        best = min(best, time.perf_counter() - started)
+
+    # separate run: tracemalloc slows allocation-heavy code down a lot
+    tracemalloc.start()
+    try:
+        stage.run(inputs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": round(best, 6), "peak_mb": round(peak / 2**20, 3)}
+
+
+def run_suite(sizes: list[int], stages: list[Stage], repeat: int) -> dict[str, dict]:
+    results: dict[str, dict] = {}
+    for n in sizes:
+        for stage in stages:
+            key = f"{stage.name}@{n}"
+            results[key] = measure(stage, n, repeat)
+            print(f"{key:<32} {results[key]['seconds']:>10.4f}s {results[key]['peak_mb']:>10.1f} MB", flush=True)
+
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+
+        if current["seconds"] > MIN_COMPARE_SECONDS and current["seconds"] > base["seconds"] * tolerance:
+            regressions.append(f"{key}: {base['seconds']:.4f}s -> {current['seconds']:.4f}s")
+        if current["peak_mb"] > 1 and current["peak_mb"] > base["peak_mb"] * tolerance:
+            regressions.append(f"{key}: {base['peak_mb']:.1f} MB -> {current['peak_mb']:.1f} MB")
+
+    return regressions
+
+
+def baseline_path(name: str) -> Path:
+    return BASELINE_DIR / f"{name}.json"
+
+
+def save_baseline(name: str, results: dict[str, dict]):
+    BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    baseline_path(name).write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n")
+
+
+def main(argv: list[str] | None = None) -> int:
+    stage_names = [s.name for s in STAGES]
+
+    parser = argparse.ArgumentParser(description="Benchmark dashboard stages on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--stages", nargs="+", choices=stage_names, default=stage_names)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="allowed slowdown factor (default 1.25)")
+    parser.add_argument("--write-dataset", type=Path, metavar="DIR", help="write synthetic input files instead of benchmarking")
+    args = parser.parse_args(argv)
+
+    if args.write_dataset:
+        for n in args.sizes:
+            out = write_dataset(args.write_dataset / str(n), n)
+            print(f"wrote {out}")
+        return 0
+
+    baseline = None
+    if args.compare:
+        path = baseline_path(args.compare)
+        if not path.exists():
+            parser.error(f"no baseline {path}")
+        baseline = json.loads(path.read_text())["results"]
+
+    results = run_suite(args.sizes, [s for s in STAGES if s.name in args.stages], max(1, args.repeat))
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+        print(f"saved {baseline_path(args.save_baseline)}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regressions against {args.compare} (tolerance {args.tolerance}x)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from components.rules import (
+    COL_IN,
+    COL_MAX_IN,
+    COL_MAX_OUT,
+    COL_MIN_IN,
+    COL_MIN_OUT,
+    COL_OUT,
+    RuleResult,
+    evaluate_board,
+)
+from services.ingest import ColumnPlan, normalize_header
+from services.profiling import profile_stage, profiled
+
+
+# optional in most exports; the history store keys snapshots on them
+EXPORT_TIME_COLS = ("Begin Time", "End Time")
+
+
+class BoardDataError(ValueError):
+    """An export or reference file is missing columns a board needs."""
+
+
+@dataclass(frozen=True)
+class BoardSpec:
+    label: str
+    required_cols: tuple[str, ...]
+    required_ref_cols: tuple[str, ...]
+    # reference columns merged in; `optional_ref_cols` only when the workbook has them
+    ref_cols: tuple[str, ...]
+    result_cols: tuple[str, ...]
+    numeric_cols: tuple[str, ...] = ()
+    optional_ref_cols: tuple[str, ...] = ()
+
+    @property
+    def export_plan(self) -> ColumnPlan:
+        """
+        The only export columns the board reads, for column-pruned ingestion,
+        plus Begin/End Time when the export has them (kept for its history).
+        """
+        time_cols = tuple(c for c in EXPORT_TIME_COLS if c not in self.required_cols)
+        return ColumnPlan(self.required_cols + time_cols, text_cols=("ME", "Measure Object"))
+
+
+BOARD_SPECS: dict[str, BoardSpec] = {
+    "CPU": BoardSpec(
+        label="CPU",
+        required_cols=("ME", "Measure Object", "CPU utilization ratio"),
+        required_ref_cols=("Mapping", "Maximum threshold", "Minimum threshold"),
+        ref_cols=("Maximum threshold", "Minimum threshold"),
+        optional_ref_cols=("Site Name", "Call ID", "Route"),
+        result_cols=("ME", "Measure Object", "Maximum threshold", "Minimum threshold", "CPU utilization ratio"),
+        numeric_cols=("CPU utilization ratio", "Maximum threshold", "Minimum threshold"),
+    ),
+    "FAN": BoardSpec(
+        label="FAN",
+        required_cols=("ME", "Measure Object", "Begin Time", "End Time", "Value of Fan Rotate Speed(Rps)"),
+        # 'Minimun threshold' is spelled as in the reference workbook
+        required_ref_cols=("Mapping", "Site Name", "Maximum threshold", "Minimun threshold"),
+        ref_cols=("Site Name", "Maximum threshold", "Minimun threshold"),
+        result_cols=(
+            "Begin Time", "End Time", "Site Name", "ME", "Measure Object",
+            "Maximum threshold", "Minimun threshold", "Value of Fan Rotate Speed(Rps)",
+        ),
+        numeric_cols=("Value of Fan Rotate Speed(Rps)",),
+    ),
+    "MSU": BoardSpec(
+        label="MSU",
+        required_cols=("ME", "Measure Object", "Laser Bias Current(mA)"),
+        required_ref_cols=("Site Name", "Mapping", "Maximum threshold"),
+        ref_cols=("Site Name", "Maximum threshold"),
+        result_cols=("Site Name", "ME", "Measure Object", "Maximum threshold", "Laser Bias Current(mA)"),
+        numeric_cols=("Laser Bias Current(mA)", "Maximum threshold"),
+    ),
+    "Client": BoardSpec(
+        label="Client",
+        required_cols=("ME", "Measure Object", COL_IN, COL_OUT),
+        required_ref_cols=("Mapping", COL_MAX_OUT, COL_MIN_OUT, COL_MAX_IN, COL_MIN_IN),
+        ref_cols=("Site Name", COL_MAX_OUT, COL_MIN_OUT, COL_MAX_IN, COL_MIN_IN),
+        result_cols=(
+            "Site Name", "ME", "Measure Object",
+            COL_MAX_OUT, COL_MIN_OUT, COL_OUT,
+            COL_MAX_IN, COL_MIN_IN, COL_IN,
+        ),
+        numeric_cols=(COL_OUT, COL_IN, COL_MAX_OUT, COL_MIN_OUT, COL_MAX_IN, COL_MIN_IN),
+    ),
+    "Line": BoardSpec(
+        label="Line cards",
+        required_cols=("ME", "Measure Object", "Instant BER After FEC", COL_IN, COL_OUT),
+        required_ref_cols=("Mapping", "Site Name", "Call ID", "Threshold", COL_MAX_OUT, COL_MIN_OUT, COL_MAX_IN, COL_MIN_IN, "Route"),
+        ref_cols=("Site Name", "Mapping", "Call ID", "Threshold", COL_MAX_OUT, COL_MIN_OUT, COL_MAX_IN, COL_MIN_IN, "Route"),
+        result_cols=(
+            "Site Name", "ME", "Mapping", "Call ID", "Measure Object", "Threshold", "Instant BER After FEC",
+            COL_MAX_OUT, COL_MIN_OUT, COL_OUT,
+            COL_MAX_IN, COL_MIN_IN, COL_IN, "Route",
+        ),
+        numeric_cols=("Instant BER After FEC", COL_OUT, COL_IN, COL_MAX_OUT, COL_MIN_OUT, COL_MAX_IN, COL_MIN_IN),
+    ),
+}
+
+
+def normalize_export_headers(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy(deep=False)
+    df.columns = [normalize_header(c) for c in df.columns]
+
+    return df
+
+
+def check_columns(df: pd.DataFrame, required: tuple[str, ...], what: str):
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise BoardDataError(f"{what} must contain columns: {', '.join(sorted(required))}")
+
+
+def apply_preset_map(df_result: pd.DataFrame, preset_map: dict[str, str]) -> pd.DataFrame:
+    """Line board: routes of calls found in the WASON log become "Preset <n>"."""
+    df_result = df_result.copy(deep=False)
+    df_result["Call ID"] = df_result["Call ID"].astype(str).str.strip().str.lstrip("0")
+
+    if preset_map:
+        preset = df_result["Call ID"].map(preset_map)
+        df_result["Route"] = np.where(preset.notna(), "Preset " + preset.astype(str), df_result["Route"])
+
+    return df_result
+
+
+@profiled("board.build")
+def build_board(
+    board: str,
+    df_export: pd.DataFrame,
+    df_ref: pd.DataFrame,
+    preset_map: dict[str, str] | None = None,
+) -> pd.DataFrame:
+    """
+    Export rows joined to their reference thresholds, in reference order.
+
+    `df_ref` is indexed by Mapping as returned by the reference registry. An
+    empty frame means no export row matched the reference.
+    """
+    spec = BOARD_SPECS[board]
+
+    df = normalize_export_headers(df_export)
+    check_columns(df, spec.required_cols, f"{spec.label} file")
+    check_columns(df_ref, spec.required_ref_cols, "Reference file")
+
+    df["Mapping Format"] = df["ME"].astype(str).str.strip() + df["Measure Object"].astype(str).str.strip()
+
+    ref_cols = list(spec.ref_cols) + [c for c in spec.optional_ref_cols if c in df_ref.columns] + ["order"]
+    with profile_stage("board.merge", rows_in=len(df)) as stage:
+        df_merged = pd.merge(df, df_ref[ref_cols], left_on="Mapping Format", right_index=True, how="inner")
+        stage.rows_out = len(df_merged)
+
+    opt_cols = [c for c in spec.optional_ref_cols if c in df_merged.columns]
+    show_cols = opt_cols + [c for c in spec.result_cols if c not in opt_cols]
+
+    df_result = df_merged[show_cols + ["order"]]
+    if board == "Line":
+        df_result = apply_preset_map(df_result, preset_map or {})
+
+    df_result = df_result.sort_values("order", kind="stable").drop(columns=["order"]).reset_index(drop=True)
+
+    for c in spec.numeric_cols:
+        if c in df_result.columns:
+            df_result[c] = pd.to_numeric(df_result[c], errors="coerce")
+
+    return df_result
+
+
+def board_status(board: str, df_result: pd.DataFrame) -> tuple[pd.DataFrame, RuleResult]:
+    """`df_result` with an "Issue" flag per row from the board's rules, and the rule result itself."""
+    issues = evaluate_board(board, df_result)
+    df_status = df_result.copy(deep=False)
+    df_status["Issue"] = issues.rows
+
+    return df_status, issues
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from services.profiling import profile_stage, profiled
+
+
+class FilterIndex:
+    """
+    Categorical codes and postings for the filter columns of one frame.
+
+    Values are compared as strings like the multiselect options. Codes follow
+    the sorted option order and missing values get code -1, so they never
+    appear as an option and never match a selection.
+    """
+
+    def __init__(self, df: pd.DataFrame, cols: list[str]):
+        self.n_rows = len(df)
+        self.codes: dict[str, np.ndarray] = {}
+        self.uniques: dict[str, np.ndarray] = {}
+        self.lookup: dict[str, dict[str, int]] = {}
+        self._order: dict[str, np.ndarray] = {}
+        self._bounds: dict[str, np.ndarray] = {}
+
+        for c in cols:
+            values = df[c]
+            labels = values.astype(str).where(values.notna())
+            codes, uniques = pd.factorize(labels, sort=True)
+
+            codes = codes.astype(np.int32, copy=False)
+            self.codes[c] = codes
+            self.uniques[c] = np.asarray(uniques, dtype=object)
+            self.lookup[c] = {u: i for i, u in enumerate(self.uniques[c])}
+
+            # postings: row positions grouped by code, code k owns order[bounds[k]:bounds[k + 1]]
+            known = np.flatnonzero(codes >= 0)
+            self._order[c] = known[np.argsort(codes[known], kind="stable")]
+            self._bounds[c] = np.concatenate(([0], np.cumsum(np.bincount(codes[known], minlength=len(uniques)))))
+
+    def options(self, col: str, mask: np.ndarray | None = None) -> list[str]:
+        codes = self.codes[col] if mask is None else self.codes[col][mask]
+        present = np.bincount(codes[codes >= 0], minlength=len(self.uniques[col])) > 0
+
+        return self.uniques[col][present].tolist()
+
+    def rows(self, col: str, values: list[str]) -> np.ndarray:
+        """Sorted row positions whose value is one of `values`."""
+        order, bounds = self._order[col], self._bounds[col]
+        parts = [
+            order[bounds[k]:bounds[k + 1]]
+            for k in (self.lookup[col].get(v) for v in values)
+            if k is not None
+        ]
+
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.intp)
+
+    def mask(self, col: str, values: list[str]) -> np.ndarray:
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.rows(col, values)] = True
+
+        return mask
+
+
+def get_filter_index(df: pd.DataFrame, cols: list[str], ns: str, data_key: str | None = None) -> FilterIndex:
+    """
+    The index of `df`, reused across reruns without looking at the data.
+
+    Pages rebuild their frame every rerun, so they pass `data_key`: a cheap
+    identity of everything the frame is built from (upload cache key,
+    reference version, ...). Without it the frame object itself is the
+    identity; it is kept alive with the index so its id is never reused.
+    """
+    key = f"{ns}_filter_index"
+    token = (data_key if data_key is not None else id(df), len(df), tuple(cols))
+
+    cached = st.session_state.get(key)
+    if cached is None or cached[0] != token:
+        with profile_stage("filter.index", rows_in=len(df)):
+            cached = (token, None if data_key is not None else df, FilterIndex(df, cols))
+        st.session_state[key] = cached
+
+    return cached[2]
+
+
+@profiled("filter.cascade")
+def cascading_filter(
+    df: pd.DataFrame,
+    cols: list[str],
+    *,
+    ns: str = "flt",
+    labels: dict[str, str] | None = None,
+    clear_text: str = "Clear Filters",
+    data_key: str | None = None,
+):
+
+    if labels is None:
+        labels = {}
+
+    # เตรียม state
+    for c in cols:
+        st.session_state.setdefault(f"{ns}_f_{c}", [])
+
+    # คอลัมน์ที่มีอยู่จริงเท่านั้น
+    active_cols = [c for c in cols if c in df.columns]
+    if not active_cols:
+        return df.reset_index(drop=True), {}
+
+    # index สร้างครั้งเดียวต่อชุดข้อมูล แล้วใช้ซ้ำทุก rerun
+    index = get_filter_index(df, active_cols, ns, data_key)
+
+    # สร้าง options ทีละชั้นด้วย mask สะสม
+    mask = None
+    options_per_col = []
+    for c in active_cols:
+        opts = index.options(c, mask)
+        options_per_col.append(opts)
+
+        # prune ค่าเลือกที่ไม่อยู่ใน opts (กัน selection ค้าง)
+        allowed = set(opts)
+        valid_sel = [x for x in st.session_state[f"{ns}_f_{c}"] if x in allowed]
+        st.session_state[f"{ns}_f_{c}"] = valid_sel
+
+        # อัปเดต mask สำหรับคอลัมน์ถัดไป
+        if valid_sel:
+            col_mask = index.mask(c, valid_sel)
+            mask = col_mask if mask is None else mask & col_mask
+
+    # วาด widgets เป็นแถวเดียว + ปุ่ม Clear
+    cols_widgets = st.columns([1] * len(active_cols) + [0.8])
+    for i, c in enumerate(active_cols):
+        with cols_widgets[i]:
+            st.multiselect(
+                labels.get(c, c),
+                options_per_col[i],
+                key=f"{ns}_f_{c}",
+            )
+
+    def _clear():
+        for c in active_cols:
+            st.session_state.pop(f"{ns}_f_{c}", None)
+
+    with cols_widgets[-1]:
+        st.button(clear_text, on_click=_clear)
+
+    # สร้าง final mask จาก selections ทั้งหมด
+    selections = {}
+    positions = None
+    for c in active_cols:
+        sel = st.session_state.get(f"{ns}_f_{c}", [])
+        selections[c] = sel
+        if sel:
+            rows = index.rows(c, sel)
+            positions = rows if positions is None else np.intersect1d(positions, rows, assume_unique=True)
+
+    # ไม่มีการเลือก: คืน frame เดิมแบบ shallow ไม่ copy ข้อมูล
+    if positions is None:
+        df_out = df.copy(deep=False)
+        df_out.index = pd.RangeIndex(len(df_out))
+        return df_out, selections
+
+    return df.take(positions).reset_index(drop=True), selections
@@ -0,0 +1,367 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from services.columnar import read_parquet, write_parquet_atomic
+from services.ingest import ColumnPlan
+from services.profiling import profiled
+
+# Target ME sits in brackets inside the OSC Measure Object
+TARGET_ME_RE = re.compile(r"\(([^)]+)\)")
+
+
+def extract_target(measure_obj) -> str | None:
+    match = TARGET_ME_RE.search(str(measure_obj))
+    return match.group(1) if match else None
+
+
+FLAPPING_STORE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "flapping"
+# workspace stores are dropped once unused this long, and least recently used first past the size limit
+FLAPPING_STORE_MAX_AGE_DAYS = 30
+FLAPPING_STORE_MAX_MB = 512
+
+# Flapping threshold on Max - Min input power
+FLAPPING_DB = 2
+OSC_KEY_COLS = ["ME", "Measure Object", "Begin Time"]
+FM_KEY_COLS = ["Link", "Occurrence Time"]
+FM_OPTIONAL_KEY_COLS = ["Alarm Name", "Alarm Code"]
+
+# export columns used for matching and display; the rest of the sheet is never parsed
+OSC_PLAN = ColumnPlan(
+    (
+        "Begin Time", "End Time", "Granularity", "ME", "ME IP", "Measure Object",
+        "Max Value of Input Optical Power(dBm)", "Min Value of Input Optical Power(dBm)", "Input Optical Power(dBm)",
+    ),
+    text_cols=("ME", "Measure Object"),
+)
+# exports name the link column differently ("Link", "Link Name", ...)
+FM_PLAN = ColumnPlan(("Occurrence Time", "Clear Time", *FM_OPTIONAL_KEY_COLS), prefixes=("Link",))
+
+
+def find_link_col(df_fm: pd.DataFrame) -> str:
+    return [col for col in df_fm.columns if col.startswith("Link")][0]
+
+
+def prepare_osc(df_optical: pd.DataFrame) -> pd.DataFrame:
+    """OSC rows whose input power swung more than FLAPPING_DB, with Target ME and parsed times."""
+    df_optical = df_optical.copy()
+    df_optical.columns = df_optical.columns.str.strip()
+    df_optical["Max - Min (dB)"] = (
+        df_optical["Max Value of Input Optical Power(dBm)"]
+        - df_optical["Min Value of Input Optical Power(dBm)"]
+    )
+
+    # Extract Target ME (kept for logic; will not display)
+    df_optical["Target ME"] = df_optical["Measure Object"].apply(extract_target)
+    df_optical["Begin Time"] = pd.to_datetime(df_optical["Begin Time"], errors="coerce")
+    df_optical["End Time"] = pd.to_datetime(df_optical["End Time"], errors="coerce")
+
+    return df_optical[df_optical["Max - Min (dB)"] > FLAPPING_DB].reset_index(drop=True)
+
+
+def prepare_fm(df_fm: pd.DataFrame) -> pd.DataFrame:
+    """FM alarms reduced to the columns matching and deduplication need."""
+    df_fm = df_fm.copy()
+    df_fm.columns = df_fm.columns.str.strip()
+    # exports name the link column differently ("Link", "Link Name", ...)
+    df_fm = df_fm.rename(columns={find_link_col(df_fm): "Link"})
+
+    for col in FM_OPTIONAL_KEY_COLS:
+        if col not in df_fm.columns:
+            df_fm[col] = None
+
+    df_fm = df_fm[FM_KEY_COLS + ["Clear Time"] + FM_OPTIONAL_KEY_COLS].copy()
+    df_fm["Link"] = df_fm["Link"].astype(str)
+    df_fm["Occurrence Time"] = pd.to_datetime(df_fm["Occurrence Time"], errors="coerce")
+    df_fm["Clear Time"] = pd.to_datetime(df_fm["Clear Time"], errors="coerce")
+
+    return df_fm
+
+
+class AlarmIndex:
+    """
+    FM alarms indexed per (ME, Target ME) link for interval lookups.
+
+    An OSC interval matches when some alarm on its link has
+    `Occurrence Time <= End Time` and `Clear Time >= Begin Time`. Alarms of a
+    link are sorted by occurrence with a running max of clear time, so each
+    OSC row is answered with one binary search.
+    """
+
+    def __init__(self, df_fm: pd.DataFrame):
+        df_fm = df_fm.copy()
+        df_fm.columns = df_fm.columns.str.strip()
+
+        occurrence = pd.to_datetime(df_fm["Occurrence Time"], errors="coerce")
+        clear = pd.to_datetime(df_fm["Clear Time"], errors="coerce")
+        # comparisons against NaT never matched, so those alarms can never match
+        valid = (occurrence.notna() & clear.notna()).to_numpy()
+
+        self.links = df_fm.loc[valid, find_link_col(df_fm)].astype(str).reset_index(drop=True)
+        self.occurrence = occurrence[valid].to_numpy(dtype="datetime64[ns]")
+        self.clear = clear[valid].to_numpy(dtype="datetime64[ns]")
+
+        self._mentions: dict[str, np.ndarray] = {}
+        self._by_link: dict[tuple[str, str], tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+    def mentions(self, name: str) -> np.ndarray:
+        # same substring test as the old escaped str.contains, done once per ME name
+        if name not in self._mentions:
+            self._mentions[name] = self.links.str.contains(name, regex=False).fillna(False).to_numpy(dtype=bool)
+
+        return self._mentions[name]
+
+    def alarms_for(self, me: str, target_me: str) -> tuple[np.ndarray, np.ndarray]:
+        key = (me, target_me)
+        if key not in self._by_link:
+            on_link = self.mentions(me) & self.mentions(target_me)
+
+            occurrence = self.occurrence[on_link]
+            order = np.argsort(occurrence, kind="stable")
+            clear_running_max = np.maximum.accumulate(self.clear[on_link][order]) if order.size else self.clear[:0]
+
+            self._by_link[key] = (occurrence[order], clear_running_max)
+
+        return self._by_link[key]
+
+    def overlaps(self, me: str, target_me: str, begin: np.ndarray, end: np.ndarray) -> np.ndarray:
+        occurrence, clear_running_max = self.alarms_for(me, target_me)
+        matched = np.zeros(len(begin), dtype=bool)
+        if occurrence.size == 0:
+            return matched
+
+        known = ~np.isnat(begin) & ~np.isnat(end)
+        # alarms that started before each interval ended
+        started = np.searchsorted(occurrence, end[known], side="right")
+        has_started = started > 0
+        latest_clear = clear_running_max[np.maximum(started - 1, 0)]
+        matched[known] = has_started & (latest_clear >= begin[known])
+
+        return matched
+
+    def match(self, df_osc: pd.DataFrame) -> np.ndarray:
+        """Boolean mask over `df_osc` rows that overlap an alarm on their link."""
+        matched = np.zeros(len(df_osc), dtype=bool)
+        if len(df_osc) == 0 or len(self) == 0:
+            return matched
+
+        begin = pd.to_datetime(df_osc["Begin Time"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+        end = pd.to_datetime(df_osc["End Time"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+
+        # str() like the old per-row lookup, so a missing Target ME is searched as "None"/"nan"
+        links = pd.DataFrame({
+            "ME": df_osc["ME"].map(str).to_numpy(dtype=object),
+            "Target ME": df_osc["Target ME"].map(str).to_numpy(dtype=object),
+        })
+        for (me, target_me), positions in links.groupby(["ME", "Target ME"], sort=False).indices.items():
+            matched[positions] = self.overlaps(me, target_me, begin[positions], end[positions])
+
+        return matched
+
+
+def unmatched_flapping(df_optical: pd.DataFrame, df_fm: pd.DataFrame) -> pd.DataFrame:
+    """One-shot Fiber Flapping check: OSC flapping intervals with no overlapping FM alarm."""
+    df_osc = prepare_osc(df_optical).drop_duplicates(OSC_KEY_COLS).reset_index(drop=True)
+    matched = AlarmIndex(df_fm).match(df_osc) if len(df_fm) else np.zeros(len(df_osc), dtype=bool)
+
+    return df_osc[~matched].reset_index(drop=True)
+
+
+class FlappingStore:
+    """
+    OSC flapping intervals and FM alarms accumulated across uploads.
+
+    OSC rows are deduplicated on (ME, Measure Object, Begin Time) and alarms on
+    their link, occurrence time and alarm name. Each OSC row keeps its
+    "Alarm Matched" flag. New OSC rows are matched against all stored alarms,
+    and new alarms are matched only against rows that were still unmatched.
+    """
+
+    def __init__(self, store_dir: Path = FLAPPING_STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self.osc_path = self.store_dir / "osc.parquet"
+        self.fm_path = self.store_dir / "fm.parquet"
+        self.meta_path = self.store_dir / "ingested.json"
+
+        self.lock = threading.Lock()
+        # bumped on every change, a cheap identity of the stored data
+        self.revision = 0
+        self._osc: pd.DataFrame | None = None
+        self._fm: pd.DataFrame | None = None
+        self._ingested: set[str] | None = None
+
+    # ------- Storage -------
+    def _load(self):
+        if self._osc is not None:
+            return
+
+        try:
+            self._osc = read_parquet(self.osc_path)
+            self._fm = read_parquet(self.fm_path)
+            self._ingested = set(json.loads(self.meta_path.read_text()))
+        except (FileNotFoundError, OSError, ValueError):
+            self._osc = pd.DataFrame()
+            self._fm = pd.DataFrame(columns=FM_KEY_COLS + ["Clear Time"] + FM_OPTIONAL_KEY_COLS)
+            self._ingested = set()
+
+    def _save(self):
+        self.revision += 1
+        write_parquet_atomic(self._osc, self.osc_path)
+        write_parquet_atomic(self._fm, self.fm_path)
+        self.meta_path.write_text(json.dumps(sorted(self._ingested)))
+
+    @property
+    def osc(self) -> pd.DataFrame:
+        with self.lock:
+            self._load()
+            # shallow copy: callers may add or replace columns without touching the stored frame
+            return self._osc.copy(deep=False)
+
+    @property
+    def fm(self) -> pd.DataFrame:
+        with self.lock:
+            self._load()
+            return self._fm.copy(deep=False)
+
+    def has_ingested(self, file_key: str) -> bool:
+        with self.lock:
+            self._load()
+            return file_key in self._ingested
+
+    def clear(self):
+        with self.lock:
+            for path in (self.osc_path, self.fm_path, self.meta_path):
+                path.unlink(missing_ok=True)
+            self._osc = self._fm = self._ingested = None
+            self.revision += 1
+
+    # ------- Ingestion -------
+    @profiled("flapping.add_osc")
+    def add_osc(self, df_optical: pd.DataFrame, file_key: str) -> int:
+        df_new = prepare_osc(df_optical).drop_duplicates(OSC_KEY_COLS)
+
+        with self.lock:
+            self._load()
+            if len(self._osc):
+                seen = self._osc[OSC_KEY_COLS].merge(df_new[OSC_KEY_COLS], how="right", indicator=True)
+                df_new = df_new[(seen["_merge"] == "right_only").to_numpy()]
+
+            df_new = df_new.reset_index(drop=True)
+            df_new["Alarm Matched"] = AlarmIndex(self._fm).match(df_new) if len(self._fm) else False
+
+            self._osc = pd.concat([self._osc, df_new], ignore_index=True) if len(self._osc) else df_new
+            self._ingested.add(file_key)
+            self._save()
+
+        return len(df_new)
+
+    @profiled("flapping.add_fm")
+    def add_fm(self, df_fm: pd.DataFrame, file_key: str) -> int:
+        df_new = prepare_fm(df_fm)
+
+        with self.lock:
+            self._load()
+            key_cols = FM_KEY_COLS + FM_OPTIONAL_KEY_COLS
+
+            # rows not stored yet, or stored with a different Clear Time (alarm cleared since)
+            if len(self._fm):
+                seen = self._fm[key_cols + ["Clear Time"]].merge(df_new[key_cols + ["Clear Time"]], how="right", indicator=True)
+                df_changed = df_new[(seen["_merge"] == "right_only").to_numpy()]
+            else:
+                df_changed = df_new
+
+            merged = pd.concat([self._fm, df_new], ignore_index=True) if len(self._fm) else df_new
+            self._fm = merged.drop_duplicates(key_cols, keep="last").reset_index(drop=True)
+
+            if len(df_changed) and len(self._osc):
+                unmatched = ~self._osc["Alarm Matched"].to_numpy(dtype=bool)
+                rematched = AlarmIndex(df_changed).match(self._osc[unmatched])
+                self._osc.loc[unmatched, "Alarm Matched"] = rematched
+
+            self._ingested.add(file_key)
+            self._save()
+
+        return len(df_changed)
+
+
+_flapping_stores: dict[str, FlappingStore] = {}
+_flapping_store_lock = threading.Lock()
+
+
+def workspace_dir_name(workspace: str) -> str:
+    # also keeps names like ".." from leaving FLAPPING_STORE_DIR
+    return re.sub(r"[^\w.-]", "_", workspace)[:64].lstrip(".") or "_"
+
+
+def _store_size(store_dir: Path) -> int:
+    size = 0
+    for path in store_dir.iterdir():
+        try:
+            size += path.stat().st_size
+        except FileNotFoundError:
+            continue
+
+    return size
+
+
+def evict_flapping_stores(keep: str, max_age_s: float, max_bytes: int):
+    """
+    Drop workspace stores unused for `max_age_s`, then the least recently
+    used ones until all of them fit in `max_bytes`. `keep` is never dropped.
+    Called with _flapping_store_lock held.
+    """
+    entries = []
+    for store_dir in FLAPPING_STORE_DIR.glob("*"):
+        if not store_dir.is_dir():
+            continue
+        try:
+            entries.append((store_dir.stat().st_mtime, _store_size(store_dir), store_dir))
+        except FileNotFoundError:
+            continue
+
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    for used_at, size, store_dir in sorted(entries):
+        if total <= max_bytes and now - used_at < max_age_s:
+            break
+        if store_dir.name == keep:
+            continue
+
+        store = _flapping_stores.pop(store_dir.name, None)
+        if store is not None:
+            # a session still holding it sees an empty store instead of stale frames
+            store.clear()
+        shutil.rmtree(store_dir, ignore_errors=True)
+        total -= size
+
+
+def get_flapping_store(workspace: str) -> FlappingStore:
+    """
+    The store of one workspace (a user or a browser session), kept in its
+    own directory. Opening a workspace marks it used; opening a new one
+    evicts stale workspaces (see evict_flapping_stores).
+    """
+    name = workspace_dir_name(workspace)
+    store_dir = FLAPPING_STORE_DIR / name
+
+    with _flapping_store_lock:
+        if name not in _flapping_stores:
+            evict_flapping_stores(
+                name,
+                max_age_s=float(os.getenv("flapping_store_max_age_days", FLAPPING_STORE_MAX_AGE_DAYS)) * 86400,
+                max_bytes=int(os.getenv("flapping_store_max_mb", FLAPPING_STORE_MAX_MB)) * 1024 * 1024,
+            )
+            _flapping_stores[name] = FlappingStore(store_dir)
+
+        if store_dir.is_dir():
+            os.utime(store_dir)
+
+        return _flapping_stores[name]
@@ -0,0 +1,249 @@
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from components.boards import BOARD_SPECS, EXPORT_TIME_COLS, normalize_export_headers
+from services.profiling import profiled
+
+HISTORY_DIR = Path(__file__).resolve().parent.parent / ".cache" / "history"
+
+KEY_COLS = ("Mapping", "ME", "Measure Object")
+# a measurement period of one object; exports that overlap in time share these rows
+ROW_KEY_COLS = ["Mapping", "Begin Time", "End Time"]
+SORT_KEYS = [("ME", "ascending"), ("Mapping", "ascending"), ("Begin Time", "ascending")]
+# files are sorted by ME, so per-ME reads skip most row groups by their statistics
+ROW_GROUP_SIZE = 64_000
+
+
+def value_cols(board: str) -> tuple[str, ...]:
+    """The measured export columns of a board (thresholds come from the reference, not the export)."""
+    spec = BOARD_SPECS[board]
+    return tuple(c for c in spec.numeric_cols if c in spec.required_cols)
+
+
+def history_schema(board: str) -> pa.Schema:
+    return pa.schema(
+        [(c, pa.string()) for c in KEY_COLS]
+        + [(c, pa.timestamp("us")) for c in EXPORT_TIME_COLS]
+        + [(c, pa.float64()) for c in value_cols(board)]
+        + [("Snapshot", pa.string()), ("Ingested At", pa.timestamp("us"))]
+    )
+
+
+def snapshot_rows(board: str, df_export: pd.DataFrame, snapshot: str, ingested_at: datetime) -> pa.Table | None:
+    """
+    Export rows in the board's history schema; None when the export has no
+    ME / Measure Object to key them on. Exports without Begin/End Time are
+    stamped with the ingestion time.
+    """
+    df = normalize_export_headers(df_export)
+    if "ME" not in df.columns or "Measure Object" not in df.columns:
+        return None
+
+    me = df["ME"].astype(str).str.strip()
+    measure_object = df["Measure Object"].astype(str).str.strip()
+    columns = {"Mapping": me + measure_object, "ME": me, "Measure Object": measure_object}
+
+    stamp = pd.Timestamp(ingested_at)
+    for c in EXPORT_TIME_COLS:
+        times = pd.to_datetime(df[c], errors="coerce") if c in df.columns else pd.Series(pd.NaT, index=df.index)
+        columns[c] = times.fillna(stamp).astype("datetime64[us]")
+
+    for c in value_cols(board):
+        columns[c] = pd.to_numeric(df[c], errors="coerce") if c in df.columns else float("nan")
+
+    df_rows = pd.DataFrame(columns, index=df.index)
+    df_rows["Snapshot"] = snapshot
+    df_rows["Ingested At"] = stamp.as_unit("us")
+    df_rows = df_rows.drop_duplicates(ROW_KEY_COLS, keep="last").sort_values(["ME", "Mapping", "Begin Time"], kind="stable")
+
+    return pa.Table.from_pandas(df_rows, schema=history_schema(board), preserve_index=False)
+
+
+def _write_table_atomic(table: pa.Table, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+
+    try:
+        pq.write_table(table, tmp_name, row_group_size=ROW_GROUP_SIZE)
+        os.replace(tmp_name, path)
+    except Exception:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+class HistoryStore:
+    """
+    Every uploaded CPU/FAN/MSU/Client/Line export, kept as Parquet so past
+    snapshots can be compared without re-uploading (or re-parsing) them.
+
+    Files are partitioned by board and by the day of their Begin Time:
+    `board=<board>/date=<YYYY-MM-DD>/<snapshot>.parquet`, where the snapshot
+    key is the upload cache key of the file, so the same file is stored once.
+    A row whose (Mapping, Begin Time, End Time) is already stored is skipped,
+    so exports covering overlapping periods don't count a period twice.
+    Range queries only open the days they cover; inside a file rows are
+    sorted by ME so per-ME queries skip row groups by their statistics.
+    """
+
+    def __init__(self, root: Path = HISTORY_DIR):
+        self.root = Path(root)
+        self.lock = threading.Lock()
+        self._snapshots: dict[str, set[str]] = {}
+
+    def _board_dir(self, board: str) -> Path:
+        return self.root / f"board={board}"
+
+    def _known(self, board: str) -> set[str]:
+        # called with the lock held
+        if board not in self._snapshots:
+            self._snapshots[board] = {p.stem for p in self._board_dir(board).glob("date=*/*.parquet")}
+
+        return self._snapshots[board]
+
+    def has_snapshot(self, board: str, snapshot: str) -> bool:
+        with self.lock:
+            return snapshot in self._known(board)
+
+    def _new_rows(self, board: str, day: str, part: pa.Table) -> pa.Table:
+        # called with the lock held; duplicates share Begin Time, so only this day's files are read
+        files = [str(p) for p in (self._board_dir(board) / f"date={day}").glob("*.parquet")]
+        if not files:
+            return part
+
+        stored = ds.dataset(files, schema=history_schema(board), format="parquet").to_table(columns=ROW_KEY_COLS)
+        return part.join(stored, keys=ROW_KEY_COLS, join_type="left anti").sort_by(SORT_KEYS)
+
+    @profiled("history.append")
+    def append(self, board: str, df_export: pd.DataFrame, snapshot: str, ingested_at: datetime | None = None) -> int:
+        """
+        Store an export as snapshot `snapshot`; the number of rows added
+        (0 if the snapshot or all of its rows are already stored).
+        """
+        if self.has_snapshot(board, snapshot):
+            return 0
+
+        table = snapshot_rows(board, df_export, snapshot, ingested_at or datetime.now())
+        if table is None or table.num_rows == 0:
+            return 0
+
+        days = pc.strftime(table["Begin Time"], format="%Y-%m-%d")
+        added = 0
+        with self.lock:
+            if snapshot in self._known(board):
+                return 0
+
+            for day in pc.unique(days).to_pylist():
+                part = self._new_rows(board, day, table.filter(pc.equal(days, day)))
+                if part.num_rows:
+                    _write_table_atomic(part, self._board_dir(board) / f"date={day}" / f"{snapshot}.parquet")
+                    added += part.num_rows
+            self._known(board).add(snapshot)
+
+        return added
+
+    def days(self, board: str) -> list[date]:
+        return sorted(
+            date.fromisoformat(p.name.removeprefix("date="))
+            for p in self._board_dir(board).glob("date=*")
+            if any(p.glob("*.parquet"))
+        )
+
+    def _files(self, board: str, start: date | None, end: date | None) -> list[str]:
+        files = []
+        for day in self.days(board):
+            if (start is None or day >= start) and (end is None or day <= end):
+                files.extend(str(p) for p in sorted((self._board_dir(board) / f"date={day}").glob("*.parquet")))
+
+        return files
+
+    @profiled("history.query")
+    def query(
+        self,
+        board: str,
+        start: datetime | date | None = None,
+        end: datetime | date | None = None,
+        mes: list[str] | None = None,
+        mappings: list[str] | None = None,
+        columns: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Stored rows of `board` whose Begin Time is in [start, end], optionally
+        for some MEs or Mappings only. A date `end` covers that whole day.
+        """
+        schema = history_schema(board)
+        start_ts = pd.Timestamp(start) if start is not None else None
+        if end is None:
+            end_ts = None
+        elif isinstance(end, datetime):
+            end_ts = pd.Timestamp(end)
+        else:
+            end_ts = pd.Timestamp(end) + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+
+        files = self._files(
+            board,
+            start_ts.date() if start_ts is not None else None,
+            end_ts.date() if end_ts is not None else None,
+        )
+        if not files:
+            empty = schema.empty_table()
+            return (empty if columns is None else empty.select(columns)).to_pandas()
+
+        condition = None
+        for expr in (
+            ds.field("Begin Time") >= pa.scalar(start_ts.to_pydatetime(), pa.timestamp("us")) if start_ts is not None else None,
+            ds.field("Begin Time") <= pa.scalar(end_ts.to_pydatetime(), pa.timestamp("us")) if end_ts is not None else None,
+            ds.field("ME").isin(list(mes)) if mes else None,
+            ds.field("Mapping").isin(list(mappings)) if mappings else None,
+        ):
+            if expr is not None:
+                condition = expr if condition is None else condition & expr
+
+        dataset = ds.dataset(files, schema=schema, format="parquet")
+        return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+    def snapshots(self, board: str) -> pd.DataFrame:
+        """One row per stored snapshot: its time span, row count and when it was uploaded."""
+        df = self.query(board, columns=["Snapshot", "Begin Time", "End Time", "Ingested At"])
+        if df.empty:
+            return pd.DataFrame(columns=["Snapshot", "From", "To", "Rows", "Ingested At"])
+
+        return (
+            df.groupby("Snapshot", as_index=False)
+            .agg(**{
+                "From": ("Begin Time", "min"),
+                "To": ("End Time", "max"),
+                "Rows": ("Begin Time", "size"),
+                "Ingested At": ("Ingested At", "max"),
+            })
+            .sort_values("Ingested At", ascending=False, ignore_index=True)
+        )
+
+    def clear(self, board: str):
+        with self.lock:
+            shutil.rmtree(self._board_dir(board), ignore_errors=True)
+            self._snapshots.pop(board, None)
+
+
+_history_store: HistoryStore | None = None
+_history_store_lock = threading.Lock()
+
+
+def get_history_store() -> HistoryStore:
+    global _history_store
+
+    with _history_store_lock:
+        if _history_store is None:
+            _history_store = HistoryStore(Path(os.getenv("history_dir", HISTORY_DIR)))
+
+    return _history_store
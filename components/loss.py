@@ -1,7 +1,21 @@
 from abc import ABC, abstractmethod
+from html import escape
 import math
+import numpy as np
 import streamlit as st
 import pandas as pd
+from components.table import CellStyle, paginate, render_table
+from services.database import Database
+from services.ingest import ColumnPlan
+from services.profiling import profile_stage, profiled
+
+# Status codes double as sort priority: errors first, then breaks, then the rest
+STATUS_ERROR = 0
+STATUS_FLAPPING = 1
+STATUS_OK = 10
+LOSS_THRESHOLD = 2
+
+ATTENUATION_PLAN = ColumnPlan(("Source Port", "Sink Port", "Optical Attenuation (dB)"))
 
 
 # region Base Analyzer for Loss
@@ -9,20 +23,14 @@ class LossAnalyzer(ABC):
     def __init__(
         self, 
         df_ref: pd.DataFrame | None = None, 
-        df_raw_data: pd.DataFrame | None = None
+        df_raw_data: pd.DataFrame | None = None,
+        database: Database | None = None,
     ):
         self.df_ref = df_ref
         self.df_raw_data = df_raw_data
+        self.database = database
 
     # ------- Utilities -------
-    @staticmethod
-    def is_castable_to_float(x) -> bool:
-        try:
-            float(x)
-            return True
-        except (ValueError, TypeError):
-            return False
-
     @staticmethod
     def countDay(df_ref: pd.DataFrame):
         days = (len(df_ref.columns) - 11) / 4
@@ -58,11 +66,20 @@ class LossAnalyzer(ABC):
         return color
 
     @staticmethod
-    def getColorRow(row):
-        status = LossAnalyzer.getStatus(row["Loss current - Loss EOL"])
+    def status_codes(values: pd.Series, threshold = LOSS_THRESHOLD) -> np.ndarray:
+        """Vectorized getStatus as integer codes; "--" and other text count as a break."""
+        numeric = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
 
-        color_style = LossAnalyzer.getColor(status)
-        return [color_style] * len(row)
+        codes = np.full(len(numeric), STATUS_OK, dtype=np.int8)
+        with np.errstate(invalid="ignore"):
+            codes[numeric >= threshold] = STATUS_ERROR
+        codes[np.isnan(numeric)] = STATUS_FLAPPING
+
+        return codes
+
+    @staticmethod
+    def status_styles(codes: np.ndarray) -> list[CellStyle]:
+        return [CellStyle(codes == code, css) for code, css in STATUS_CSS.items()]
 
     @staticmethod
     def draw_color_legend(legend_type="eol"):
@@ -91,23 +108,28 @@ class LossAnalyzer(ABC):
         """, unsafe_allow_html=True)
 
     # ------- Common Data Processing Methods -------
+    @profiled("loss.extract_raw_data")
     def extract_raw_data(self, df_raw_data: pd.DataFrame) -> pd.DataFrame:
-        df_raw_data.columns = df_raw_data.columns.str.strip()
+        df_raw_data = df_raw_data.rename(columns=lambda c: c.strip())
         df_atten = pd.DataFrame()
         source_port_col = df_raw_data["Source Port"]
         sink_port_col = df_raw_data["Sink Port"]
 
         df_atten["Link Name"] = source_port_col + "_" + sink_port_col
         df_atten["Current Attenuation(dB)"] = df_raw_data["Optical Attenuation (dB)"]
-        df_atten["Remark"] = df_atten["Current Attenuation(dB)"].apply(
-            lambda x: "" if self.is_castable_to_float(x) else "Fiber Break"
-        )
+
+        # parsed once here and carried through the join; text such as "--" marks a break
+        df_atten["_current"] = pd.to_numeric(df_atten["Current Attenuation(dB)"], errors="coerce")
+        broken = df_atten["_current"].isna() & df_atten["Current Attenuation(dB)"].notna()
+        df_atten["Remark"] = np.where(broken, "Fiber Break", "")
 
         return df_atten
 
+    @profiled("loss.calculate_eol_diff")
     def calculate_eol_diff(self, df_eol: pd.DataFrame) -> pd.DataFrame:
-        df_eol_diff = df_eol.copy()
-        current_atten_col = pd.to_numeric(df_eol["Current Attenuation(dB)"], downcast="float", errors="coerce")
+        df_eol_diff = df_eol.copy(deep=False)
+        current_atten_col = df_eol["_current"] if "_current" in df_eol.columns else df_eol["Current Attenuation(dB)"]
+        current_atten_col = pd.to_numeric(current_atten_col, downcast="float", errors="coerce")
         eol_ref_col = pd.to_numeric(df_eol["EOL(dB)"], downcast="float", errors="coerce")
         calculated_diff = current_atten_col - eol_ref_col - 1
 
@@ -117,6 +139,7 @@ class LossAnalyzer(ABC):
 
         return df_eol_diff[ordered_cols]
     
+    @profiled("loss.build_result_df")
     def build_result_df(self):
         if self.df_ref is not None and self.df_raw_data is not None:
             df_atten: pd.DataFrame = self.extract_raw_data(self.df_raw_data)
@@ -126,30 +149,46 @@ class LossAnalyzer(ABC):
 
         return df_result
     
+    @profiled("loss.load_reference")
+    def load_reference(self, selected_me_name: str | None = None) -> pd.DataFrame | None:
+        if self.database is None:
+            return self.df_ref
+
+        # only the selected ME's links come over the wire
+        return self.database.get_reference_sheet(me_name=selected_me_name)
+
+    @profiled("loss.load_link_names")
+    def load_link_names(self) -> pd.DataFrame | None:
+        if self.database is None:
+            return self.df_ref
+
+        return self.database.get_reference_sheet(columns=["Link Name"])
+
     def get_me_names(self, df_result: pd.DataFrame) -> list[str]:
-        link_names: list[str] = df_result["Link Name"].tolist()
-        me_names = [ link_name.split("-")[0] for link_name in link_names ]
+        me_names = df_result["Link Name"].astype(str).str.split("-", n=1).str[0]
 
-        return me_names
+        return pd.unique(me_names).tolist()
     
     @staticmethod
     def is_correct_me(row: pd.Series, me_name: str) -> bool:
         link_name = row["Link Name"]
         return me_name in link_name
     
+    @profiled("loss.filter_me")
     def get_filtered_result(self, df_result: pd.DataFrame, selected_me_name: str) -> pd.DataFrame:
         if not selected_me_name:
             return df_result.reset_index(drop=True)
         
-        mask = df_result["Link Name"].astype(str).str.contains(selected_me_name, na=False)
+        mask = df_result["Link Name"].astype(str).str.contains(selected_me_name, regex=False, na=False)
         return df_result[mask].reset_index(drop=True)
     
-    def sort_df(self, df: pd.DataFrame) -> pd.DataFrame:
-        filtered_df = df.copy()
-        filtered_df["_sort_priority"] = filtered_df.apply(lambda row: LossAnalyzer.get_sort_priority(row, "Loss current - Loss EOL"), axis=1)
-        sorted_df = filtered_df.sort_values("_sort_priority").drop("_sort_priority", axis=1).reset_index(drop=True)
+    @profiled("loss.sort")
+    def sort_df(self, df: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray]:
+        """Rows ordered error → flapping → ok (stable), with their status codes."""
+        codes = self.status_codes(df["Loss current - Loss EOL"])
+        order = np.argsort(codes, kind="stable")
         
-        return sorted_df
+        return df.take(order).reset_index(drop=True), codes[order]
 
     
     def get_selected_me_name(self, df_result):
@@ -164,75 +203,173 @@ class LossAnalyzer(ABC):
 
         return selected_me_name
 
+    @staticmethod
+    def label_status(df: pd.DataFrame, codes: np.ndarray) -> pd.DataFrame:
+        df = df.copy(deep=False)
+        df["Status"] = pd.Series(codes).map(STATUS_LABELS).to_numpy()
+
+        return df
+
+    @abstractmethod
+    def status_table(self) -> pd.DataFrame:
+        """Whole-reference result with a Status column, for headless runs."""
+        raise NotImplementedError("Each analyzer must implement its own status_table()")
+
     @abstractmethod
     def process(self):
         raise NotImplementedError("Each analyzer must implement its own process()")
 
 
+STATUS_LABELS = {
+    STATUS_ERROR: "error",
+    STATUS_FLAPPING: "flapping",
+    STATUS_OK: "ok",
+}
+
+STATUS_CSS = {
+    STATUS_ERROR: LossAnalyzer.getColor("error"),
+    STATUS_FLAPPING: LossAnalyzer.getColor("flapping"),
+}
+
+
 # region Analyzer for EOL
 class EOLAnalyzer(LossAnalyzer):
+    def status_table(self) -> pd.DataFrame:
+        df_sorted, codes = self.sort_df(self.build_result_df())
+
+        return self.label_status(df_sorted, codes)
+
     def process(self):
-        if self.df_ref is not None and self.df_raw_data is not None:
-            df_result = self.build_result_df()
+        df_link_names = self.load_link_names() if self.df_raw_data is not None else None
+        if df_link_names is not None:
+            selected_me_name = self.get_selected_me_name(df_link_names)
+            self.df_ref = self.load_reference(selected_me_name)
 
-            selected_me_name = self.get_selected_me_name(df_result)
+            df_result = self.build_result_df()
             df_filtered = self.get_filtered_result(df_result, selected_me_name)
-            df_sorted = self.sort_df(df_filtered)
+            df_sorted, codes = self.sort_df(df_filtered)
 
-            st.dataframe(df_sorted.style.apply(self.getColorRow, axis=1), hide_index=True)
+            render_table(df_sorted, ns="eol_loss", styles=self.status_styles(codes), hide_index=True)
 
             self.draw_color_legend("eol")
 
 
 # region Analyzer for Core
 class CoreAnalyzer(LossAnalyzer):
+    def status_table(self) -> pd.DataFrame:
+        df_loss_between_core = self.calculate_loss_between_core(self.build_result_df())
+        df_sorted, codes, _ = self.sort_pairs(df_loss_between_core)
+
+        return self.label_status(df_sorted.drop(columns=["_pair"]), codes)
+
+    def pair_keys(self, df_result: pd.DataFrame) -> pd.Series:
+        """
+        Fiber pair id per row: forward A_B and reverse B_A share the sorted
+        (Source Port, Sink Port). Links missing from the raw export fall back to
+        splitting their name, and anything still unknown pairs with its neighbour.
+        """
+        link_names = df_result["Link Name"].astype(str)
+        keys = pd.Series(None, index=df_result.index, dtype=object)
+
+        if self.df_raw_data is not None:
+            df_raw = self.df_raw_data.rename(columns=lambda c: c.strip())
+            source = df_raw["Source Port"].astype(str)
+            sink = df_raw["Sink Port"].astype(str)
+
+            port_key = pd.Series(np.where(source <= sink, source + "\t" + sink, sink + "\t" + source), index=source + "_" + sink)
+            port_key = port_key[~port_key.index.duplicated()]
+            keys = link_names.map(port_key)
+
+        unknown = keys.isna()
+        if unknown.any():
+            parts = link_names[unknown].str.split("_")
+            parts = parts[parts.str.len() == 2]
+            keys[parts.index] = parts.map(lambda p: "\t".join(sorted(p)))
+
+        rest = keys.isna().to_numpy()
+        keys[rest] = "#" + pd.Series(np.arange(rest.sum()) // 2).astype(str).to_numpy()
+
+        return keys
+
+    @profiled("loss.between_core")
     def calculate_loss_between_core(self, df_result: pd.DataFrame) -> pd.DataFrame:
-        forward_direction = df_result["Loss current - Loss EOL"].iloc[::2].values
-        reverse_direction = df_result["Loss current - Loss EOL"].iloc[1::2].values
-        loss_between_core = [abs(f - r) for f, r in zip(forward_direction, reverse_direction)]
+        pair, _ = pd.factorize(self.pair_keys(df_result))
+        loss = pd.to_numeric(df_result["Loss current - Loss EOL"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
 
-        loss_between_core = [
-            "--" if pd.isna(value) else round(value, 2)
-            for value in loss_between_core
-        ]
+        # |forward - reverse| is max - min over the pair; maximum.at keeps NaN, so a break stays "--"
+        n_pairs = pair.max() + 1 if len(pair) else 0
+        high = np.full(n_pairs, -np.inf)
+        low = np.full(n_pairs, np.inf)
+        with np.errstate(invalid="ignore"):
+            np.maximum.at(high, pair, loss)
+            np.minimum.at(low, pair, loss)
+
+        loss_between_core = high - low
+        loss_between_core[np.bincount(pair, minlength=n_pairs) != 2] = np.nan
 
         df_loss_between_core = pd.DataFrame()
-        df_loss_between_core["Link Name"] = df_result["Link Name"]
-        df_loss_between_core["Loss between core"] = [x for x in loss_between_core for _ in range(2)]
+        df_loss_between_core["Link Name"] = df_result["Link Name"].to_numpy()
+        df_loss_between_core["Loss between core"] = pd.Series(loss_between_core[pair].round(2), dtype=object).where(
+            ~np.isnan(loss_between_core[pair]), "--"
+        )
+        df_loss_between_core["_pair"] = pair
 
         return df_loss_between_core
 
-    def build_loss_table_body(self, link_names, loss_values) -> str:
-        table_body = ""
+    @profiled("loss.sort_pairs")
+    def sort_pairs(self, df_loss_between_core: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+        """
+        Pairs ordered error → flapping → ok, each pair's rows kept together.
 
-        for i in range(len(link_names)):
-            status = LossAnalyzer.getStatus(loss_values[i])
-            color = LossAnalyzer.getColor(status)
+        Returns the sorted frame, per-row status codes and per-row rowspans
+        (the pair size on its first row, 0 on the rows it covers).
+        """
+        pair = df_loss_between_core["_pair"].to_numpy()
+        codes = self.status_codes(df_loss_between_core["Loss between core"])
+
+        # pair ids come from factorize, so they already follow first appearance
+        order = np.lexsort((np.arange(len(pair)), pair, codes))
+        pair, codes = pair[order], codes[order]
+
+        first = np.ones(len(pair), dtype=bool)
+        first[1:] = pair[1:] != pair[:-1]
+        spans = np.where(first, np.bincount(pair)[pair], 0) if len(pair) else np.zeros(0, dtype=int)
+
+        return df_loss_between_core.take(order).reset_index(drop=True), codes, spans
+
+    def build_loss_table_body(self, link_names, loss_values, codes=None, spans=None) -> str:
+        if codes is None:
+            codes = self.status_codes(pd.Series(loss_values, dtype=object))
+        if spans is None:
+            # alternating forward/reverse rows
+            spans = [2 if i % 2 == 0 else 0 for i in range(len(link_names))]
+
+        rows = []
+        for link_name, value, code, span in zip(link_names, loss_values, codes, spans):
+            color = STATUS_CSS.get(int(code), "")
 
             merged_cells = ""
-            if i % 2 == 0:
-                formated_value = loss_values[i]
+            # first fiber of a pair carries the pair's value over all its rows
+            if span:
+                formated_value = value
                 if formated_value != "--":
-                    formated_value = "{:.2f}".format(loss_values[i])
-                    
-                merged_cells = f"""
-                    <td style='border: 1px solid rgba(250,250,250,0.1); padding: 4px 8px; text-align: center; {color}' rowspan=2>
-                        {formated_value}
-                    </td>
-                """.strip()
-
-            table_body += f"""
-                <tr>
-                    <td style='border: 1px solid rgba(250,250,250,0.1); padding: 4px 8px; {color}'>
-                        {link_names[i]}
-                    </td>{merged_cells}
-                </tr>
-            """.strip()
-
-        return table_body
+                    formated_value = "{:.2f}".format(value)
+
+                merged_cells = (
+                    f"<td style='border: 1px solid rgba(250,250,250,0.1); padding: 4px 8px; text-align: center; {color}' rowspan={int(span)}>"
+                    f"{formated_value}</td>"
+                )
+
+            rows.append(
+                f"<tr><td style='border: 1px solid rgba(250,250,250,0.1); padding: 4px 8px; {color}'>"
+                f"{escape(str(link_name))}</td>{merged_cells}</tr>"
+            )
+
+        return "".join(rows)
     
-    def build_loss_table(self, link_names, loss_values) -> str:
-        table_body = self.build_loss_table_body(link_names, loss_values)
+    @profiled("loss.build_html")
+    def build_loss_table(self, link_names, loss_values, codes=None, spans=None) -> str:
+        table_body = self.build_loss_table_body(link_names, loss_values, codes, spans)
 
         html = f"""
             <div style="
@@ -265,19 +402,33 @@ class CoreAnalyzer(LossAnalyzer):
         return html
 
     def process(self):
-        if self.df_ref is not None and self.df_raw_data is not None:
-            df_result = self.build_result_df() 
+        df_link_names = self.load_link_names() if self.df_raw_data is not None else None
+        if df_link_names is not None:
+            selected_me_name = self.get_selected_me_name(df_link_names)
+            self.df_ref = self.load_reference(selected_me_name)
 
-            selected_me_name = self.get_selected_me_name(df_result)
+            df_result = self.build_result_df()
             df_filtered = self.get_filtered_result(df_result, selected_me_name)
 
             df_loss_between_core = self.calculate_loss_between_core(df_filtered)
 
-            link_names  = df_loss_between_core["Link Name"].tolist()
-            loss_values = df_loss_between_core["Loss between core"].tolist()
+            # names and values are sorted together, a pair at a time
+            df_sorted, codes, spans = self.sort_pairs(df_loss_between_core)
+
+            # page by fiber pairs so a rowspan never straddles two pages
+            starts = np.flatnonzero(spans)
+            pairs = paginate(len(starts), ns="core_loss")
+            stop = starts[pairs.stop] if pairs.stop < len(starts) else len(df_sorted)
+            rows = slice(starts[pairs.start] if len(starts) else 0, stop)
 
-            html = self.build_loss_table(link_names, sorted(loss_values, key=LossAnalyzer.get_sort_priority))
+            html = self.build_loss_table(
+                df_sorted["Link Name"].iloc[rows],
+                df_sorted["Loss between core"].iloc[rows],
+                codes[rows],
+                spans[rows],
+            )
 
-            st.markdown(html, unsafe_allow_html=True)
+            with profile_stage("loss.render_html", rows_in=rows.stop - rows.start):
+                st.markdown(html, unsafe_allow_html=True)
 
             self.draw_color_legend("core")
\ No newline at end of file
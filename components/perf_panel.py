@@ -0,0 +1,65 @@
+import time
+import pandas as pd
+import streamlit as st
+from services.profiling import ProfileLog
+
+# add ?perf=1 to the dashboard URL to show the panel and trace memory
+PERF_QUERY_PARAM = "perf"
+
+
+def perf_enabled() -> bool:
+    return st.query_params.get(PERF_QUERY_PARAM, "") in ("1", "true", "on")
+
+
+def stages_frame(run) -> pd.DataFrame:
+    df = pd.DataFrame(
+        [
+            {
+                # นำหน้าด้วยช่องว่างตามระดับ nesting ให้อ่านเป็นต้นไม้
+                "Stage": "  " * s.depth + s.stage,
+                "Seconds": s.seconds,
+                "Rows in": s.rows_in,
+                "Rows out": s.rows_out,
+                "Peak MB": s.peak_mb,
+                "Error": s.error,
+            }
+            for s in run.stages
+        ],
+        columns=["Stage", "Seconds", "Rows in", "Rows out", "Peak MB", "Error"],
+    )
+    # Int64 keeps row counts as integers next to missing values
+    return df.astype({"Rows in": "Int64", "Rows out": "Int64"})
+
+
+def render_performance_panel(profile_log: ProfileLog, menu: str):
+    """Sidebar view of the last reruns of `menu`; the newest finished rerun is expanded."""
+    with st.sidebar.expander("Performance", expanded=False):
+        runs = [r for r in profile_log.runs(menu) if r.stages]
+        if not runs:
+            st.caption("No profiled reruns for this menu yet.")
+        else:
+            st.dataframe(
+                pd.DataFrame({
+                    "At": [time.strftime("%H:%M:%S", time.localtime(r.started_at)) for r in runs],
+                    "Seconds": [r.seconds if r.seconds is not None else sum(s.seconds for s in r.stages if s.depth == 0) for r in runs],
+                    "Slowest stage": [max(r.stages, key=lambda s: s.seconds).stage for r in runs],
+                })[::-1],
+                hide_index=True,
+                use_container_width=True,
+            )
+
+            picked = st.selectbox(
+                "Rerun",
+                range(len(runs) - 1, -1, -1),
+                format_func=lambda i: time.strftime("%H:%M:%S", time.localtime(runs[i].started_at)),
+            )
+            st.dataframe(stages_frame(runs[picked]), hide_index=True, use_container_width=True)
+
+        st.download_button(
+            "Export JSON",
+            profile_log.to_json(),
+            file_name="performance.json",
+            mime="application/json",
+            use_container_width=True,
+        )
+        st.button("Clear", on_click=profile_log.clear, key="perf_clear")
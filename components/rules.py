@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from services.profiling import profiled
+
+
+def numeric_column(df: pd.DataFrame, col: str | None) -> np.ndarray:
+    if col is None or col not in df.columns:
+        return np.full(len(df), np.nan)
+
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+# region Rules
+@dataclass(frozen=True)
+class BoundRule:
+    """Value must stay between the thresholds held in other columns."""
+    column: str
+    upper: str | None = None
+    lower: str | None = None
+    # CPU only flags a value when both thresholds are filled in
+    require_both: bool = False
+
+    def evaluate(self, df: pd.DataFrame) -> np.ndarray:
+        value = numeric_column(df, self.column)
+        upper = numeric_column(df, self.upper)
+        lower = numeric_column(df, self.lower)
+
+        # comparisons against NaN are False, same as the old per-row checks
+        with np.errstate(invalid="ignore"):
+            mask = np.zeros(len(df), dtype=bool)
+            if self.upper is not None:
+                mask |= value > upper
+            if self.lower is not None:
+                mask |= value < lower
+
+        if self.require_both:
+            mask &= ~np.isnan(upper) & ~np.isnan(lower)
+
+        return mask
+
+
+@dataclass(frozen=True)
+class LimitRule:
+    """
+    Value must not exceed a fixed limit.
+
+    With `by`, the limit is picked per row from the patterns in `limits`
+    found in that column (e.g. the FAN type inside Measure Object); when
+    several are found the lowest applies, as a value over any of them is
+    flagged.
+    """
+    column: str
+    limit: float | None = None
+    by: str | None = None
+    limits: tuple[tuple[str, float], ...] = ()
+
+    def evaluate(self, df: pd.DataFrame) -> np.ndarray:
+        value = numeric_column(df, self.column)
+
+        if self.by is None:
+            limit = np.full(len(df), np.nan if self.limit is None else self.limit)
+        else:
+            keys = df[self.by].astype(str) if self.by in df.columns else pd.Series("", index=df.index)
+            limit = np.full(len(df), np.nan)
+            for pattern, pattern_limit in self.limits:
+                hit = keys.str.contains(pattern, regex=False).to_numpy(dtype=bool)
+                limit[hit] = np.fmin(limit[hit], pattern_limit)
+
+        with np.errstate(invalid="ignore"):
+            return value > limit
+
+
+Rule = BoundRule | LimitRule
+
+
+# region Engine
+@dataclass
+class RuleResult:
+    cells: dict[str, np.ndarray]
+    rows: np.ndarray
+
+    @property
+    def has_issue(self) -> bool:
+        return bool(self.rows.any())
+
+    @property
+    def issue_count(self) -> int:
+        return int(self.rows.sum())
+
+    def cell(self, col: str) -> np.ndarray:
+        return self.cells.get(col, np.zeros(len(self.rows), dtype=bool))
+
+
+class RuleEngine:
+    def __init__(self, rules: list[Rule]):
+        self.rules = rules
+
+    def evaluate(self, df: pd.DataFrame) -> RuleResult:
+        cells: dict[str, np.ndarray] = {}
+        rows = np.zeros(len(df), dtype=bool)
+
+        for rule in self.rules:
+            mask = rule.evaluate(df)
+            cells[rule.column] = cells[rule.column] | mask if rule.column in cells else mask
+            rows |= mask
+
+        return RuleResult(cells=cells, rows=rows)
+
+
+# region Board specs
+COL_OUT = "Output Optical Power (dBm)"
+COL_IN = "Input Optical Power(dBm)"
+COL_MAX_OUT = "Maximum threshold(out)"
+COL_MIN_OUT = "Minimum threshold(out)"
+COL_MAX_IN = "Maximum threshold(in)"
+COL_MIN_IN = "Minimum threshold(in)"
+
+BOARD_RULES: dict[str, list[Rule]] = {
+    "CPU": [
+        BoundRule("CPU utilization ratio", upper="Maximum threshold", lower="Minimum threshold", require_both=True),
+    ],
+    "FAN": [
+        LimitRule(
+            "Value of Fan Rotate Speed(Rps)",
+            by="Measure Object",
+            limits=(("FCC", 120), ("FCPP", 250), ("FCPL", 120), ("FCPS", 230)),
+        ),
+    ],
+    "MSU": [
+        BoundRule("Laser Bias Current(mA)", upper="Maximum threshold"),
+    ],
+    "Client": [
+        BoundRule(COL_OUT, upper=COL_MAX_OUT, lower=COL_MIN_OUT),
+        BoundRule(COL_IN, upper=COL_MAX_IN, lower=COL_MIN_IN),
+    ],
+    "Line": [
+        LimitRule("Instant BER After FEC", limit=0),
+        BoundRule(COL_OUT, upper=COL_MAX_OUT, lower=COL_MIN_OUT),
+        BoundRule(COL_IN, upper=COL_MAX_IN, lower=COL_MIN_IN),
+    ],
+}
+
+
+@profiled("rules.evaluate")
+def evaluate_board(board: str, df: pd.DataFrame) -> RuleResult:
+    return RuleEngine(BOARD_RULES[board]).evaluate(df)
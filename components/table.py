@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+import math
+import numpy as np
+import pandas as pd
+import streamlit as st
+from services.profiling import profiled
+
+PAGE_SIZE_OPTIONS = [50, 100, 250, 500]
+DEFAULT_PAGE_SIZE = 100
+
+
+@dataclass
+class CellStyle:
+    """CSS applied where `mask` is True; `column=None` styles the whole row."""
+    mask: np.ndarray
+    css: str
+    column: str | None = None
+
+
+def preset_route_mask(df: pd.DataFrame) -> np.ndarray:
+    if "Route" not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+
+    return df["Route"].astype(str).str.startswith("Preset").to_numpy(dtype=bool)
+
+
+def paginate(
+    n_rows: int,
+    *,
+    ns: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    options: list[int] = PAGE_SIZE_OPTIONS,
+) -> slice:
+    size_key = f"{ns}_page_size"
+    page_key = f"{ns}_page"
+
+    if n_rows <= options[0]:
+        return slice(0, n_rows)
+
+    st.session_state.setdefault(size_key, page_size)
+    size = st.session_state[size_key]
+    n_pages = max(1, math.ceil(n_rows / size))
+
+    # keep the page inside range when filters shrink the table
+    st.session_state[page_key] = min(max(1, st.session_state.get(page_key, 1)), n_pages)
+
+    left, right, info = st.columns([1, 1, 2])
+    with left:
+        st.selectbox("Rows per page", options, key=size_key)
+    with right:
+        st.number_input("Page", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    start = (st.session_state[page_key] - 1) * size
+    stop = min(start + size, n_rows)
+    with info:
+        st.caption(f"Rows {start + 1}–{stop} of {n_rows} (page {st.session_state[page_key]}/{n_pages})")
+
+    return slice(start, stop)
+
+
+def build_style_matrix(df_page: pd.DataFrame, styles: list[CellStyle], window: slice) -> np.ndarray:
+    matrix = np.full(df_page.shape, "", dtype=object)
+
+    for style in styles:
+        if style.column is not None and style.column not in df_page.columns:
+            continue
+
+        rows = np.flatnonzero(np.asarray(style.mask, dtype=bool)[window])
+        if rows.size == 0:
+            continue
+
+        cols = np.arange(df_page.shape[1]) if style.column is None else np.array([df_page.columns.get_loc(style.column)])
+        block = matrix[np.ix_(rows, cols)]
+        # later styles win, same as chained Styler.apply calls
+        matrix[np.ix_(rows, cols)] = np.where(block == "", style.css, block + ";" + style.css)
+
+    return matrix
+
+
+@profiled("table.render")
+def render_table(
+    df: pd.DataFrame,
+    *,
+    ns: str,
+    styles: list[CellStyle] | None = None,
+    formats: dict[str, str] | None = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    hide_index: bool | None = None,
+):
+    """Style and send only the visible page; masks are precomputed for the whole frame."""
+    window = paginate(len(df), ns=ns, page_size=page_size)
+    df_page = df.iloc[window]
+
+    matrix = build_style_matrix(df_page, styles or [], window)
+    styled = df_page.style.apply(lambda _: matrix, axis=None)
+
+    if formats:
+        styled = styled.format({c: fmt for c, fmt in formats.items() if c in df_page.columns})
+
+    st.dataframe(styled, use_container_width=True, hide_index=hide_index)
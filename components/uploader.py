@@ -1,17 +1,144 @@
 import pandas as pd
 import streamlit as st
+from services.ingest import UPLOAD_TYPES, ColumnPlan, ReadProgress, detect_format, read_columns
+from services.ingest_pool import IngestJob, get_ingest_pool
 from services.session import SessionStateManager, SessionStateEnum
+from services.profiling import profile_stage, profiled
+from services.upload_cache import UploadCache, get_upload_cache
+
+# smaller uploads parse inline; a background job would only add a rerun
+BACKGROUND_MIN_BYTES = 2 * 1024 * 1024
+# how often the progress view checks on a background parse
+POLL_SECONDS = 0.5
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def _ingest_progress(job: IngestJob):
+    # only this fragment reruns while the job runs; the whole page reruns once it is done
+    if job.done:
+        st.rerun()
+
+    progress = job.progress
+    if progress.total_rows:
+        st.progress(
+            min(1.0, progress.rows / progress.total_rows),
+            text=f"Reading {job.name}: {progress.rows:,} / {progress.total_rows:,} rows",
+        )
+    elif progress.total_bytes:
+        st.progress(
+            min(1.0, progress.bytes_read / progress.total_bytes),
+            text=f"Reading {job.name}: {progress.bytes_read / 2**20:,.1f} / {progress.total_bytes / 2**20:,.1f} MB",
+        )
+    else:
+        st.caption(f"Reading {job.name}: {progress.rows:,} rows")
+
+    if progress.preview is not None:
+        st.caption(f"Preview of the first {len(progress.preview)} rows")
+        st.dataframe(progress.preview, hide_index=True, use_container_width=True)
+
 
 class ExcelUploader:
     def __init__(self, session: SessionStateManager):
         self.session = session
 
-    def upload(self, title: str, session_state: SessionStateEnum):
+    @staticmethod
+    def parse(
+        data: bytes,
+        plan: ColumnPlan | None = None,
+        name: str | None = None,
+        progress: ReadProgress | None = None,
+        in_process: bool = False,
+    ) -> pd.DataFrame:
+        """`in_process` parses in an ingest pool worker process instead of this thread."""
+        fmt = detect_format(name, data)
+        # only runs on a cache miss, so its stage shows when a real parse happened
+        with profile_stage(f"upload.read_{fmt}") as stage:
+            if in_process:
+                df = get_ingest_pool().read_in_process(data, plan, fmt, progress)
+            else:
+                df = read_columns(data, plan, fmt=fmt, progress=progress)
+            stage.rows_out = len(df)
+
+        return df
+
+    @staticmethod
+    def cache_key(uploaded_file, plan: ColumnPlan | None = None) -> str:
+        """
+        Upload cache key of a file read with `plan`. It is hashed once per
+        upload and remembered in the session, so reruns don't hash the bytes
+        again; pages also use it as a cheap identity of the data.
+        """
+        keys = st.session_state.setdefault("upload_cache_keys", {})
+        plan_key = plan.key if plan is not None else ""
+        memo = f"{uploaded_file.file_id}#{plan_key}"
+        if memo not in keys:
+            key_parts = (plan_key,) if plan is not None else ()
+            keys[memo] = UploadCache.hash_bytes(uploaded_file.getvalue(), *key_parts)
+
+        return keys[memo]
+
+    @staticmethod
+    @profiled("upload.read")
+    def read(uploaded_file, plan: ColumnPlan | None = None) -> pd.DataFrame:
+        """
+        Parsed xlsx/csv/csv.gz/parquet upload. With a plan only its columns
+        are read, and cached separately from a full read.
+        """
+        return get_upload_cache().get_or_parse(
+            uploaded_file.getvalue(),
+            lambda data: ExcelUploader.parse(data, plan, uploaded_file.name),
+            key=ExcelUploader.cache_key(uploaded_file, plan),
+        )
+
+    @staticmethod
+    def read_in_background(uploaded_file, plan: ColumnPlan | None = None) -> pd.DataFrame | None:
+        """
+        Like `read`, but a large upload that isn't cached yet is parsed by the
+        ingest pool (Excel in a worker process, see IngestPool). Until it is
+        done this shows its progress and a preview of the first rows and
+        returns None; the page reruns when the frame is ready.
+        """
+        data = uploaded_file.getvalue()
+        if len(data) < BACKGROUND_MIN_BYTES:
+            return ExcelUploader.read(uploaded_file, plan)
+
+        key = ExcelUploader.cache_key(uploaded_file, plan)
+        pool = get_ingest_pool()
+
+        job = pool.get(key)
+        if job is None:
+            df = get_upload_cache().get(key)
+            if df is not None:
+                return df
+
+            name = uploaded_file.name
+            in_process = detect_format(name, data) == "xlsx"
+            job = pool.submit(
+                key,
+                name,
+                lambda progress: get_upload_cache().get_or_parse(
+                    data,
+                    lambda d: ExcelUploader.parse(d, plan, name, progress, in_process),
+                    key=key,
+                ),
+            )
+
+        if job.done:
+            pool.discard(job)
+            # re-raises a failed parse here, in the page that asked for it
+            return job.future.result()
+
+        _ingest_progress(job)
+        return None
+
+    def upload(self, title: str, session_state: SessionStateEnum, plan: ColumnPlan | None = None):
         key_name = title.lower().replace(" ", "_")
-        uploaded_file = st.file_uploader(f"Upload {title}", type=["xlsx"], key=str(key_name))
+        uploaded_file = st.file_uploader(f"Upload {title}", type=UPLOAD_TYPES, key=str(key_name))
 
         if uploaded_file:
-            df = pd.read_excel(uploaded_file)
+            df = self.read_in_background(uploaded_file, plan)
+            if df is None:
+                return
             self.session[session_state] = df
 
-            st.success(f"{title} Uploaded")
\ No newline at end of file
+            st.success(f"{title} Uploaded")
@@ -0,0 +1,417 @@
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+import pandas as pd
+from services.profiling import profiled
+
+READ_CHUNK_SIZE = 1 << 20
+# same breaks as str.splitlines() for these logs: some terminals capture with CR only
+LINE_BREAK_RE = re.compile(rb"(\r\n|\r|\n)")
+SCAN_CACHE_ENTRIES = 8
+SUMMARY_COLS = ["Call", "Triple", "Preroute", "Verdict", "Restore", "Start", "End"]
+# added when several node logs are merged into one scan; "Log" is the file's position
+# in the merged list, so files uploaded under the same name stay apart
+TAG_COLS = ["Node", "File", "Log"]
+# where a call's raw text is; not part of reports
+LOCATION_COLS = ["Log", "Start", "End"]
+
+# Controller IP -> node name used in Line board Call IDs
+NODE_IP_MAP = {
+    "30.10.90.6": "HYI-4",
+    "30.10.10.6": "Jasmine",
+    "30.10.30.6": "Phu Nga",
+    "30.10.50.6": "SNI-POI",
+    "30.10.70.6": "NKS",
+    "30.10.110.6": "PKT"
+}
+
+#Preset status
+# Match: [WASON][CALL 8] [30.10.90.6 30.10.10.6 85] COPPER
+CALL_HEADER_RE = re.compile(r"\[WASON\]\[CALL\s+(\d+)\]\s+\[([^\]]+)\]")
+# Any Conn line; the WR checks below run on the text after the Conn tag
+CONN_LINE_RE = re.compile(r"\[WASON\]\s*\[Conn\s+\d+\]", re.IGNORECASE)
+# Any Conn line that contains WR
+CONN_HAS_WR_RE = re.compile(r"\bWR\b", re.IGNORECASE)
+# Specifically "WR NO_ALARM"
+CONN_WR_NOALARM_RE = re.compile(r"\bWR\s+NO_ALARM\b", re.IGNORECASE)
+# A preroute line like: --2--WORK--(USED)--(SUCCESS)-- (be robust to trailing text)
+PREROUT_USED_RE = re.compile(
+    r"\[WASON\]--\s*(\d+)\s*--\s*WORK\s*--\s*\(USED\)\s*--\s*\((\w+)\).*",
+    re.IGNORECASE,
+)
+
+#Line board preset map
+# Match: [CALL 8] [30.10.90.6 30.10.10.6 85]
+PRESET_CALL_RE = re.compile(r"\[CALL\s+\d+\]\s+\[([\d.]+)\s+[\d.]+\s+(\d+)\]")
+PRESET_SUCCESS_RE = re.compile(r"--(\d+)--WORK--\(USED\)--\(SUCCESS\)")
+
+
+@dataclass
+class CallBlock:
+    call_id: int
+    triple: str
+    # byte range of the block in the log; the raw text is read back on demand
+    start: int = 0
+    end: int = 0
+    # verdict inputs, accumulated line by line so the block's lines are never kept
+    has_wr: bool = False
+    wr_no_alarm: bool = False
+    used_rows: List[Dict[str, Any]] = field(default_factory=list)
+
+    def feed(self, line: str):
+        # cheap literal prefilter: only [WASON] Conn / WORK (USED) lines can change the verdict
+        folded = line.upper()
+        if "[WASON]" not in folded:
+            return
+
+        if "[CONN" in folded and "WR" in folded:
+            m = CONN_LINE_RE.search(line)
+            if m:
+                tail = line[m.end():]
+                if not self.has_wr and CONN_HAS_WR_RE.search(tail):
+                    self.has_wr = True
+                if not self.wr_no_alarm and CONN_WR_NOALARM_RE.search(tail):
+                    self.wr_no_alarm = True
+
+        if "WORK" in folded and "(USED)" in folded:
+            m = PREROUT_USED_RE.search(line)
+            if m:
+                self.used_rows.append({"index": int(m.group(1)), "result": m.group(2).upper(), "raw": line})
+
+
+@dataclass
+class WasonLogScan:
+    # one summary row per CALL that is on WR
+    calls: List[Dict[str, Any]]
+    # "Call ID (Site)" -> preset index, as used by the Line board
+    preset_map: Dict[str, str]
+    # source controller IP of every CALL header -> count, used to tell which node a log is from
+    source_ips: Dict[str, int] = field(default_factory=dict)
+    tagged: bool = False
+
+    @cached_property
+    def summary(self) -> pd.DataFrame:
+        """Calls as a frame sorted by (Node and) Call ID, built once per scanned log."""
+        cols = TAG_COLS + SUMMARY_COLS if self.tagged else SUMMARY_COLS
+        df = pd.DataFrame(self.calls, columns=cols)
+        return df.sort_values(["Node", "Call"] if self.tagged else "Call", kind="stable").reset_index(drop=True)
+
+    @property
+    def node(self) -> str | None:
+        """Node name of the controller that heads most CALLs in this log, if it is a known one."""
+        for ip, _ in Counter(self.source_ips).most_common():
+            if ip in NODE_IP_MAP:
+                return NODE_IP_MAP[ip]
+
+        return None
+
+    @cached_property
+    def search_text(self) -> pd.Series:
+        """Lower-cased Call / Triple / Restore per summary row for the card search box."""
+        df = self.summary
+        text = df["Call"].astype(str) + " " + df["Triple"].astype(str) + " " + df["Restore"].astype(str)
+        if self.tagged:
+            text = df["Node"].astype(str) + " " + text
+
+        return text.str.lower()
+
+    @property
+    def report(self) -> pd.DataFrame:
+        """`summary` without the columns that only locate a call's raw text."""
+        return self.summary.drop(columns=[c for c in LOCATION_COLS if c in self.summary.columns])
+
+    @cached_property
+    def summary_csv(self) -> bytes:
+        return self.report.to_csv(index=False).encode("utf-8")
+
+
+def _split_lines(data: bytes) -> tuple[list[bytes], bytes]:
+    """
+    Complete lines of `data` and the unterminated rest. Each line spans its
+    length + 1 bytes of `data`; a CRLF line keeps its CR for the caller to strip.
+    """
+    if data.count(b"\r") == data.count(b"\r\n"):
+        # no lone CR (the usual case): a plain LF split is several times faster than the regex
+        *complete, rest = data.split(b"\n")
+        return complete, rest
+
+    parts = LINE_BREAK_RE.split(data)
+    rest = parts.pop()
+    return [raw + b"\r" if sep == b"\r\n" else raw for raw, sep in zip(parts[::2], parts[1::2])], rest
+
+
+def iter_lines(stream: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[tuple[int, str]]:
+    """
+    (byte offset, decoded line) pairs, reading `stream` in fixed-size chunks.
+    Lines end at CRLF, LF or a lone CR.
+    """
+    stream.seek(0)
+    offset = 0
+    pending = b""
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+
+        pending += chunk
+        # a trailing CR may be the first half of a CRLF cut by the chunk boundary
+        held = b"\r" if pending.endswith(b"\r") else b""
+        complete, pending = _split_lines(pending[:-1] if held else pending)
+        pending += held
+        for raw in complete:
+            yield offset, raw.rstrip(b"\r").decode("utf-8", errors="ignore")
+            offset += len(raw) + 1
+
+    complete, rest = _split_lines(pending)
+    for raw in complete:
+        yield offset, raw.rstrip(b"\r").decode("utf-8", errors="ignore")
+        offset += len(raw) + 1
+    if rest:
+        yield offset, rest.decode("utf-8", errors="ignore")
+
+
+def parse_calls(stream: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[CallBlock]:
+    for cb, _ in _scan(stream, chunk_size):
+        if cb is not None:
+            yield cb
+
+
+def _scan(stream: BinaryIO, chunk_size: int) -> Iterator[tuple[Optional[CallBlock], Dict[str, str]]]:
+    """
+    One pass over the log feeding both consumers:
+    - [WASON][CALL n] blocks for Preset status, yielded as they close
+    - the Line board preset map: after a [CALL n] [ip ip id] header, the first
+      WORK--(USED)--(SUCCESS) row that follows "[PreRout]:" before the next "[CALL"
+    The preset map is yielded (with no block) once the log ends.
+    """
+    preset_map: Dict[str, str] = {}
+    preset_key: Optional[str] = None
+    in_prerout = False
+
+    cur: Optional[CallBlock] = None
+    for offset, line in iter_lines(stream, chunk_size):
+        if "[CALL" in line:
+            # any [CALL line ends the previous preset search
+            preset_key = None
+            in_prerout = False
+
+            m = PRESET_CALL_RE.search(line)
+            if m:
+                ip = m.group(1).strip()
+                cid = m.group(2).strip().lstrip("0")
+                preset_key = f"{cid} ({NODE_IP_MAP.get(ip, 'Unknown')})"
+
+            m = CALL_HEADER_RE.search(line)
+            if m:
+                if cur is not None:
+                    cur.end = offset
+                    yield cur, preset_map
+                cur = CallBlock(call_id=int(m.group(1)), triple=m.group(2), start=offset)
+
+        elif preset_key is not None:
+            if not in_prerout:
+                in_prerout = "[PreRout]:" in line
+            else:
+                m = PRESET_SUCCESS_RE.search(line)
+                if m:
+                    preset_map[preset_key] = m.group(1).strip()
+                    preset_key = None
+
+        if cur is not None:
+            cur.feed(line)
+
+    if cur is not None:
+        stream.seek(0, 2)
+        cur.end = stream.tell()
+        yield cur, preset_map
+
+    yield None, preset_map
+
+
+def scan_log(stream: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> WasonLogScan:
+    calls: List[Dict[str, Any]] = []
+    preset_map: Dict[str, str] = {}
+    source_ips: Counter = Counter()
+
+    for cb, preset_map in _scan(stream, chunk_size):
+        if cb is None:
+            continue
+
+        source_ips[(cb.triple.split() or [""])[0]] += 1
+
+        res = evaluate_preset_status(cb)
+        if res.get("has_wr"):
+            calls.append({
+                "Call": cb.call_id,
+                "Triple": cb.triple,
+                "Preroute": res.get("pr_index"),
+                "Verdict": res.get("verdict"),
+                "Restore": res.get("Restore"),
+                "Start": cb.start,
+                "End": cb.end,
+            })
+
+    return WasonLogScan(calls=calls, preset_map=preset_map, source_ips=dict(source_ips))
+
+
+_scan_cache: "OrderedDict[str, WasonLogScan]" = OrderedDict()
+_scan_cache_lock = threading.Lock()
+
+
+def hash_log(stream: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _cached_scan(key: str) -> WasonLogScan | None:
+    with _scan_cache_lock:
+        if key in _scan_cache:
+            _scan_cache.move_to_end(key)
+            return _scan_cache[key]
+
+    return None
+
+
+def _cache_scan(key: str, scan: WasonLogScan):
+    with _scan_cache_lock:
+        _scan_cache[key] = scan
+        while len(_scan_cache) > SCAN_CACHE_ENTRIES:
+            _scan_cache.popitem(last=False)
+
+
+@profiled("wason.scan")
+def scan_wason_log(stream: BinaryIO) -> WasonLogScan:
+    """scan_log, memoized by the log's content hash across reruns and sessions."""
+    key = hash_log(stream)
+
+    scan = _cached_scan(key)
+    if scan is None:
+        scan = scan_log(stream)
+        _cache_scan(key, scan)
+
+    return scan
+
+
+def _scan_bytes(data: bytes) -> WasonLogScan:
+    # process pool entry point: the log travels as bytes, the scan comes back pickled
+    return scan_log(io.BytesIO(data))
+
+
+def _read_all(stream: BinaryIO) -> bytes:
+    if hasattr(stream, "getvalue"):
+        return stream.getvalue()
+
+    stream.seek(0)
+    return stream.read()
+
+
+@profiled("wason.scan_logs")
+def scan_wason_logs(files: List[tuple[str, BinaryIO]], max_workers: int | None = None) -> WasonLogScan:
+    """
+    Scan one log per node and merge them into a single scan tagged by Node,
+    File and Log (the position in `files`, to read a call's text back from).
+
+    Logs that are not cached yet are parsed in a process pool, one worker per
+    log (capped at the CPU count). Node comes from the log's CALL headers via
+    NODE_IP_MAP, falling back to the file name.
+    """
+    keys = [hash_log(stream) for _, stream in files]
+
+    scans: Dict[str, WasonLogScan] = {}
+    missing: Dict[str, BinaryIO] = {}
+    for key, (_, stream) in zip(keys, files):
+        scan = _cached_scan(key)
+        if scan is not None:
+            scans[key] = scan
+        else:
+            missing[key] = stream
+
+    workers = min(len(missing), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        # a pool only pays off when logs can really run side by side
+        for key, stream in missing.items():
+            scans[key] = scan_log(stream)
+    else:
+        # spawn: forking the threaded Streamlit server is not safe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            futures = {key: pool.submit(_scan_bytes, _read_all(stream)) for key, stream in missing.items()}
+            for key, future in futures.items():
+                scans[key] = future.result()
+
+    for key in missing:
+        _cache_scan(key, scans[key])
+
+    return merge_scans([(name, scans[key]) for key, (name, _) in zip(keys, files)])
+
+
+def merge_scans(named_scans: List[tuple[str, WasonLogScan]]) -> WasonLogScan:
+    calls: List[Dict[str, Any]] = []
+    preset_map: Dict[str, str] = {}
+    source_ips: Counter = Counter()
+
+    for log, (name, scan) in enumerate(named_scans):
+        node = scan.node or Path(name).stem
+        calls.extend({"Node": node, "File": name, "Log": log, **call} for call in scan.calls)
+        preset_map.update(scan.preset_map)
+        source_ips.update(scan.source_ips)
+
+    return WasonLogScan(calls=calls, preset_map=preset_map, source_ips=dict(source_ips), tagged=True)
+
+
+def read_call_text(stream: BinaryIO, start: int, end: int) -> str:
+    stream.seek(start)
+    raw = stream.read(end - start)
+
+    return raw.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n").rstrip("\n")
+
+
+def evaluate_preset_status(cb: CallBlock) -> Dict[str, Any]:
+    """
+    Focused rules:
+    - Consider only CALLs that have WR (any Conn line includes 'WR').
+    - Require at least one 'WR NO_ALARM' Conn line.
+    - In [PreRout], there must be exactly one 'WORK (USED) (SUCCESS)' line.
+    """
+    if not cb.has_wr:
+        return {"has_wr": False}
+
+    wr_no_alarm = cb.wr_no_alarm
+    used_rows = cb.used_rows
+
+    verdict = "FAIL"
+    Restore = ""
+    pr_index: Optional[int] = None
+
+    if not wr_no_alarm:
+        Restore = "WR found but not WR NO_ALARM"
+    elif len(used_rows) != 1:
+       Restore = f"Found {len(used_rows)} USED rows (expected 1)"
+    elif used_rows[0]["result"] != "SUCCESS":
+        Restore = "USED row is not SUCCESS"
+    else:
+        verdict = "PASS"
+        pr_index = used_rows[0]["index"]
+        Restore = "Normal"
+
+    return {
+        "has_wr": True,
+        "wr_no_alarm": wr_no_alarm,
+        "verdict": verdict,
+        "Restore": Restore,
+        "pr_index": pr_index,
+        "used_rows": used_rows,
+    }
@@ -0,0 +1,47 @@
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+# Object columns that pyarrow cannot store as a single type (e.g. numbers mixed with "--")
+MIXED_INFERRED_TYPES = {"mixed", "mixed-integer"}
+
+
+def make_arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    safe_df = df
+    for col in df.columns:
+        series = df[col]
+        if series.dtype != object:
+            continue
+
+        if pd.api.types.infer_dtype(series, skipna=True) in MIXED_INFERRED_TYPES:
+            if safe_df is df:
+                safe_df = df.copy()
+            safe_df[col] = series.map(lambda v: v if pd.isna(v) else str(v))
+
+    # parquet needs string column labels
+    if not all(isinstance(c, str) for c in safe_df.columns):
+        safe_df = safe_df.copy() if safe_df is df else safe_df
+        safe_df.columns = safe_df.columns.astype(str)
+
+    return safe_df
+
+
+def write_parquet_atomic(df: pd.DataFrame, path: Path, index: bool = False) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+
+    try:
+        make_arrow_safe(df).to_parquet(tmp_name, index=index)
+        os.replace(tmp_name, path)
+    except Exception:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+    return path.stat().st_size
+
+
+def read_parquet(path: Path, columns: list[str] | None = None) -> pd.DataFrame:
+    return pd.read_parquet(path, columns=columns)
@@ -1,23 +1,224 @@
 import pandas as pd
 import pymongo
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from dotenv import load_dotenv
 from pathlib import Path
+from typing import Callable
+
+from services.profiling import profiled
+
+# How often the collection is probed for changes, and how long a frame may be served without a full refetch
+REFERENCE_PROBE_INTERVAL = 30
+REFERENCE_MAX_AGE = 15 * 60
+# filtered frames kept per version (one per ME and projection), least recently used dropped first
+REFERENCE_CACHE_ENTRIES = 32
+
+# Client defaults; each can be overridden from .env
+MONGO_MAX_POOL_SIZE = 20
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 3000
+MONGO_CONNECT_TIMEOUT_MS = 3000
+MONGO_SOCKET_TIMEOUT_MS = 20000
+
+
+class ReferenceSheetCache:
+    """
+    Process-wide copy of the reference sheet, shared by every session.
+
+    `lock` only guards the bookkeeping; Mongo is queried outside it, so a
+    slow fetch holds up only the sessions waiting for the same frame.
+    """
+
+    def __init__(self, max_entries: int = REFERENCE_CACHE_ENTRIES):
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        # keyed by (me_name, columns); (None, None) is the full sheet
+        self.frames: OrderedDict[tuple, pd.DataFrame] = OrderedDict()
+        self.version: tuple | None = None
+        self.checked_at = 0.0
+        self.loaded_at = 0.0
+        self.has_indexes = False
+        self._key_locks: dict[tuple, threading.Lock] = {}
+
+    def _get(self, key: tuple) -> pd.DataFrame | None:
+        # called with the lock held
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.frames.move_to_end(key)
+
+        return frame
+
+    def get_or_fetch(self, key: tuple, fetch: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        with self.lock:
+            frame = self._get(key)
+            if frame is not None:
+                return frame
+            version = self.version
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # one fetch per key even when several sessions ask at once
+        with key_lock:
+            with self.lock:
+                frame = self._get(key)
+            if frame is None:
+                frame = fetch()
+                with self.lock:
+                    # a frame of a version replaced meanwhile is served once but not kept
+                    if self.version == version:
+                        self.frames[key] = frame
+                        while len(self.frames) > self.max_entries:
+                            self.frames.popitem(last=False)
+
+        with self.lock:
+            self._key_locks.pop(key, None)
+
+        return frame
+
+    def clear(self):
+        with self.lock:
+            self.frames = OrderedDict()
+            self.version = None
+            self.checked_at = 0.0
+            self.loaded_at = 0.0
+
+
+reference_sheet_cache = ReferenceSheetCache(int(os.getenv("reference_cache_entries", REFERENCE_CACHE_ENTRIES)))
+
+
+@lru_cache(maxsize=None)
+def load_environment():
+    env_path = Path(__file__).resolve().parent.parent / ".env"
+    load_dotenv(dotenv_path=env_path)
+
+
+_mongo_client: pymongo.MongoClient | None = None
+_mongo_client_lock = threading.Lock()
+
+
+def get_mongo_client() -> pymongo.MongoClient:
+    """One pooled client per process, created on first use."""
+    global _mongo_client
+
+    with _mongo_client_lock:
+        if _mongo_client is None:
+            load_environment()
+
+            mongo_host_uri = os.getenv("mongo_host_uri")
+            if not mongo_host_uri:
+                raise ValueError("Environment variable 'mongo_host_uri' not set")
+
+            _mongo_client = pymongo.MongoClient(
+                mongo_host_uri,
+                maxPoolSize=int(os.getenv("mongo_max_pool_size", MONGO_MAX_POOL_SIZE)),
+                serverSelectionTimeoutMS=int(os.getenv("mongo_server_selection_timeout_ms", MONGO_SERVER_SELECTION_TIMEOUT_MS)),
+                connectTimeoutMS=int(os.getenv("mongo_connect_timeout_ms", MONGO_CONNECT_TIMEOUT_MS)),
+                socketTimeoutMS=int(os.getenv("mongo_socket_timeout_ms", MONGO_SOCKET_TIMEOUT_MS)),
+            )
+
+    return _mongo_client
+
 
 class Database:
     def __init__(self):
-        env_path = Path(__file__).resolve().parent.parent / ".env"
-        load_dotenv(dotenv_path=env_path)
+        # nothing connects here; the shared client is created on first query
+        load_environment()
+
+        self.probe_interval = float(os.getenv("reference_probe_interval_s", REFERENCE_PROBE_INTERVAL))
+        self.max_age = float(os.getenv("reference_max_age_s", REFERENCE_MAX_AGE))
+
+    @property
+    def mongo_client(self) -> pymongo.MongoClient:
+        return get_mongo_client()
+
+    @property
+    def database(self):
+        return self.mongo_client["ZTE"]
+
+    @property
+    def reference_collection(self):
+        return self.database["ReferenceSheet"]
+
+    def ping(self) -> bool:
+        try:
+            self.mongo_client.admin.command("ping")
+        except (ValueError, pymongo.errors.PyMongoError):
+            return False
+
+        return True
+
+    def get_reference_version(self) -> tuple:
+        # count + newest _id: both answered from collection metadata / the _id index
+        count = self.reference_collection.estimated_document_count()
+        newest = self.reference_collection.find_one({}, {"_id": 1}, sort=[("_id", pymongo.DESCENDING)])
+
+        return count, newest["_id"] if newest else None
+
+    def ensure_indexes(self):
+        cache = reference_sheet_cache
+        if cache.has_indexes:
+            return
+
+        try:
+            self.reference_collection.create_index([("Link Name", pymongo.ASCENDING)])
+        except pymongo.errors.OperationFailure:
+            # read-only users can still query, just without the index
+            pass
+
+        cache.has_indexes = True
+
+    @staticmethod
+    def build_reference_query(me_name: str | None = None) -> dict:
+        if not me_name:
+            return {}
+
+        # same match as the old str.contains(me_name): the ME may appear anywhere in the
+        # Link Name (reverse-direction links name the far ME first), so it stays unanchored
+        return {"Link Name": {"$regex": re.escape(me_name)}}
+
+    @profiled("mongo.fetch")
+    def fetch_reference_sheet(self, query=None, columns: list[str] | None = None) -> pd.DataFrame:
+        projection = {"_id": 0}
+        if columns:
+            projection.update({col: 1 for col in columns})
+
+        links = list(self.reference_collection.find(query if query else {}, projection))
+
+        return pd.DataFrame(links, columns=columns if columns else None)
+
+    @profiled("mongo.reference_sheet")
+    def get_reference_sheet(self, query=None, me_name: str | None = None, columns: list[str] | None = None) -> pd.DataFrame:
+        if query:
+            return self.fetch_reference_sheet(query, columns)
+
+        if me_name:
+            self.ensure_indexes()
+
+        key = (me_name or None, tuple(columns) if columns else None)
+
+        cache = reference_sheet_cache
+        with cache.lock:
+            now = time.monotonic()
+            loaded_at = cache.loaded_at
+            is_stale = cache.version is None or now - loaded_at >= self.max_age
+            # one session probes per interval; the others keep serving the cached frames
+            should_probe = not is_stale and now - cache.checked_at >= self.probe_interval
+            if should_probe:
+                cache.checked_at = now
 
-        mongo_host_uri = os.getenv("mongo_host_uri")
-        if not mongo_host_uri:
-            raise ValueError("Environment variable 'mongo_host_uri' not set")
+        if is_stale or should_probe:
+            version = self.get_reference_version()
+            with cache.lock:
+                # unless another session reloaded meanwhile, drop frames of the old version
+                if cache.loaded_at == loaded_at and (is_stale or version != cache.version):
+                    cache.frames = OrderedDict()
+                    cache.version = version
+                    cache.checked_at = cache.loaded_at = time.monotonic()
 
-        self.mongo_client = pymongo.MongoClient(mongo_host_uri)
-        self.database = self.mongo_client["ZTE"]
-        self.reference_collection = self.database["ReferenceSheet"]
+        frame = cache.get_or_fetch(key, lambda: self.fetch_reference_sheet(self.build_reference_query(me_name), columns))
 
-    def get_reference_sheet(self, query=None):
-        links = list(self.reference_collection.find(query if query else {}))
-        
-        return pd.DataFrame(links).drop("_id", axis=1)
\ No newline at end of file
+        # shallow copy: callers may add or replace columns without touching the shared frame
+        return frame.copy(deep=False)
@@ -0,0 +1,387 @@
+import importlib.util
+import io
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from pandas.io.parsers import TextParser
+
+# accepted by every uploader; "gz" covers .csv.gz exports
+UPLOAD_TYPES = ["xlsx", "csv", "gz", "parquet"]
+
+# python-calamine parses xlsx natively; without it openpyxl streams the sheet in read-only mode
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+
+# rows shown while a large file is still being read, and how often progress is reported
+PREVIEW_ROWS = 200
+PROGRESS_EVERY = 5_000
+
+# error cells come back as their code with values_only; pandas reads them as NaN
+OPENPYXL_ERROR_CODES = frozenset(("#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"))
+
+
+@dataclass(frozen=True)
+class ColumnPlan:
+    """
+    Columns an analysis reads from an export; every other column is skipped.
+
+    Names are matched after header normalization. `prefixes` keeps columns
+    whose name starts with one of them (FM exports call the link column
+    "Link", "Link Name", ...). `text_cols` are read as strings instead of
+    letting the parser guess per cell.
+    """
+    columns: tuple[str, ...]
+    prefixes: tuple[str, ...] = ()
+    text_cols: tuple[str, ...] = ()
+
+    def wants(self, name: str) -> bool:
+        return name in self.columns or name.startswith(self.prefixes)
+
+    @property
+    def key(self) -> str:
+        # part of the upload cache key: a different plan is a different frame
+        return "|".join(self.columns) + "#" + "|".join(self.prefixes) + "#" + "|".join(self.text_cols)
+
+
+@dataclass
+class ReadProgress:
+    """
+    Filled in by a reader while it runs, for display from another thread.
+    CSV doesn't say its row count up front, so it reports bytes read instead.
+    """
+    rows: int = 0
+    total_rows: int | None = None
+    bytes_read: int = 0
+    total_bytes: int | None = None
+    preview: pd.DataFrame | None = None
+
+
+def normalize_header(name) -> str:
+    return re.sub(r"\s+", " ", str(name).strip())
+
+
+def _source(source: bytes | str | Path):
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def _as_bytes(source: bytes | str | Path) -> bytes:
+    return source if isinstance(source, bytes) else Path(source).read_bytes()
+
+
+def detect_format(name: str | None, data: bytes | None = None) -> str:
+    """"xlsx", "csv" (plain or gzip) or "parquet", from the file name or else its magic bytes."""
+    name = (name or "").lower()
+    if name.endswith(".parquet"):
+        return "parquet"
+    if name.endswith((".csv", ".csv.gz", ".gz")):
+        return "csv"
+    if name.endswith(".xlsx"):
+        return "xlsx"
+
+    head = data[:4] if data is not None else b""
+    if head == b"PAR1":
+        return "parquet"
+    if head[:2] in (b"PK", b""):
+        return "xlsx"
+
+    return "csv"
+
+
+# region Excel
+def _convert_openpyxl(value):
+    # same conversions as pandas' openpyxl reader
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str) and value in OPENPYXL_ERROR_CODES:
+        return float("nan")
+
+    return value
+
+
+def _convert_calamine(value):
+    # same conversions as pandas' calamine reader
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+
+    return value
+
+
+def _parse_rows(data: list[list], plan: ColumnPlan) -> pd.DataFrame:
+    dtype = {c: str for c in plan.text_cols if c in data[0]}
+    return TextParser(data, header=0, dtype=dtype or None, skip_blank_lines=False).read()
+
+
+def _planned_rows(
+    rows: Iterator[Sequence],
+    plan: ColumnPlan,
+    convert,
+    progress: ReadProgress | None = None,
+) -> list[list] | None:
+    """
+    Header plus the planned cells of every row, ready for TextParser; None
+    when the header has none of the planned columns. Only planned cells are
+    converted and kept, so unplanned columns never become Python objects.
+    """
+    header = [normalize_header(v) if v not in (None, "") else "" for v in next(rows, ())]
+    positions = [i for i, name in enumerate(header) if name and plan.wants(name)]
+    if not positions:
+        return None
+
+    width = positions[-1] + 1
+    data = [[header[i] for i in positions]]
+    last_row_with_data = 0
+    for row in rows:
+        if len(row) < width:
+            row = tuple(row) + (None,) * (width - len(row))
+
+        data.append([convert(row[i]) for i in positions])
+        # like pandas, trailing rows that are empty across the whole sheet are dropped
+        if any(v is not None and v != "" for v in row):
+            last_row_with_data = len(data) - 1
+
+        if progress is not None and len(data) % PROGRESS_EVERY == 0:
+            progress.rows = len(data) - 1
+        if progress is not None and len(data) == PREVIEW_ROWS + 1:
+            progress.preview = _parse_rows(data, plan)
+
+    del data[last_row_with_data + 1:]
+    if progress is not None:
+        progress.rows = last_row_with_data
+    return data
+
+
+def _read_rows_openpyxl(source, plan: ColumnPlan, progress: ReadProgress | None = None) -> list[list] | None:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[0]
+        if progress is not None and sheet.max_row:
+            # from the sheet's <dimension> tag, before it is reset for reading
+            progress.total_rows = sheet.max_row - 1
+        sheet.reset_dimensions()
+        return _planned_rows(sheet.iter_rows(values_only=True), plan, _convert_openpyxl, progress)
+    finally:
+        workbook.close()
+
+
+def _read_rows_calamine(source, plan: ColumnPlan, progress: ReadProgress | None = None) -> list[list] | None:
+    from python_calamine import load_workbook
+
+    sheet = load_workbook(source).get_sheet_by_index(0)
+    # iter_rows starts at the first used cell; pandas reads from A1, so leave odd sheets to it
+    if sheet.start != (0, 0):
+        return None
+
+    if progress is not None:
+        progress.total_rows = max(0, sheet.height - 1)
+
+    return _planned_rows(iter(sheet.iter_rows()), plan, _convert_calamine, progress)
+
+
+def read_excel_columns(
+    source: bytes | str | Path,
+    plan: ColumnPlan | None = None,
+    engine: str = EXCEL_ENGINE,
+    progress: ReadProgress | None = None,
+) -> pd.DataFrame:
+    """
+    First sheet of an export, reduced to `plan`'s columns with normalized
+    headers. Without a plan, or when the header matches none of it, the
+    whole sheet is read so callers still see (and report) what is missing.
+    """
+    if plan is not None:
+        read_rows = _read_rows_calamine if engine == "calamine" else _read_rows_openpyxl
+        data = read_rows(_source(source), plan, progress)
+        if data is not None:
+            return _parse_rows(data, plan)
+
+    df = pd.read_excel(_source(source), engine=engine)
+    df.columns = [normalize_header(c) for c in df.columns]
+
+    return df
+
+
+# region Arrow formats
+class _CountingReader(io.RawIOBase):
+    """Reads `data` while reporting how much of it was consumed."""
+
+    def __init__(self, data: bytes, progress: ReadProgress):
+        self._stream = io.BytesIO(data)
+        self._progress = progress
+        progress.total_bytes = len(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = self._stream.readinto(buffer)
+        self._progress.bytes_read += n
+        return n
+
+
+def _csv_input(data: bytes, progress: ReadProgress | None = None) -> pa.NativeFile:
+    # gzip is recognised by its magic bytes, whatever the file was called
+    stream = pa.BufferReader(data) if progress is None else pa.PythonFile(_CountingReader(data, progress), mode="r")
+    return pa.CompressedInputStream(stream, "gzip") if data[:2] == b"\x1f\x8b" else stream
+
+
+def _csv_header(data: bytes) -> list[str]:
+    # the streaming reader only parses its first block to learn the schema
+    reader = pacsv.open_csv(_csv_input(data))
+    try:
+        return reader.schema.names
+    finally:
+        reader.close()
+
+
+def _to_frame(table: pa.Table) -> pd.DataFrame:
+    df = table.to_pandas()
+    df.columns = [normalize_header(c) for c in df.columns]
+
+    return df
+
+
+def _read_batches(batches, progress: ReadProgress) -> pa.Table:
+    """Collect record batches while reporting rows read and a preview from the first ones."""
+    collected = []
+    for batch in batches:
+        collected.append(batch)
+        progress.rows += batch.num_rows
+        if progress.preview is None and progress.rows >= min(PREVIEW_ROWS, progress.total_rows or PREVIEW_ROWS):
+            progress.preview = _to_frame(pa.Table.from_batches(collected).slice(0, PREVIEW_ROWS))
+
+    return pa.Table.from_batches(collected) if collected else None
+
+
+def _csv_preview(data: bytes, convert_options: pacsv.ConvertOptions | None) -> pd.DataFrame | None:
+    # first block only, every column as text: its types need not match the full read
+    include = convert_options.include_columns if convert_options is not None else []
+    reader = pacsv.open_csv(
+        _csv_input(data),
+        convert_options=pacsv.ConvertOptions(include_columns=include, column_types={c: pa.string() for c in include}),
+    )
+    try:
+        batch = reader.read_next_batch()
+    except StopIteration:
+        return None
+    finally:
+        reader.close()
+
+    return _to_frame(pa.Table.from_batches([batch]).slice(0, PREVIEW_ROWS))
+
+
+def read_csv_columns(
+    source: bytes | str | Path,
+    plan: ColumnPlan | None = None,
+    progress: ReadProgress | None = None,
+) -> pd.DataFrame:
+    """
+    CSV or gzip CSV through Arrow, reduced to `plan` like read_excel_columns.
+    Column types are inferred over the whole file, so progress is reported
+    in bytes consumed rather than by reading batch by batch (the streaming
+    reader fixes types from its first block and fails on a late "--").
+    """
+    data = _as_bytes(source)
+    convert_options = None
+    if plan is not None:
+        names = [c for c in _csv_header(data) if plan.wants(normalize_header(c))]
+        if names:
+            convert_options = pacsv.ConvertOptions(
+                include_columns=names,
+                column_types={c: pa.string() for c in names if normalize_header(c) in plan.text_cols},
+            )
+
+    if progress is not None:
+        progress.preview = _csv_preview(data, convert_options)
+
+    table = pacsv.read_csv(_csv_input(data, progress), convert_options=convert_options)
+    if progress is not None:
+        progress.rows = table.num_rows
+
+    return _to_frame(table)
+
+
+def read_parquet_columns(
+    source: bytes | str | Path,
+    plan: ColumnPlan | None = None,
+    progress: ReadProgress | None = None,
+) -> pd.DataFrame:
+    data = _as_bytes(source)
+    columns = None
+    if plan is not None:
+        names = [c for c in pq.read_schema(pa.BufferReader(data)).names if plan.wants(normalize_header(c))]
+        columns = names or None
+
+    table = None
+    if progress is not None:
+        parquet_file = pq.ParquetFile(pa.BufferReader(data))
+        progress.total_rows = parquet_file.metadata.num_rows
+        table = _read_batches(parquet_file.iter_batches(columns=columns), progress)
+    if table is None:
+        table = pq.read_table(pa.BufferReader(data), columns=columns)
+    if columns:
+        for i, name in enumerate(table.column_names):
+            if normalize_header(name) in plan.text_cols and not pa.types.is_string(table.schema.field(i).type):
+                table = table.set_column(i, name, pc.cast(table.column(i), pa.string()))
+
+    return _to_frame(table)
+
+
+# region Any format
+def _resolve_format(source: bytes | str | Path, fmt: str | None, name: str | None) -> str:
+    if fmt is not None:
+        return fmt
+    if isinstance(source, bytes):
+        return detect_format(name, source)
+
+    return detect_format(name or str(source))
+
+
+def read_header(
+    source: bytes | str | Path,
+    fmt: str | None = None,
+    name: str | None = None,
+    engine: str = EXCEL_ENGINE,
+) -> list[str]:
+    """Normalized column names of an export, without reading its rows."""
+    fmt = _resolve_format(source, fmt, name)
+    if fmt == "csv":
+        names = _csv_header(_as_bytes(source))
+    elif fmt == "parquet":
+        names = pq.read_schema(pa.BufferReader(_as_bytes(source))).names
+    else:
+        names = pd.read_excel(_source(source), nrows=0, engine=engine).columns
+
+    return [normalize_header(c) for c in names]
+
+
+def read_columns(
+    source: bytes | str | Path,
+    plan: ColumnPlan | None = None,
+    fmt: str | None = None,
+    name: str | None = None,
+    progress: ReadProgress | None = None,
+) -> pd.DataFrame:
+    """
+    Any supported export (see UPLOAD_TYPES); the format comes from `fmt`,
+    else `name`, else the bytes. `progress` is updated as rows are read.
+    """
+    fmt = _resolve_format(source, fmt, name)
+    if fmt == "csv":
+        return read_csv_columns(source, plan, progress)
+    if fmt == "parquet":
+        return read_parquet_columns(source, plan, progress)
+
+    return read_excel_columns(source, plan, progress=progress)
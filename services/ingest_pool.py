@@ -0,0 +1,150 @@
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from typing import Callable
+
+import pandas as pd
+
+from services.ingest import ColumnPlan, ReadProgress, read_columns
+
+DEFAULT_WORKERS = 2
+# how often a relay thread checks on its worker process when no progress arrives
+RELAY_POLL_SECONDS = 0.2
+
+
+@dataclass
+class IngestJob:
+    key: str
+    name: str
+    progress: ReadProgress = field(default_factory=ReadProgress)
+    future: Future | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+
+class _RelayedProgress(ReadProgress):
+    """ReadProgress of a worker process; every update is also sent to the session's copy."""
+
+    def __init__(self, updates):
+        object.__setattr__(self, "_updates", updates)
+        super().__init__()
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        self._updates.put((name, value))
+
+
+def _read_relayed(data: bytes, plan: ColumnPlan | None, fmt: str, updates) -> pd.DataFrame:
+    # runs in a worker process
+    return read_columns(data, plan, fmt=fmt, progress=_RelayedProgress(updates))
+
+
+class IngestPool:
+    """
+    Uploads being parsed in the background, shared by every session.
+
+    Jobs are keyed like the upload cache, so a file uploaded by several
+    sessions at once is parsed once and every session follows the same
+    progress. The pool is small on purpose: a parse is memory-heavy and the
+    script threads of other sessions keep running beside it.
+
+    Jobs run on threads. Arrow (CSV, Parquet) releases the GIL, so those
+    parse on the thread itself; openpyxl/calamine would hold it and stall
+    every session's reruns, so Excel is parsed by `read_in_process` in a
+    spawn process pool while the thread only relays its progress.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs: dict[str, IngestJob] = {}
+        self._lock = threading.Lock()
+        # started on the first Excel job
+        self._processes: ProcessPoolExecutor | None = None
+        self._manager = None
+
+    def submit(self, key: str, name: str, parse: Callable[[ReadProgress], pd.DataFrame]) -> IngestJob:
+        """Start `parse(progress)` for `key` unless a job for it is already running."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                job = IngestJob(key=key, name=name)
+                job.future = self._executor.submit(parse, job.progress)
+                self._jobs[key] = job
+
+        return job
+
+    def get(self, key: str) -> IngestJob | None:
+        with self._lock:
+            return self._jobs.get(key)
+
+    def discard(self, job: IngestJob):
+        # finished frames live in the upload cache; the job is only needed while it runs
+        with self._lock:
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+
+    def _start_processes(self):
+        with self._lock:
+            if self._processes is None:
+                # spawn: forking the threaded Streamlit server is not safe
+                context = get_context("spawn")
+                self._processes = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                if self._manager is None:
+                    self._manager = context.Manager()
+
+            return self._processes, self._manager
+
+    def read_in_process(
+        self,
+        data: bytes,
+        plan: ColumnPlan | None = None,
+        fmt: str | None = None,
+        progress: ReadProgress | None = None,
+    ) -> pd.DataFrame:
+        """
+        `read_columns` in a worker process; blocks the calling thread (without
+        the GIL) until it is done, copying the worker's progress into `progress`.
+        """
+        processes, manager = self._start_processes()
+        updates = manager.Queue()
+        try:
+            future = processes.submit(_read_relayed, data, plan, fmt, updates)
+            while True:
+                try:
+                    name, value = updates.get(timeout=RELAY_POLL_SECONDS)
+                except queue.Empty:
+                    if future.done():
+                        break
+                    continue
+
+                if progress is not None:
+                    setattr(progress, name, value)
+
+            return future.result()
+        except BrokenProcessPool:
+            # a worker died (out of memory, killed); the next job starts a new pool
+            with self._lock:
+                if self._processes is processes:
+                    self._processes = None
+            raise
+
+
+_ingest_pool: IngestPool | None = None
+_ingest_pool_lock = threading.Lock()
+
+
+def get_ingest_pool() -> IngestPool:
+    global _ingest_pool
+
+    with _ingest_pool_lock:
+        if _ingest_pool is None:
+            _ingest_pool = IngestPool(max_workers=int(os.getenv("ingest_workers", DEFAULT_WORKERS)))
+
+    return _ingest_pool
@@ -0,0 +1,214 @@
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+
+import pandas as pd
+
+DEFAULT_RUNS_PER_MENU = 20
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    depth: int
+    seconds: float = 0.0
+    rows_in: int | None = None
+    rows_out: int | None = None
+    peak_mb: float | None = None
+    error: str | None = None
+
+
+@dataclass
+class RunProfile:
+    """Stage timings of one script rerun. Stages are kept in start order."""
+
+    menu: str
+    trace_memory: bool = False
+    started_at: float = field(default_factory=time.time)
+    seconds: float | None = None
+    stages: list[StageRecord] = field(default_factory=list)
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+    # open stages: (record, traced bytes at start, highest peak seen while nested stages reset it)
+    _stack: list[list] = field(default_factory=list, repr=False)
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._started
+
+    def to_dict(self) -> dict:
+        return {
+            "menu": self.menu,
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "stages": [asdict(s) for s in self.stages],
+        }
+
+
+_current_run: ContextVar[RunProfile | None] = ContextVar("current_run", default=None)
+
+# tracemalloc is process-wide: trace while any session has a traced stage open
+_tracing_users = 0
+_tracing_owned = False
+_tracing_lock = threading.Lock()
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_owned
+
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_owned
+
+    with _tracing_lock:
+        _tracing_users -= 1
+        # leave tracing alone if someone else (e.g. a benchmark) started it
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+def count_rows(value) -> int | None:
+    """Rows of a frame/array result; for tuples such as (df, selections), of the first item."""
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if hasattr(value, "shape") and getattr(value, "ndim", 0) >= 1:
+        return int(value.shape[0])
+
+    return None
+
+
+@contextmanager
+def profile_stage(name: str, rows_in: int | None = None):
+    """
+    Time a pipeline stage of the current run; a no-op outside a run.
+
+    Yields the StageRecord so callers can set `rows_out` (outside a run it is
+    a throwaway record). With memory tracing on, `peak_mb` is the peak traced
+    allocation above the stage's starting point. Overlapping traced reruns in
+    other sessions share tracemalloc, so their peaks are approximate.
+    """
+    run = _current_run.get()
+    if run is None:
+        yield StageRecord(stage=name, depth=0, rows_in=rows_in)
+        return
+
+    record = StageRecord(stage=name, depth=len(run._stack), rows_in=rows_in)
+    run.stages.append(record)
+
+    traced = run.trace_memory
+    if traced:
+        if not run._stack:
+            _acquire_tracing()
+        current, peak = tracemalloc.get_traced_memory()
+        if run._stack:
+            run._stack[-1][2] = max(run._stack[-1][2], peak)
+        tracemalloc.reset_peak()
+        run._stack.append([record, current, current])
+    else:
+        run._stack.append([record, 0, 0])
+
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record.error = type(e).__name__
+        raise
+    finally:
+        record.seconds = time.perf_counter() - started
+        _, start_bytes, seen_peak = run._stack.pop()
+
+        if traced:
+            peak = max(seen_peak, tracemalloc.get_traced_memory()[1])
+            record.peak_mb = round(max(0, peak - start_bytes) / 2**20, 3)
+            if run._stack:
+                run._stack[-1][2] = max(run._stack[-1][2], peak)
+                tracemalloc.reset_peak()
+            else:
+                _release_tracing()
+
+
+def profiled(name: str):
+    """Decorator form of `profile_stage`; rows in/out come from the first frame argument and the result."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_run.get() is None:
+                return fn(*args, **kwargs)
+
+            rows_in = next((count_rows(a) for a in args if isinstance(a, pd.DataFrame)), None)
+            with profile_stage(name, rows_in) as record:
+                result = fn(*args, **kwargs)
+                record.rows_out = count_rows(result)
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class ProfileLog:
+    """The last `runs_per_menu` reruns of each menu, shared by every session."""
+
+    def __init__(self, runs_per_menu: int = DEFAULT_RUNS_PER_MENU):
+        self.runs_per_menu = runs_per_menu
+        self._runs: dict[str, deque[RunProfile]] = {}
+        self._lock = threading.Lock()
+
+    def begin_run(self, menu: str, trace_memory: bool = False) -> RunProfile:
+        """
+        Start profiling this rerun. The run is logged right away, so stages
+        recorded before an st.stop() are kept even if `finish` is never reached.
+        """
+        run = RunProfile(menu=menu, trace_memory=trace_memory)
+        with self._lock:
+            self._runs.setdefault(menu, deque(maxlen=self.runs_per_menu)).append(run)
+        _current_run.set(run)
+
+        return run
+
+    def runs(self, menu: str) -> list[RunProfile]:
+        with self._lock:
+            return list(self._runs.get(menu, ()))
+
+    def menus(self) -> list[str]:
+        with self._lock:
+            return list(self._runs)
+
+    def clear(self):
+        with self._lock:
+            self._runs = {}
+
+    def to_json(self) -> str:
+        with self._lock:
+            payload = {menu: [r.to_dict() for r in runs] for menu, runs in self._runs.items()}
+
+        return json.dumps(payload, indent=1)
+
+
+_profile_log: ProfileLog | None = None
+_profile_log_lock = threading.Lock()
+
+
+def get_profile_log() -> ProfileLog:
+    global _profile_log
+
+    with _profile_log_lock:
+        if _profile_log is None:
+            _profile_log = ProfileLog()
+
+    return _profile_log
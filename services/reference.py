@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from services.columnar import read_parquet, write_parquet_atomic
+from services.profiling import profiled
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+SIDECAR_DIR = Path(__file__).resolve().parent.parent / ".cache" / "references"
+
+
+@dataclass(frozen=True)
+class ReferenceSpec:
+    name: str
+    filename: str
+    # CPU and Client headers carry non-ASCII junk that is dropped rather than kept as spaces
+    ascii_headers: bool = False
+
+
+REFERENCE_SPECS: dict[str, ReferenceSpec] = {
+    "CPU": ReferenceSpec("CPU", "CPU.xlsx", ascii_headers=True),
+    "FAN": ReferenceSpec("FAN", "FAN.xlsx"),
+    "MSU": ReferenceSpec("MSU", "MSU.xlsx"),
+    "Client": ReferenceSpec("Client", "Client.xlsx", ascii_headers=True),
+    "Line": ReferenceSpec("Line", "Line.xlsx"),
+}
+
+
+def normalize_reference_headers(columns: pd.Index, ascii_headers: bool = False) -> pd.Index:
+    columns = columns.astype(str)
+    if ascii_headers:
+        columns = columns.str.encode("ascii", "ignore").str.decode("utf-8")
+
+    return columns.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def compile_reference(df_ref: pd.DataFrame, spec: ReferenceSpec) -> pd.DataFrame:
+    df_ref = df_ref.copy()
+    df_ref.columns = normalize_reference_headers(df_ref.columns, spec.ascii_headers)
+
+    if "Mapping" in df_ref.columns:
+        df_ref["Mapping"] = df_ref["Mapping"].astype(str).str.strip()
+
+    # row order of the reference file drives display order on every board
+    df_ref["order"] = range(len(df_ref))
+
+    return df_ref
+
+
+def index_by_mapping(df_ref: pd.DataFrame) -> pd.DataFrame:
+    if "Mapping" not in df_ref.columns:
+        return df_ref
+
+    df_ref = df_ref.set_index("Mapping", drop=False)
+    df_ref.index.name = None
+
+    return df_ref
+
+
+@dataclass
+class CompiledReference:
+    mtime_ns: int
+    size: int
+    frame: pd.DataFrame
+
+
+class ReferenceRegistry:
+    """
+    Board reference workbooks, normalized once and indexed by Mapping.
+
+    Each workbook is compiled into a Parquet sidecar that is reused until the
+    workbook's mtime/size changes and its content hash no longer matches.
+    """
+
+    def __init__(self, data_dir: Path = DATA_DIR, sidecar_dir: Path = SIDECAR_DIR):
+        self.data_dir = Path(data_dir)
+        self.sidecar_dir = Path(sidecar_dir)
+
+        self._compiled: dict[str, CompiledReference] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def _sidecar_paths(self, spec: ReferenceSpec) -> tuple[Path, Path]:
+        return (
+            self.sidecar_dir / f"{spec.name}.parquet",
+            self.sidecar_dir / f"{spec.name}.json",
+        )
+
+    def __getstate__(self) -> dict:
+        # sent to worker processes: the directories only, each process compiles (or reads sidecars) itself
+        return {"data_dir": self.data_dir, "sidecar_dir": self.sidecar_dir}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["data_dir"], state["sidecar_dir"])
+
+    def _read_sidecar(self, spec: ReferenceSpec, stat: os.stat_result, source: Path) -> pd.DataFrame | None:
+        frame_path, meta_path = self._sidecar_paths(spec)
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if (meta.get("mtime_ns"), meta.get("size")) != (stat.st_mtime_ns, stat.st_size):
+            # touched but maybe not changed: fall back to the content hash
+            if meta.get("sha256") != self._hash_file(source):
+                return None
+
+            meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            meta_path.write_text(json.dumps(meta))
+
+        try:
+            return read_parquet(frame_path)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+
+    def _write_sidecar(self, spec: ReferenceSpec, stat: os.stat_result, source: Path, df_ref: pd.DataFrame):
+        frame_path, meta_path = self._sidecar_paths(spec)
+        try:
+            write_parquet_atomic(df_ref, frame_path)
+        except Exception:
+            return
+
+        meta_path.write_text(json.dumps({
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": self._hash_file(source),
+        }))
+
+    def version(self, name: str) -> str:
+        """Cheap identity of a workbook's current content (mtime and size), as `get` checks it."""
+        stat = (self.data_dir / REFERENCE_SPECS[name].filename).stat()
+
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    @profiled("reference.get")
+    def get(self, name: str) -> pd.DataFrame:
+        spec = REFERENCE_SPECS[name]
+        source = self.data_dir / spec.filename
+        stat = source.stat()
+
+        with self._lock:
+            compiled = self._compiled.get(name)
+            if compiled is None or (compiled.mtime_ns, compiled.size) != (stat.st_mtime_ns, stat.st_size):
+                df_ref = self._read_sidecar(spec, stat, source)
+                if df_ref is None:
+                    df_ref = compile_reference(pd.read_excel(source), spec)
+                    self._write_sidecar(spec, stat, source, df_ref)
+
+                compiled = CompiledReference(stat.st_mtime_ns, stat.st_size, index_by_mapping(df_ref))
+                self._compiled[name] = compiled
+
+        # shallow copy: menus select and add columns without touching the shared frame
+        return compiled.frame.copy(deep=False)
+
+
+_reference_registry: ReferenceRegistry | None = None
+_reference_registry_lock = threading.Lock()
+
+
+def get_reference_registry() -> ReferenceRegistry:
+    global _reference_registry
+
+    with _reference_registry_lock:
+        if _reference_registry is None:
+            _reference_registry = ReferenceRegistry()
+
+    return _reference_registry
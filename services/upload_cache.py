@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from services.columnar import read_parquet, write_parquet_atomic
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "uploads"
+DEFAULT_MAX_MB = 512
+DEFAULT_MEMORY_ENTRIES = 8
+
+
+class UploadCache:
+    """
+    Parsed uploads keyed by a hash of the file bytes.
+
+    Frames live in a small in-memory LRU and in a Parquet store on disk that
+    survives restarts. The disk store is trimmed (least recently used first)
+    once it grows past `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+        memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+
+        self._memory: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def hash_bytes(data: bytes, *parts: str) -> str:
+        digest = hashlib.sha256(data)
+        for part in parts:
+            digest.update(b"\0" + part.encode("utf-8"))
+
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def _remember(self, key: str, df: pd.DataFrame):
+        with self._lock:
+            self._memory[key] = df
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        with self._lock:
+            df = self._memory.get(key)
+            if df is not None:
+                self._memory.move_to_end(key)
+                return df
+
+        path = self._path(key)
+        try:
+            df = read_parquet(path)
+            os.utime(path)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+
+        self._remember(key, df)
+        return df
+
+    def put(self, key: str, df: pd.DataFrame):
+        self._remember(key, df)
+
+        try:
+            write_parquet_atomic(df, self._path(key))
+        except Exception:
+            # frames pyarrow cannot store are still served from memory
+            return
+
+        self.evict()
+
+    def get_or_parse(
+        self,
+        data: bytes,
+        parser: Callable[[bytes], pd.DataFrame],
+        *key_parts: str,
+        key: str | None = None,
+    ) -> pd.DataFrame:
+        """`key` skips hashing when the caller already has hash_bytes(data, *key_parts)."""
+        key = key or self.hash_bytes(data, *key_parts)
+
+        df = self.get(key)
+        if df is not None:
+            return df
+
+        # one parse per file even when several sessions upload it at once
+        with self._key_lock(key):
+            df = self.get(key)
+            if df is None:
+                df = parser(data)
+                self.put(key, df)
+
+        with self._lock:
+            self._key_locks.pop(key, None)
+
+        return df
+
+    def evict(self):
+        entries = []
+        for path in self.cache_dir.glob("*.parquet"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+_upload_cache: UploadCache | None = None
+_upload_cache_lock = threading.Lock()
+
+
+def get_upload_cache() -> UploadCache:
+    global _upload_cache
+
+    with _upload_cache_lock:
+        if _upload_cache is None:
+            _upload_cache = UploadCache(
+                cache_dir=Path(os.getenv("upload_cache_dir", DEFAULT_CACHE_DIR)),
+                max_bytes=int(os.getenv("upload_cache_max_mb", DEFAULT_MAX_MB)) * 1024 * 1024,
+            )
+
+    return _upload_cache
@@ -0,0 +1,29 @@
+import json
+
+import batch_runner
+from batch_runner import main
+from benchmarks.generators import write_dataset
+
+
+def test_generated_dataset_runs_end_to_end(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_runner, "SIDECAR_DIR", tmp_path / "sidecars")
+    dataset = write_dataset(tmp_path / "dataset", 100)
+    out_dir = tmp_path / "out"
+
+    main([
+        str(dataset / "exports"),
+        "-o", str(out_dir),
+        "--workers", "1",
+        "--reference-dir", str(dataset / "data"),
+        "--loss-reference", str(dataset / "data" / "Loss_reference.xlsx"),
+    ])
+
+    summary = json.loads((out_dir / "summary.json").read_text())
+    analyses = {r["analysis"]: r for r in summary["results"]}
+    assert not [r for r in summary["results"] if "error" in r]
+    assert set(analyses) == {
+        "Preset status", "CPU", "FAN", "MSU", "Client", "Line", "Fiber Flapping", "loss_eol", "loss_core",
+    }
+    assert analyses["CPU"]["rows"] == 100
+    assert summary["skipped_files"] == []
+    assert (out_dir / "cpu.parquet").exists()
@@ -0,0 +1,121 @@
+import pandas as pd
+import pytest
+
+from benchmarks.generators import make_board_export, make_reference_workbook
+from components.boards import BoardDataError, build_board
+from components.rules import COL_IN, COL_MAX_IN, COL_MAX_OUT, COL_MIN_IN, COL_MIN_OUT, COL_OUT
+from services.reference import REFERENCE_SPECS, compile_reference, index_by_mapping
+
+N = 300
+
+
+def normalized(columns: pd.Index, ascii_headers: bool = False) -> pd.Index:
+    columns = columns.astype(str)
+    if ascii_headers:
+        columns = columns.str.encode("ascii", "ignore").str.decode("utf-8")
+    return columns.str.replace(r"\s+", " ", regex=True).str.replace("\u00a0", " ").str.strip()
+
+
+# region The CPU and Line board pages before build_board
+def old_cpu(df_cpu: pd.DataFrame, df_ref: pd.DataFrame) -> pd.DataFrame:
+    df_cpu = df_cpu.copy()
+    df_cpu.columns = normalized(df_cpu.columns)
+    df_cpu["Mapping Format"] = df_cpu["ME"].astype(str).str.strip() + df_cpu["Measure Object"].astype(str).str.strip()
+
+    df_ref = df_ref.copy()
+    df_ref.columns = normalized(df_ref.columns, ascii_headers=True)
+    df_ref["Mapping"] = df_ref["Mapping"].astype(str).str.strip()
+    df_ref["order"] = range(len(df_ref))
+
+    ref_cols = ["Mapping", "Maximum threshold", "Minimum threshold", "order"]
+    ref_cols += [c for c in ["Site Name", "Call ID", "Route"] if c in df_ref.columns]
+    df_merged = pd.merge(df_cpu, df_ref[ref_cols], left_on="Mapping Format", right_on="Mapping", how="inner")
+
+    base_cols = ["ME", "Measure Object", "Maximum threshold", "Minimum threshold", "CPU utilization ratio", "order"]
+    opt_cols = [c for c in ["Site Name", "Call ID", "Route"] if c in df_merged.columns]
+    df_result = df_merged[opt_cols + base_cols].copy()
+    df_result = df_result.sort_values("order").drop(columns=["order"]).reset_index(drop=True)
+
+    for c in ["CPU utilization ratio", "Maximum threshold", "Minimum threshold"]:
+        df_result[c] = pd.to_numeric(df_result[c], errors="coerce")
+
+    return df_result
+
+
+def old_line(df_line: pd.DataFrame, df_ref: pd.DataFrame, pmap: dict[str, str]) -> pd.DataFrame:
+    df_line = df_line.copy()
+    df_line.columns = normalized(df_line.columns)
+    df_ref = df_ref.copy()
+    df_ref.columns = normalized(df_ref.columns)
+    df_ref["order"] = range(len(df_ref))
+
+    df_line["Mapping Format"] = df_line["ME"].astype(str).str.strip() + df_line["Measure Object"].astype(str).str.strip()
+    df_ref["Mapping"] = df_ref["Mapping"].astype(str).str.strip()
+
+    df_merged = pd.merge(
+        df_line,
+        df_ref[["Site Name", "Mapping", "Call ID", "Threshold", COL_MAX_OUT, COL_MIN_OUT, COL_MAX_IN, COL_MIN_IN, "Route", "order"]],
+        left_on="Mapping Format",
+        right_on="Mapping",
+        how="inner",
+    )
+    df_result = df_merged[[
+        "Site Name", "ME", "Mapping", "Call ID", "Measure Object", "Threshold", "Instant BER After FEC",
+        COL_MAX_OUT, COL_MIN_OUT, COL_OUT, COL_MAX_IN, COL_MIN_IN, COL_IN, "Route", "order",
+    ]].copy()
+    df_result["Call ID"] = df_result["Call ID"].astype(str).str.strip().str.lstrip("0")
+    df_result["Route"] = df_result.apply(lambda r: f"Preset {pmap[r['Call ID']]}" if r["Call ID"] in pmap else r["Route"], axis=1)
+    df_result = df_result.sort_values("order").drop(columns=["order"]).reset_index(drop=True)
+
+    for c in ["Instant BER After FEC", COL_OUT, COL_IN, COL_MAX_OUT, COL_MIN_OUT, COL_MAX_IN, COL_MIN_IN]:
+        df_result[c] = pd.to_numeric(df_result[c], errors="coerce")
+
+    return df_result
+
+
+# region Inputs
+def inputs(board: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    df_export = make_board_export(board, N)
+    workbook = make_reference_workbook(board, df_export)
+    # references list only part of the exported ports, and exports pad names with spaces
+    workbook = workbook.iloc[: N * 2 // 3].reset_index(drop=True)
+    df_export["Measure Object"] = " " + df_export["Measure Object"] + " "
+
+    return df_export.rename(columns={"ME": " ME"}), workbook
+
+
+def registry_reference(board: str, workbook: pd.DataFrame) -> pd.DataFrame:
+    # what ReferenceRegistry.get serves
+    return index_by_mapping(compile_reference(workbook, REFERENCE_SPECS[board]))
+
+
+def test_cpu_matches_old_page():
+    df_export, workbook = inputs("CPU")
+    expected = old_cpu(df_export, workbook)
+
+    df_result = build_board("CPU", df_export, registry_reference("CPU", workbook))
+
+    assert len(df_result) == N * 2 // 3
+    pd.testing.assert_frame_equal(df_result, expected, check_dtype=False)
+
+
+def test_line_matches_old_page_with_presets():
+    df_export, workbook = inputs("Line")
+    # zero-padded Call IDs, as some workbooks have them
+    workbook["Call ID"] = "0" + workbook["Call ID"]
+    pmap = {cid: str(i % 4) for i, cid in enumerate(workbook["Call ID"].str.lstrip("0").head(50))}
+    expected = old_line(df_export, workbook, pmap)
+
+    df_result = build_board("Line", df_export, registry_reference("Line", workbook), preset_map=pmap)
+
+    assert df_result["Route"].str.startswith("Preset ").sum() >= 50
+    pd.testing.assert_frame_equal(df_result, expected, check_dtype=False)
+
+
+def test_missing_columns_raise_board_data_error():
+    df_export, workbook = inputs("CPU")
+
+    with pytest.raises(BoardDataError):
+        build_board("CPU", df_export.drop(columns=["CPU utilization ratio"]), registry_reference("CPU", workbook))
+    with pytest.raises(BoardDataError):
+        build_board("CPU", df_export, registry_reference("CPU", workbook.drop(columns=["Minimum threshold"])))
@@ -0,0 +1,69 @@
+import re
+
+import pytest
+
+import services.database as database
+from services.database import Database, ReferenceSheetCache
+
+LINK_NAMES = [
+    "BKK01-NMA02-01",
+    "NMA02-BKK01-01",
+    "XBKK01-NMA02-02",
+    "KKN03-BKK01_NMA02-01",
+    "BKK011-KKN03-01",
+    "BKK01",
+    "KKN03-NMA02-01",
+]
+
+
+class FakeCollection:
+    """The few pymongo calls the reference sheet needs; `$regex` is an unanchored search like Mongo's."""
+
+    def __init__(self, docs: list[dict]):
+        self.docs = docs
+
+    def find(self, query: dict, projection: dict):
+        for doc in self.docs:
+            if all(re.search(cond["$regex"], str(doc.get(field, ""))) for field, cond in query.items()):
+                keep = [c for c, on in projection.items() if on and c != "_id"]
+                yield {c: doc[c] for c in keep} if keep else dict(doc)
+
+    def estimated_document_count(self) -> int:
+        return len(self.docs)
+
+    def find_one(self, *args, **kwargs):
+        return None
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+
+class FakeDatabase(Database):
+    def __init__(self, docs: list[dict]):
+        super().__init__()
+        self.collection = FakeCollection(docs)
+
+    @property
+    def reference_collection(self):
+        return self.collection
+
+
+@pytest.fixture
+def db(monkeypatch) -> FakeDatabase:
+    monkeypatch.setattr(database, "reference_sheet_cache", ReferenceSheetCache())
+    docs = [{"Link Name": name, "EOL(dB)": float(i)} for i, name in enumerate(LINK_NAMES)]
+    return FakeDatabase(docs)
+
+
+@pytest.mark.parametrize("me_name", ["BKK01", "NMA02", "KKN03", "BKK011", "MISSING"])
+def test_me_query_matches_in_memory_contains(db, me_name):
+    df_all = db.get_reference_sheet()
+    expected = df_all[df_all["Link Name"].astype(str).str.contains(me_name, na=False)]
+
+    df_pushed = db.get_reference_sheet(me_name=me_name)
+    assert df_pushed.to_dict("records") == expected.to_dict("records")
+
+
+def test_no_me_name_is_unfiltered():
+    assert Database.build_reference_query(None) == {}
+    assert Database.build_reference_query("") == {}
@@ -0,0 +1,127 @@
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import components.flapping as flapping
+from components.flapping import FlappingStore, evict_flapping_stores, unmatched_flapping
+
+MES = ["BKK01", "NMA02", "KKN03", "PKT04"]
+START = pd.Timestamp("2025-01-01")
+
+
+def osc_export(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    me = rng.choice(MES, n)
+    target = rng.choice(MES, n)
+    # some objects name no far end, so their Target ME is missing
+    measure_object = [
+        f"OSC-{i}({t})" if rng.random() > 0.1 else f"OSC-{i}" for i, t in enumerate(target)
+    ]
+    begin = START + pd.to_timedelta(rng.integers(0, 96 * 7, n) * 15, unit="min")
+    max_power = rng.uniform(-20, -10, n)
+
+    return pd.DataFrame({
+        "Begin Time": begin,
+        "End Time": begin + pd.Timedelta(minutes=15),
+        "ME": me,
+        "Measure Object": measure_object,
+        "Max Value of Input Optical Power(dBm)": max_power,
+        "Min Value of Input Optical Power(dBm)": max_power - rng.uniform(0, 5, n),
+    })
+
+
+def fm_export(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 100)
+    a, b = rng.choice(MES, n), rng.choice(MES, n)
+    occurrence = START + pd.to_timedelta(rng.integers(0, 60 * 24 * 7, n), unit="min")
+    clear = occurrence + pd.to_timedelta(rng.integers(1, 240, n), unit="min")
+    clear = clear.where(rng.random(n) > 0.05)  # still raised: never matches, as NaT compared False
+
+    return pd.DataFrame({
+        "Alarm Name": "R_LOS",
+        "Link Name": [f"{x}-OSC_{y}-OSC" for x, y in zip(a, b)],
+        "Occurrence Time": occurrence,
+        "Clear Time": clear,
+    })
+
+
+def old_unmatched(df_optical: pd.DataFrame, df_fm: pd.DataFrame) -> pd.DataFrame:
+    """The Fiber Flapping page before the interval index, row by row."""
+    df_optical = df_optical.copy()
+    df_optical["Max - Min (dB)"] = (
+        df_optical["Max Value of Input Optical Power(dBm)"] - df_optical["Min Value of Input Optical Power(dBm)"]
+    )
+    df_optical["Target ME"] = df_optical["Measure Object"].apply(
+        lambda mo: m.group(1) if (m := re.search(r"\(([^)]+)\)", str(mo))) else None
+    )
+    df_filtered = df_optical[df_optical["Max - Min (dB)"] > 2]
+    link_col = [col for col in df_fm.columns if col.startswith("Link")][0]
+
+    result = []
+    for _, row in df_filtered.iterrows():
+        me = re.escape(str(row["ME"]))
+        target_me = re.escape(str(row["Target ME"]))
+        matched = df_fm[
+            df_fm[link_col].astype(str).str.contains(me, na=False)
+            & df_fm[link_col].astype(str).str.contains(target_me, na=False)
+            & (df_fm["Occurrence Time"] <= row["End Time"])
+            & (df_fm["Clear Time"] >= row["Begin Time"])
+        ]
+        if matched.empty:
+            result.append(row)
+
+    return pd.DataFrame(result)
+
+
+def keys(df: pd.DataFrame) -> list[tuple]:
+    return sorted(zip(df["ME"], df["Measure Object"], df["Begin Time"]))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_unmatched_flapping_matches_old_loop(seed):
+    df_osc, df_fm = osc_export(400, seed), fm_export(300, seed)
+
+    assert keys(unmatched_flapping(df_osc, df_fm)) == keys(old_unmatched(df_osc, df_fm))
+
+
+def test_store_ingesting_files_one_by_one_matches_one_shot(tmp_path):
+    df_osc, df_fm = osc_export(400), fm_export(300)
+    osc_parts = np.array_split(np.arange(len(df_osc)), 2)
+    fm_parts = np.array_split(np.arange(len(df_fm)), 2)
+
+    store = FlappingStore(tmp_path)
+    # alarms arriving after the OSC rows they explain must still match them
+    store.add_osc(df_osc.iloc[osc_parts[0]], "osc-1")
+    store.add_fm(df_fm.iloc[fm_parts[0]], "fm-1")
+    store.add_osc(df_osc.iloc[osc_parts[1]], "osc-2")
+    store.add_fm(df_fm.iloc[fm_parts[1]], "fm-2")
+    # the same file again adds nothing
+    assert store.add_osc(df_osc.iloc[osc_parts[1]], "osc-2") == 0
+
+    stored = store.osc
+    assert keys(stored[~stored["Alarm Matched"].astype(bool)]) == keys(old_unmatched(df_osc, df_fm))
+
+    # and the same after a restart, from the Parquet files
+    reloaded = FlappingStore(tmp_path).osc
+    assert keys(reloaded[~reloaded["Alarm Matched"].astype(bool)]) == keys(old_unmatched(df_osc, df_fm))
+    assert FlappingStore(tmp_path).has_ingested("fm-2")
+
+
+def test_stale_workspaces_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(flapping, "FLAPPING_STORE_DIR", tmp_path)
+    monkeypatch.setattr(flapping, "_flapping_stores", {})
+    for name, days_unused in [("old", 40), ("recent", 1), ("current", 90)]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "osc.parquet").write_bytes(b"x" * 1000)
+        used_at = time.time() - days_unused * 86400
+        os.utime(tmp_path / name, (used_at, used_at))
+
+    evict_flapping_stores("current", max_age_s=30 * 86400, max_bytes=10_000)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["current", "recent"]
+
+    evict_flapping_stores("current", max_age_s=30 * 86400, max_bytes=1_500)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["current"]
@@ -0,0 +1,47 @@
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+from services.ingest import ColumnPlan, ReadProgress, read_columns
+from services.ingest_pool import IngestPool
+
+PLAN = ColumnPlan(columns=("ME", "Value"), text_cols=("ME",))
+
+
+def late_dash_csv(rows: int = 200_000) -> bytes:
+    # well past Arrow's first block, so the "--" is not seen when types are inferred from it alone
+    lines = ["ME,Value,Unused"] + [f"ME-{i},{i}.5,x" for i in range(rows - 1)] + ["ME-last,--,x"]
+    return ("\n".join(lines) + "\n").encode()
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_csv_progress_read_with_late_non_numeric_cell(compress):
+    data = late_dash_csv()
+    if compress:
+        data = gzip.compress(data)
+
+    progress = ReadProgress()
+    df = read_columns(data, PLAN, fmt="csv", progress=progress)
+
+    pd.testing.assert_frame_equal(df, read_columns(data, PLAN, fmt="csv"))
+    assert list(df.columns) == ["ME", "Value"]
+    assert df["Value"].iloc[-1] == "--"
+    assert progress.rows == len(df) == 200_000
+    assert progress.bytes_read == progress.total_bytes == len(data)
+    assert progress.preview is not None and not progress.preview.empty
+
+
+def test_excel_read_in_process_relays_progress():
+    buffer = io.BytesIO()
+    pd.DataFrame({"ME": [f"ME-{i}" for i in range(6_000)], "Value": range(6_000), "Unused": "x"}).to_excel(buffer, index=False)
+    data = buffer.getvalue()
+
+    pool = IngestPool(max_workers=1)
+    progress = ReadProgress()
+    df = pool.read_in_process(data, PLAN, "xlsx", progress)
+
+    pd.testing.assert_frame_equal(df, read_columns(data, PLAN, fmt="xlsx"))
+    assert progress.rows == progress.total_rows == 6_000
+    assert progress.preview is not None and list(progress.preview.columns) == ["ME", "Value"]
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.generators import make_attenuation
+from components.loss import CoreAnalyzer, EOLAnalyzer
+
+
+# region The loss analyzers before the column-wise rewrite
+def old_result_df(df_ref: pd.DataFrame, df_raw: pd.DataFrame) -> pd.DataFrame:
+    def castable(x) -> bool:
+        try:
+            float(x)
+            return True
+        except (ValueError, TypeError):
+            return False
+
+    df_atten = pd.DataFrame()
+    df_atten["Link Name"] = df_raw["Source Port"] + "_" + df_raw["Sink Port"]
+    df_atten["Current Attenuation(dB)"] = df_raw["Optical Attenuation (dB)"]
+    df_atten["Remark"] = df_atten["Current Attenuation(dB)"].apply(lambda x: "" if castable(x) else "Fiber Break")
+
+    df_eol = df_ref.join(df_atten.set_index("Link Name"), on="Link Name")
+    current = pd.to_numeric(df_eol["Current Attenuation(dB)"], downcast="float", errors="coerce")
+    eol = pd.to_numeric(df_eol["EOL(dB)"], downcast="float", errors="coerce")
+    df_eol["Loss current - Loss EOL"] = current - eol - 1
+
+    return df_eol[["Link Name", "EOL(dB)", "Current Attenuation(dB)", "Loss current - Loss EOL", "Remark"]]
+
+
+def old_loss_between_core(df_result: pd.DataFrame) -> list:
+    # forward and reverse fibers on alternating rows
+    forward = df_result["Loss current - Loss EOL"].iloc[::2].values
+    reverse = df_result["Loss current - Loss EOL"].iloc[1::2].values
+    loss = ["--" if pd.isna(v) else round(v, 2) for v in (abs(f - r) for f, r in zip(forward, reverse))]
+
+    return [x for x in loss for _ in range(2)]
+
+
+def as_float(values) -> np.ndarray:
+    return pd.to_numeric(pd.Series(list(values), dtype=object), errors="coerce").to_numpy(dtype=float)
+
+
+# region Tests
+def test_eol_result_matches_old():
+    df_raw, df_ref = make_attenuation(300)
+
+    df_result = EOLAnalyzer(df_ref, df_raw).build_result_df()
+    expected = old_result_df(df_ref, df_raw)
+
+    assert df_result["Link Name"].tolist() == expected["Link Name"].tolist()
+    assert df_result["Remark"].tolist() == expected["Remark"].tolist()
+    np.testing.assert_allclose(
+        as_float(df_result["Loss current - Loss EOL"]), as_float(expected["Loss current - Loss EOL"]), rtol=1e-6
+    )
+
+
+def test_core_loss_matches_old_on_alternating_rows():
+    df_raw, df_ref = make_attenuation(300)
+    analyzer = CoreAnalyzer(df_ref, df_raw)
+
+    df_core = analyzer.calculate_loss_between_core(analyzer.build_result_df())
+    expected = old_loss_between_core(old_result_df(df_ref, df_raw))
+
+    assert (df_core["Loss between core"] == "--").sum() == expected.count("--")
+    np.testing.assert_allclose(as_float(df_core["Loss between core"]), as_float(expected), atol=0.011)
+
+
+def test_core_pairs_follow_ports_not_row_order():
+    df_raw, df_ref = make_attenuation(300)
+    # links the raw export doesn't know still pair by the two halves of their name
+    extra = pd.DataFrame({"Link Name": ["X-1_Y-1", "Y-1_X-1"], "EOL(dB)": [10.0, 10.0]})
+    df_ref = pd.concat([df_ref, extra], ignore_index=True)
+    shuffled = df_ref.sample(frac=1, random_state=0).reset_index(drop=True)
+
+    keys = CoreAnalyzer(shuffled, df_raw).pair_keys(shuffled)
+    forward, reverse = "X-1_Y-1", "Y-1_X-1"
+    assert keys[shuffled["Link Name"] == forward].item() == keys[shuffled["Link Name"] == reverse].item()
+    assert keys.value_counts().eq(2).all()
+
+    def loss_by_link(df: pd.DataFrame) -> pd.Series:
+        analyzer = CoreAnalyzer(df, df_raw)
+        df_core = analyzer.calculate_loss_between_core(analyzer.build_result_df())
+        return df_core.set_index("Link Name")["Loss between core"].sort_index()
+
+    pd.testing.assert_series_equal(loss_by_link(shuffled), loss_by_link(df_ref))
+
+
+def test_core_status_table_labels_every_row():
+    df_raw, df_ref = make_attenuation(300)
+
+    df_status = CoreAnalyzer(df_ref, df_raw).status_table()
+
+    assert len(df_status) == len(df_ref)
+    assert set(df_status["Status"]) <= {"error", "flapping", "ok"}
+    # "--" only where a fiber of the pair broke, a few percent of pairs here
+    assert (df_status["Loss between core"] == "--").mean() < 0.1
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.rules import (
+    COL_IN,
+    COL_MAX_IN,
+    COL_MAX_OUT,
+    COL_MIN_IN,
+    COL_MIN_OUT,
+    COL_OUT,
+    BoundRule,
+    LimitRule,
+    RuleEngine,
+    evaluate_board,
+)
+
+N = 500
+
+
+def values(rng: np.random.Generator, low: float, high: float, nan_ratio: float = 0.2) -> np.ndarray:
+    v = rng.uniform(low, high, N).round(1)
+    v[rng.random(N) < nan_ratio] = np.nan
+    return v
+
+
+# region Old per-row checks, as the board pages ran them through df.apply(axis=1)
+def old_cpu(r) -> bool:
+    v, lo, hi = r.get("CPU utilization ratio"), r.get("Minimum threshold"), r.get("Maximum threshold")
+    return bool(pd.notna(v) and pd.notna(lo) and pd.notna(hi) and (v < lo or v > hi))
+
+
+def old_fan(r) -> bool:
+    mo = str(r["Measure Object"])
+    val = r["Value of Fan Rotate Speed(Rps)"]
+    if pd.isna(val):
+        return False
+    if "FCC" in mo and val > 120:
+        return True
+    elif "FCPP" in mo and val > 250:
+        return True
+    elif "FCPL" in mo and val > 120:
+        return True
+    elif "FCPS" in mo and val > 230:
+        return True
+    return False
+
+
+def old_msu(r) -> bool:
+    return bool(r["Laser Bias Current(mA)"] > r["Maximum threshold"])
+
+
+def old_client(r) -> bool:
+    return bool(
+        (r[COL_OUT] > r[COL_MAX_OUT]) or (r[COL_OUT] < r[COL_MIN_OUT])
+        or (r[COL_IN] > r[COL_MAX_IN]) or (r[COL_IN] < r[COL_MIN_IN])
+    )
+
+
+def old_line(r) -> bool:
+    return bool(
+        (pd.notna(r.get("Instant BER After FEC")) and float(r["Instant BER After FEC"]) > 0)
+        or (pd.notna(r.get(COL_OUT)) and pd.notna(r.get(COL_MAX_OUT)) and r[COL_OUT] > r[COL_MAX_OUT])
+        or (pd.notna(r.get(COL_OUT)) and pd.notna(r.get(COL_MIN_OUT)) and r[COL_OUT] < r[COL_MIN_OUT])
+        or (pd.notna(r.get(COL_IN)) and pd.notna(r.get(COL_MAX_IN)) and r[COL_IN] > r[COL_MAX_IN])
+        or (pd.notna(r.get(COL_IN)) and pd.notna(r.get(COL_MIN_IN)) and r[COL_IN] < r[COL_MIN_IN])
+    )
+
+
+# region Boards
+def power_columns(rng: np.random.Generator) -> dict[str, np.ndarray]:
+    return {
+        COL_OUT: values(rng, -10, 10), COL_MAX_OUT: values(rng, 0, 8), COL_MIN_OUT: values(rng, -8, 0),
+        COL_IN: values(rng, -10, 10), COL_MAX_IN: values(rng, 0, 8), COL_MIN_IN: values(rng, -8, 0),
+    }
+
+
+def board_frame(board: str, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    if board == "CPU":
+        return pd.DataFrame({
+            "CPU utilization ratio": values(rng, 0, 100),
+            "Maximum threshold": values(rng, 50, 90),
+            "Minimum threshold": values(rng, 0, 20),
+        })
+    if board == "FAN":
+        types = np.array(["FCC", "FCPP", "FCPL", "FCPS", "OTHER", "FCC+FCPS", "FCPP/FCPL"])
+        return pd.DataFrame({
+            "Measure Object": [f"Shelf 1 {t}-{i}" for i, t in enumerate(rng.choice(types, N))],
+            "Value of Fan Rotate Speed(Rps)": values(rng, 50, 300),
+        })
+    if board == "MSU":
+        return pd.DataFrame({"Laser Bias Current(mA)": values(rng, 0, 100), "Maximum threshold": values(rng, 20, 80)})
+    if board == "Client":
+        return pd.DataFrame(power_columns(rng))
+
+    return pd.DataFrame({"Instant BER After FEC": np.where(rng.random(N) < 0.8, 0.0, values(rng, 0, 1e-3)), **power_columns(rng)})
+
+
+OLD_CHECKS = {"CPU": old_cpu, "FAN": old_fan, "MSU": old_msu, "Client": old_client, "Line": old_line}
+
+
+@pytest.mark.parametrize("board", list(OLD_CHECKS))
+@pytest.mark.parametrize("seed", [0, 1])
+def test_board_rows_match_old_row_checks(board, seed):
+    df = board_frame(board, seed)
+    expected = df.apply(OLD_CHECKS[board], axis=1).to_numpy(dtype=bool)
+
+    result = evaluate_board(board, df)
+
+    np.testing.assert_array_equal(result.rows, expected)
+    assert result.has_issue == expected.any()
+    assert result.issue_count == expected.sum()
+
+
+def test_cpu_cell_needs_both_thresholds():
+    df = pd.DataFrame({
+        "CPU utilization ratio": [95.0, 95.0, 5.0, np.nan, 50.0],
+        "Maximum threshold": [90.0, np.nan, 90.0, 90.0, 90.0],
+        "Minimum threshold": [10.0, 10.0, 10.0, 10.0, 10.0],
+    })
+
+    np.testing.assert_array_equal(evaluate_board("CPU", df).cell("CPU utilization ratio"), [True, False, True, False, False])
+
+
+def test_missing_columns_never_flag():
+    df = pd.DataFrame({"Other": [1.0, 2.0]})
+    result = RuleEngine([BoundRule("Value", upper="Max", lower="Min"), LimitRule("Value", limit=0)]).evaluate(df)
+
+    assert not result.has_issue
+    np.testing.assert_array_equal(result.cell("Value"), [False, False])
+    np.testing.assert_array_equal(result.cell("Unknown"), [False, False])
@@ -0,0 +1,179 @@
+import io
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pytest
+
+from benchmarks.generators import make_wason_log
+from components.wason import read_call_text, scan_log
+
+# region The Preset status and Line board parsers before the single streaming scan
+OLD_CALL_HEADER_RE = re.compile(r"\[WASON\]\[CALL\s+(\d+)\]\s+\[([^\]]+)\]")
+OLD_CONN_HAS_WR_RE = re.compile(r"\[WASON\]\s*\[Conn\s+\d+\].*\bWR\b", re.IGNORECASE)
+OLD_CONN_WR_NOALARM_RE = re.compile(r"\[WASON\]\s*\[Conn\s+\d+\][^\n]*\bWR\s+NO_ALARM\b", re.IGNORECASE)
+OLD_PREROUT_USED_RE = re.compile(r"\[WASON\]--\s*(\d+)\s*--\s*WORK\s*--\s*\(USED\)\s*--\s*\((\w+)\).*", re.IGNORECASE)
+OLD_IP_MAP = {
+    "30.10.90.6": "HYI-4",
+    "30.10.10.6": "Jasmine",
+    "30.10.30.6": "Phu Nga",
+    "30.10.50.6": "SNI-POI",
+    "30.10.70.6": "NKS",
+    "30.10.110.6": "PKT",
+}
+
+
+@dataclass
+class OldCallBlock:
+    call_id: int
+    triple: str
+    lines: List[str] = field(default_factory=list)
+
+
+def old_parse_calls(text: str) -> List[OldCallBlock]:
+    calls: List[OldCallBlock] = []
+    cur: Optional[OldCallBlock] = None
+    for line in text.splitlines():
+        m = OLD_CALL_HEADER_RE.search(line)
+        if m:
+            if cur is not None:
+                calls.append(cur)
+            cur = OldCallBlock(call_id=int(m.group(1)), triple=m.group(2))
+        if cur is not None:
+            cur.lines.append(line)
+    if cur is not None:
+        calls.append(cur)
+    return calls
+
+
+def old_evaluate_preset_status(cb: OldCallBlock) -> Dict[str, Any]:
+    if not any(OLD_CONN_HAS_WR_RE.search(ln) for ln in cb.lines):
+        return {"has_wr": False}
+
+    wr_no_alarm = any(OLD_CONN_WR_NOALARM_RE.search(ln) for ln in cb.lines)
+    used_rows = [
+        {"index": int(m.group(1)), "result": m.group(2).upper()}
+        for m in (OLD_PREROUT_USED_RE.search(ln) for ln in cb.lines) if m
+    ]
+
+    verdict, pr_index = "FAIL", None
+    if not wr_no_alarm:
+        restore = "WR found but not WR NO_ALARM"
+    elif len(used_rows) != 1:
+        restore = f"Found {len(used_rows)} USED rows (expected 1)"
+    elif used_rows[0]["result"] != "SUCCESS":
+        restore = "USED row is not SUCCESS"
+    else:
+        verdict, pr_index, restore = "PASS", used_rows[0]["index"], "Normal"
+
+    return {"has_wr": True, "verdict": verdict, "Restore": restore, "pr_index": pr_index, "raw": "\n".join(cb.lines)}
+
+
+def old_get_preset_map(log_text: str) -> Dict[str, str]:
+    lines = log_text.splitlines()
+    pmap = {}
+    i = 0
+    while i < len(lines):
+        m = re.search(r"\[CALL\s+\d+\]\s+\[([\d.]+)\s+[\d.]+\s+(\d+)\]", lines[i])
+        if m:
+            key = f"{m.group(2).strip().lstrip('0')} ({OLD_IP_MAP.get(m.group(1).strip(), 'Unknown')})"
+            j = i + 1
+            while j < len(lines):
+                if "[CALL" in lines[j]:
+                    break
+                if "[PreRout]:" in lines[j]:
+                    k = j + 1
+                    while k < len(lines):
+                        if "[CALL" in lines[k]:
+                            break
+                        m2 = re.search(r"--(\d+)--WORK--\(USED\)--\(SUCCESS\)", lines[k])
+                        if m2:
+                            pmap[key] = m2.group(1).strip()
+                            break
+                        k += 1
+                    break
+                j += 1
+        i += 1
+    return pmap
+
+
+# region Logs
+EDGE_CASES = "\n".join([
+    "MobaXterm log ทดสอบ",
+    "[WASON] [Conn 0] 10.0.0.1 state WR NO_ALARM",  # before any CALL: belongs to no block
+    "[WASON][CALL 7] [30.10.90.6 30.10.10.6 0085] COPPER",
+    "[WASON] [Conn 0] 10.0.0.1 state wr no_alarm",
+    "[WASON][PreRout]:",
+    "[WASON]--1--WORK--(FREE)--(SUCCESS)--",
+    "[WASON]--2--WORK--(USED)--(SUCCESS)--",
+    "[WASON][CALL 8] [30.10.10.6 30.10.90.6 12] COPPER",
+    "[WASON] [Conn 1] 10.0.1.1 state WR SF",
+    "[WASON][PreRout]:",
+    "[WASON]--3--WORK--(USED)--(FAIL)--",
+    "[CALL 9] [1.2.3.4 5.6.7.8 9] not a WASON header, but ends the preset search",
+    "[WASON]--4--WORK--(USED)--(SUCCESS)--",
+    "[WASON][CALL 10] [30.10.70.6 30.10.10.6 77] COPPER",
+    "[WASON] [Conn 2] WR NO_ALARM",
+    "[WASON] [Conn 3] WR NO_ALARM",
+    "[WASON][PreRout]:",
+    "[WASON]--5--WORK--(USED)--(SUCCESS)--",
+    "[WASON]--6--WORK--(USED)--(SUCCESS)--",
+    "[WASON][CALL 7] [30.10.90.6 30.10.10.6 85] COPPER",  # same Call ID again: its preset wins
+    "[WASON] [Conn 0] WR NO_ALARM",
+    "[WASON][PreRout]:",
+    "[WASON]--9--WORK--(USED)--(SUCCESS)--",
+    "[WASON][CALL 11] [30.10.50.6 30.10.10.6 5] no Conn lines at all",
+    "trailing text",
+])
+
+LOGS = {
+    "edge_lf": EDGE_CASES.encode() + b"\n",
+    "edge_crlf": EDGE_CASES.replace("\n", "\r\n").encode(),
+    "edge_cr": EDGE_CASES.replace("\n", "\r").encode() + b"\r",
+    "generated_0": make_wason_log(300, seed=0),
+    "generated_1": make_wason_log(300, seed=1).replace(b"\r\n", b"\n"),
+}
+
+
+def old_summary(text: str) -> pd.DataFrame:
+    rows = []
+    for cb in old_parse_calls(text):
+        res = old_evaluate_preset_status(cb)
+        if res["has_wr"]:
+            rows.append({
+                "Call": cb.call_id, "Triple": cb.triple, "Preroute": res["pr_index"],
+                "Verdict": res["verdict"], "Restore": res["Restore"], "Raw": res["raw"],
+            })
+
+    return pd.DataFrame(rows).sort_values("Call", kind="stable").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("log", list(LOGS))
+@pytest.mark.parametrize("chunk_size", [7, 64, 1 << 20])
+def test_scan_matches_old_parsers(log, chunk_size):
+    data = LOGS[log]
+    text = data.decode("utf-8", errors="ignore")
+    expected = old_summary(text)
+
+    stream = io.BytesIO(data)
+    scan = scan_log(stream, chunk_size=chunk_size)
+    summary = scan.summary
+
+    cols = ["Call", "Triple", "Preroute", "Verdict", "Restore"]
+    pd.testing.assert_frame_equal(summary[cols], expected[cols], check_dtype=False)
+    assert [read_call_text(stream, r.Start, r.End) for r in summary.itertuples()] == expected["Raw"].tolist()
+    assert scan.preset_map == old_get_preset_map(text)
+
+
+def test_edge_case_verdicts():
+    summary = scan_log(io.BytesIO(LOGS["edge_crlf"])).summary
+
+    assert summary[["Call", "Verdict", "Restore"]].values.tolist() == [
+        [7, "PASS", "Normal"],
+        [7, "PASS", "Normal"],
+        [8, "FAIL", "WR found but not WR NO_ALARM"],
+        [10, "FAIL", "Found 2 USED rows (expected 1)"],
+    ]
+    assert summary["Preroute"].head(2).tolist() == [2, 9]
+    assert scan_log(io.BytesIO(LOGS["edge_crlf"])).preset_map == {"85 (HYI-4)": "9", "77 (NKS)": "5"}